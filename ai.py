@@ -2,63 +2,1189 @@
 # This file serves as the main AI interface for the project manager
 
 import requests
+import asyncio
 import json
+import re
+import time
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Any, Callable
 from datetime import datetime, timedelta
 
 try:
     from config import config
     OLLAMA_BASE_URL = config.OLLAMA_BASE_URL
+    OLLAMA_ENDPOINTS = config.OLLAMA_ENDPOINTS
     OLLAMA_MODEL = config.OLLAMA_MODEL
+    OLLAMA_SMALL_MODEL = config.OLLAMA_SMALL_MODEL
+    OLLAMA_LARGE_MODEL = config.OLLAMA_LARGE_MODEL
+    AI_LARGE_INPUT_CHARS = config.AI_LARGE_INPUT_CHARS
+    AI_MODEL_ROUTES = config.AI_MODEL_ROUTES
+    OLLAMA_JSON_FORMAT = config.OLLAMA_JSON_FORMAT
+    OLLAMA_KEEP_ALIVE = config.OLLAMA_KEEP_ALIVE
+    OLLAMA_RESIDENCY_CHECK_SECONDS = config.OLLAMA_RESIDENCY_CHECK_SECONDS
+    OLLAMA_EMBED_MODEL = config.OLLAMA_EMBED_MODEL
+    AI_METRICS_BUFFER_SIZE = config.AI_METRICS_BUFFER_SIZE
 except ImportError:
     # Fallback if config is not available
     OLLAMA_BASE_URL = "http://localhost:11434"
+    OLLAMA_ENDPOINTS = [OLLAMA_BASE_URL]
     OLLAMA_MODEL = "llama3.2"
+    OLLAMA_SMALL_MODEL = OLLAMA_MODEL
+    OLLAMA_LARGE_MODEL = OLLAMA_MODEL
+    AI_LARGE_INPUT_CHARS = 6000
+    AI_MODEL_ROUTES = ""
+    OLLAMA_JSON_FORMAT = "schema"
+    OLLAMA_KEEP_ALIVE = "30m"
+    OLLAMA_RESIDENCY_CHECK_SECONDS = 60
+    OLLAMA_EMBED_MODEL = "nomic-embed-text"
+    AI_METRICS_BUFFER_SIZE = 1000
 
 logger = logging.getLogger(__name__)
 
-class OllamaAI:
-    def __init__(self, base_url: str = None, model: str = None):
-        self.base_url = base_url or OLLAMA_BASE_URL
-        self.model = model or OLLAMA_MODEL
 
-    def is_available(self) -> bool:
-        """Check if Ollama is running and available"""
+class _InFlightCall:
+    """A generation that is currently running, shared by every caller with the same key"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running block until it finishes and receive the same result. Nothing
+    is cached once the call completes. Waiters block their thread, so async
+    callers must go through ``run_in_threadpool`` (as the AI routes do);
+    called directly on the event loop, identical requests would run one
+    after another and never overlap.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._stats = {"calls": 0, "executions": 0, "collapsed": 0, "max_waiters": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["collapsed"] += 1
+                self._stats["max_waiters"] = max(self._stats["max_waiters"], call.waiters)
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            logger.info("Joining in-flight AI request instead of starting a duplicate")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing how many calls were collapsed"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        stats["collapse_ratio"] = round(stats["collapsed"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
+
+
+def _normalize_prompt(text: Optional[str]) -> str:
+    """Collapse whitespace so prompts that differ only in formatting share a key"""
+    return " ".join((text or "").split())
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Stable key for a generate payload: normalized prompts plus model and options"""
+    normalized = dict(payload)
+    normalized["prompt"] = _normalize_prompt(payload.get("prompt"))
+    if "system" in normalized:
+        normalized["system"] = _normalize_prompt(payload.get("system"))
+    encoded = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class JSONStreamError(ValueError):
+    """Raised when streamed model output can no longer become valid JSON"""
+
+
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_NUMBER_TERMINAL = {"zero", "int", "frac", "exp"}
+_WHITESPACE = " \t\n\r"
+
+# Non-blank chunks tolerated after a complete JSON document before the stream
+# is closed without waiting for Ollama's final (stats) chunk
+MAX_TRAILING_CHUNKS = 16
+
+
+class IncrementalJSONValidator:
+    """Validate JSON syntax one chunk at a time.
+
+    ``feed`` raises JSONStreamError as soon as the text seen so far cannot be
+    the prefix of a valid JSON document, so a generation can be aborted
+    without waiting for it to finish. Only an object is accepted at the top
+    level, which is what every planning prompt asks for.
+    """
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._length = 0
+        self.complete = False
+        self._stack: List[str] = []
+        self._expect = "root"
+        self._in_string = False
+        self._escape = False
+        self._unicode_left = 0
+        self._string_is_key = False
+        self._number_state: Optional[str] = None
+        self._literal: Optional[str] = None
+        self._literal_pos = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        for char in chunk:
+            if self.complete:
+                if char in _WHITESPACE:
+                    continue
+                raise JSONStreamError(f"unexpected {char!r} after end of document at position {self._length}")
+            self._consume(char)
+            self._length += 1
+        self._chunks.append(chunk)
+
+    def _fail(self, char: str):
+        raise JSONStreamError(f"unexpected {char!r} at position {self._length} (expected {self._expect})")
+
+    def _consume(self, char: str) -> None:
+        if self._in_string:
+            self._consume_string(char)
+            return
+        if self._literal is not None:
+            if char != self._literal[self._literal_pos]:
+                self._fail(char)
+            self._literal_pos += 1
+            if self._literal_pos == len(self._literal):
+                self._literal = None
+                self._end_value()
+            return
+        if self._number_state is not None:
+            if self._consume_number(char):
+                return
+            if self._number_state not in _NUMBER_TERMINAL:
+                self._fail(char)
+            self._number_state = None
+            self._end_value()
+            # The character that ended the number still needs handling
+
+        if char in _WHITESPACE:
+            return
+
+        expect = self._expect
+        if expect == "root":
+            if char != "{":
+                self._fail(char)
+            self._open("object")
+        elif expect in ("value", "value_or_end"):
+            if expect == "value_or_end" and char == "]":
+                self._close("array")
+            else:
+                self._start_value(char)
+        elif expect in ("key", "key_or_end"):
+            if expect == "key_or_end" and char == "}":
+                self._close("object")
+            elif char == '"':
+                self._in_string = True
+                self._string_is_key = True
+            else:
+                self._fail(char)
+        elif expect == "colon":
+            if char != ":":
+                self._fail(char)
+            self._expect = "value"
+        elif expect == "comma_or_end":
+            container = self._stack[-1]
+            if char == ",":
+                self._expect = "key" if container == "object" else "value"
+            elif char == "}" and container == "object":
+                self._close("object")
+            elif char == "]" and container == "array":
+                self._close("array")
+            else:
+                self._fail(char)
+        else:
+            self._fail(char)
+
+    def _start_value(self, char: str) -> None:
+        if char == "{":
+            self._open("object")
+        elif char == "[":
+            self._open("array")
+        elif char == '"':
+            self._in_string = True
+            self._string_is_key = False
+        elif char in _LITERALS:
+            self._literal = _LITERALS[char]
+            self._literal_pos = 1
+        elif char == "-" or char.isdigit():
+            self._number_state = "sign" if char == "-" else ("zero" if char == "0" else "int")
+        else:
+            self._fail(char)
+
+    def _consume_string(self, char: str) -> None:
+        if self._unicode_left:
+            if char not in "0123456789abcdefABCDEF":
+                self._fail(char)
+            self._unicode_left -= 1
+        elif self._escape:
+            if char == "u":
+                self._unicode_left = 4
+            elif char not in '"\\/bfnrt':
+                self._fail(char)
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._string_is_key:
+                self._expect = "colon"
+            else:
+                self._end_value()
+        elif ord(char) < 0x20:
+            self._fail(char)
+
+    def _consume_number(self, char: str) -> bool:
+        """Advance the number state machine; False means the number has ended"""
+        state = self._number_state
+        if char.isdigit():
+            if state == "sign":
+                self._number_state = "zero" if char == "0" else "int"
+            elif state == "zero":
+                self._fail(char)
+            elif state == "frac0":
+                self._number_state = "frac"
+            elif state in ("exp0", "exp_sign"):
+                self._number_state = "exp"
+            return True
+        if char == "." and state in ("zero", "int"):
+            self._number_state = "frac0"
+            return True
+        if char in "eE" and state in ("zero", "int", "frac"):
+            self._number_state = "exp0"
+            return True
+        if char in "+-" and state == "exp0":
+            self._number_state = "exp_sign"
+            return True
+        return False
+
+    def _open(self, container: str) -> None:
+        self._stack.append(container)
+        self._expect = "key_or_end" if container == "object" else "value_or_end"
+
+    def _close(self, container: str) -> None:
+        self._stack.pop()
+        self._end_value()
+
+    def _end_value(self) -> None:
+        if self._stack:
+            self._expect = "comma_or_end"
+        else:
+            self.complete = True
+            self._expect = "end"
+
+
+_SCHEMA_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float),
+}
+
+
+def validate_schema(value: Any, schema: Dict[str, Any], path: str = "$", check_required: bool = True) -> List[str]:
+    """Check a parsed value against the subset of JSON schema used for planning prompts"""
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        python_type = _SCHEMA_TYPES[expected]
+        # bool is an int subclass, but JSON keeps them distinct
+        if isinstance(value, bool) and expected in ("integer", "number"):
+            return [f"{path}: expected {expected}, got boolean"]
+        if not isinstance(value, python_type):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} not in {schema['enum']}")
+
+    if isinstance(value, dict):
+        if check_required:
+            for key in schema.get("required", []):
+                if key not in value:
+                    errors.append(f"{path}: missing required key {key!r}")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], sub_schema, f"{path}.{key}", check_required))
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]", check_required))
+
+    return errors
+
+
+def keep_alive_value() -> Any:
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: a duration string or a number of seconds"""
+    value = str(OLLAMA_KEEP_ALIVE).strip()
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    return value
+
+
+def _parse_ollama_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse Ollama's RFC 3339 timestamps, which carry nanoseconds"""
+    if not value:
+        return None
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value.replace("Z", "+00:00"))
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class OllamaEndpoint:
+    """One Ollama server in the pool, with its load and health bookkeeping"""
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_ms: Optional[float] = None
+        self.healthy = True
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ewma_latency_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class NoHealthyEndpoint(requests.exceptions.ConnectionError):
+    """Every endpoint in the pool refused the connection"""
+
+
+class OllamaPool:
+    """Route requests to the least-loaded healthy Ollama endpoint.
+
+    Endpoints are ranked by in-flight requests, then by an exponentially
+    weighted average of observed latency. A connection error marks the
+    endpoint unhealthy for ``retry_after`` seconds and the request fails over
+    to the next candidate.
+    """
+    def __init__(self, urls: List[str], retry_after: float = 30.0, ewma_alpha: float = 0.3):
+        if not urls:
+            raise ValueError("OllamaPool needs at least one endpoint")
+        self.endpoints = [OllamaEndpoint(url) for url in urls]
+        self.retry_after = retry_after
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def acquire(self, exclude: tuple = ()) -> Optional[OllamaEndpoint]:
+        """Reserve the best endpoint not in ``exclude``; None when all were tried"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.url not in exclude]
+            if not candidates:
+                return None
+            # Unhealthy endpoints get another chance once their cooldown passes,
+            # and are used as a last resort when nothing healthy is left.
+            usable = [e for e in candidates if e.healthy or e.retry_at <= now] or candidates
+            endpoint = min(usable, key=lambda e: (e.in_flight, e.ewma_ms or 0.0))
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: OllamaEndpoint, elapsed_ms: float = None, error: Exception = None) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is not None:
+                endpoint.failures += 1
+                endpoint.healthy = False
+                endpoint.retry_at = time.monotonic() + self.retry_after
+                endpoint.last_error = str(error)
+                return
+            endpoint.healthy = True
+            if elapsed_ms is not None:
+                if endpoint.ewma_ms is None:
+                    endpoint.ewma_ms = elapsed_ms
+                else:
+                    endpoint.ewma_ms += self.ewma_alpha * (elapsed_ms - endpoint.ewma_ms)
+
+    def request(self, fn: Callable[[OllamaEndpoint], Any]) -> Any:
+        """Run ``fn`` against an endpoint, failing over on connection errors"""
+        tried = []
+        last_error: Optional[Exception] = None
+        while True:
+            endpoint = self.acquire(exclude=tuple(tried))
+            if endpoint is None:
+                raise NoHealthyEndpoint(f"No Ollama endpoint reachable: {last_error}")
+            tried.append(endpoint.url)
+            started = time.perf_counter()
+            try:
+                result = fn(endpoint)
+            except requests.exceptions.ConnectionError as e:
+                self.release(endpoint, error=e)
+                logger.warning(f"Ollama endpoint {endpoint.url} unreachable, failing over: {e}")
+                last_error = e
+                continue
+            except BaseException:
+                self.release(endpoint)
+                raise
+            self.release(endpoint, elapsed_ms=(time.perf_counter() - started) * 1000)
+            return result
+
+    def check_health(self) -> bool:
+        """Probe every endpoint; True when at least one answers"""
+        any_up = False
+        for endpoint in self.endpoints:
+            try:
+                response = endpoint.session.get(f"{endpoint.url}/api/tags", timeout=5)
+                up = response.status_code == 200
+            except Exception as e:
+                logger.warning(f"Ollama not available at {endpoint.url}: {e}")
+                up = False
+            with self._lock:
+                endpoint.healthy = up
+                if not up:
+                    endpoint.retry_at = time.monotonic() + self.retry_after
+            any_up = any_up or up
+        return any_up
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+class ModelLifecycle:
+    """Preload models and keep them resident in Ollama.
+
+    Tracks, per endpoint and model, whether it is loaded, how long loading
+    took, when Ollama will evict it and how long it stayed resident before
+    past evictions. ``start`` runs from the app lifespan: it warms the models
+    in the background and then periodically checks ``/api/ps``, reloading any
+    model that was evicted so a user request never pays the load time.
+    """
+    def __init__(self, pool: OllamaPool, models: List[str] = None):
+        self.pool = pool
+        self.models = models or [OLLAMA_MODEL]
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _model_state(self, url: str, model: str) -> Dict[str, Any]:
+        return self._state.setdefault(url, {}).setdefault(model, {
+            "status": "unknown",
+            "loads": 0,
+            "evictions": 0,
+            "last_load_ms": None,
+            "ollama_load_ms": None,
+            "loaded_at": None,
+            "expires_at": None,
+            "last_used_at": None,
+            "last_evicted_at": None,
+            "last_resident_seconds": None,
+            "last_error": None,
+        })
+
+    def mark_used(self, url: str, model: str) -> None:
+        with self._lock:
+            self._model_state(url, model)["last_used_at"] = datetime.now().isoformat()
+
+    def warm_up(self, endpoint: OllamaEndpoint, model: str) -> bool:
+        """Load a model into memory; an empty prompt makes Ollama load without generating"""
+        with self._lock:
+            self._model_state(endpoint.url, model)["status"] = "loading"
+        started = time.perf_counter()
+        try:
+            response = endpoint.session.post(
+                f"{endpoint.url}/api/generate",
+                json={"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive_value()},
+                timeout=600
+            )
+            response.raise_for_status()
+            result = response.json()
         except Exception as e:
-            logger.warning(f"Ollama not available: {e}")
+            logger.warning(f"Failed to warm up model {model} on {endpoint.url}: {e}")
+            with self._lock:
+                state = self._model_state(endpoint.url, model)
+                state["status"] = "failed"
+                state["last_error"] = str(e)
             return False
 
-    def generate_response(self, prompt: str, system_prompt: str = None, timeout: int = 120) -> str:
-        """Generate a response using Ollama"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            state = self._model_state(endpoint.url, model)
+            state["status"] = "loaded"
+            state["loads"] += 1
+            state["last_load_ms"] = round(elapsed_ms, 1)
+            state["ollama_load_ms"] = round(result.get("load_duration", 0) / 1e6, 1)
+            state["loaded_at"] = datetime.now().isoformat()
+            state["last_error"] = None
+        logger.info(f"Model {model} warm on {endpoint.url} ({elapsed_ms:.0f} ms)")
+        return True
+
+    def refresh(self, endpoint: OllamaEndpoint) -> List[str]:
+        """Update residency from /api/ps and return configured models that are not loaded"""
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_predict": 2048
+            response = endpoint.session.get(f"{endpoint.url}/api/ps", timeout=5)
+            response.raise_for_status()
+            running = {m.get("name"): m for m in response.json().get("models", [])}
+        except Exception as e:
+            logger.debug(f"Could not query loaded models on {endpoint.url}: {e}")
+            return []
+
+        missing = []
+        now = datetime.now()
+        with self._lock:
+            for model in self.models:
+                state = self._model_state(endpoint.url, model)
+                entry = running.get(model) or running.get(f"{model}:latest")
+                if entry:
+                    state["status"] = "loaded"
+                    expires_at = _parse_ollama_time(entry.get("expires_at"))
+                    state["expires_at"] = expires_at.isoformat() if expires_at else None
+                    continue
+                if state["status"] == "loaded":
+                    state["status"] = "evicted"
+                    state["evictions"] += 1
+                    state["last_evicted_at"] = now.isoformat()
+                    state["expires_at"] = None
+                    if state["loaded_at"]:
+                        resident = now - datetime.fromisoformat(state["loaded_at"])
+                        state["last_resident_seconds"] = round(resident.total_seconds(), 1)
+                    logger.info(f"Model {model} was evicted by Ollama on {endpoint.url}")
+                if state["status"] != "loading":
+                    missing.append(model)
+        return missing
+
+    def status(self) -> Dict[str, Any]:
+        now = datetime.now().astimezone()
+        with self._lock:
+            endpoints = {
+                url: {name: dict(state) for name, state in models.items()}
+                for url, models in self._state.items()
+            }
+        for models in endpoints.values():
+            for state in models.values():
+                expires_at = _parse_ollama_time(state.get("expires_at"))
+                if expires_at and expires_at.tzinfo:
+                    state["seconds_until_eviction"] = round((expires_at - now).total_seconds(), 1)
+        return {"keep_alive": keep_alive_value(), "endpoints": endpoints}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._keep_resident())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _keep_resident(self):
+        for endpoint in self.pool.endpoints:
+            for model in self.models:
+                await asyncio.to_thread(self.warm_up, endpoint, model)
+        while True:
+            try:
+                await asyncio.sleep(OLLAMA_RESIDENCY_CHECK_SECONDS)
+                for endpoint in self.pool.endpoints:
+                    for model in await asyncio.to_thread(self.refresh, endpoint):
+                        await asyncio.to_thread(self.warm_up, endpoint, model)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error keeping models resident: {e}")
+
+
+class ModelRoute:
+    """Model and generation limits chosen for one call"""
+    def __init__(self, model: str, num_predict: int = 2048, temperature: float = 0.7, top_p: float = 0.9):
+        self.model = model
+        self.num_predict = num_predict
+        self.temperature = temperature
+        self.top_p = top_p
+
+    def options(self) -> Dict[str, Any]:
+        return {"temperature": self.temperature, "top_p": self.top_p, "num_predict": self.num_predict}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"model": self.model, **self.options()}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+class ModelRouter:
+    """Pick the model and generation limits per operation and input size.
+
+    Each operation maps to the small or large model with its own
+    ``num_predict``; prompts longer than ``large_input_chars`` always go to
+    the large model. ``AI_MODEL_ROUTES`` overrides ``model``,
+    ``num_predict``, ``temperature`` or ``top_p`` per operation; other keys
+    and values of the wrong type are logged and ignored. Latency and output
+    validity are recorded per model.
+    """
+    # operation -> (model size, num_predict, temperature)
+    DEFAULT_POLICY = {
+        "create_project_plan": ("large", 2048, 0.7),
+        "plan_tasks": ("large", 1536, 0.7),
+        "plan_milestones": ("small", 384, 0.5),
+        "plan_risks": ("small", 384, 0.5),
+        "plan_recommendations": ("small", 256, 0.7),
+        "analyze_project_progress": ("large", 1024, 0.5),
+        "replan_project": ("large", 1536, 0.5),
+        "suggest_task_breakdown": ("small", 768, 0.5),
+        "status_check": ("small", 32, 0.0),
+    }
+
+    def __init__(self, small_model: str = None, large_model: str = None,
+                 large_input_chars: int = None, overrides: Dict[str, Dict[str, Any]] = None):
+        self.small_model = small_model or OLLAMA_SMALL_MODEL
+        self.large_model = large_model or OLLAMA_LARGE_MODEL
+        self.large_input_chars = large_input_chars or AI_LARGE_INPUT_CHARS
+        self.overrides = self._clean_overrides(
+            overrides if overrides is not None else self._load_overrides(AI_MODEL_ROUTES)
+        )
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _load_overrides(raw: str) -> Dict[str, Dict[str, Any]]:
+        if not raw:
+            return {}
+        try:
+            overrides = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Ignoring invalid AI_MODEL_ROUTES: {e}")
+            return {}
+        if not isinstance(overrides, dict):
+            logger.error("Ignoring AI_MODEL_ROUTES: expected a JSON object keyed by operation")
+            return {}
+        return overrides
+
+    # Route fields an override may set, with the type each value is coerced to
+    OVERRIDE_FIELDS = {"model": str, "num_predict": int, "temperature": float, "top_p": float}
+
+    @classmethod
+    def _clean_overrides(cls, overrides: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Keep only known route fields with values of the right type"""
+        cleaned: Dict[str, Dict[str, Any]] = {}
+        for operation, fields in overrides.items():
+            if not isinstance(fields, dict):
+                logger.error(f"Ignoring AI_MODEL_ROUTES entry for {operation}: expected an object")
+                continue
+            if operation not in cls.DEFAULT_POLICY:
+                logger.warning(f"AI_MODEL_ROUTES has an entry for unknown operation {operation}")
+            route: Dict[str, Any] = {}
+            for key, value in fields.items():
+                kind = cls.OVERRIDE_FIELDS.get(key)
+                if kind is None:
+                    logger.warning(f"Ignoring unknown AI_MODEL_ROUTES field {operation}.{key}")
+                    continue
+                try:
+                    if kind is str:
+                        if not isinstance(value, str) or not value.strip():
+                            raise ValueError("expected a model name")
+                        value = value.strip()
+                    elif isinstance(value, bool):
+                        raise ValueError("expected a number")
+                    else:
+                        value = kind(value)
+                        if value < 0 or (key == "num_predict" and value == 0):
+                            raise ValueError("expected a positive number")
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Ignoring AI_MODEL_ROUTES field {operation}.{key}={value!r}: {e}")
+                    continue
+                route[key] = value
+            cleaned[operation] = route
+        return cleaned
+
+    def route(self, operation: Optional[str], prompt: str = "", system_prompt: str = None) -> ModelRoute:
+        size, num_predict, temperature = self.DEFAULT_POLICY.get(operation, ("large", 2048, 0.7))
+        input_chars = len(prompt or "") + len(system_prompt or "")
+        if size == "small" and input_chars > self.large_input_chars:
+            size = "large"
+
+        route = ModelRoute(
+            self.small_model if size == "small" else self.large_model,
+            num_predict=num_predict,
+            temperature=temperature
+        )
+        for key, value in self.overrides.get(operation, {}).items():
+            setattr(route, key, value)
+        return route
+
+    def models(self) -> List[str]:
+        """Every model a route can select, for preloading"""
+        models = [self.large_model, self.small_model]
+        models += [o["model"] for o in self.overrides.values() if isinstance(o, dict) and o.get("model")]
+        return list(dict.fromkeys(models))
+
+    def record(self, model: str, operation: Optional[str], latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            metrics = self._metrics.setdefault(model, {
+                "calls": 0, "ok": 0, "operations": {}, "latencies": deque(maxlen=500)
+            })
+            metrics["calls"] += 1
+            metrics["ok"] += 1 if ok else 0
+            op = operation or "default"
+            metrics["operations"][op] = metrics["operations"].get(op, 0) + 1
+            metrics["latencies"].append(latency_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                model: (m["calls"], m["ok"], dict(m["operations"]), list(m["latencies"]))
+                for model, m in self._metrics.items()
+            }
+        return {
+            "routes": {op: self.route(op).to_dict() for op in self.DEFAULT_POLICY},
+            "models": {
+                model: {
+                    "calls": calls,
+                    "valid_output_rate": round(ok / calls, 3) if calls else None,
+                    "operations": operations,
+                    "latency_ms_p50": _percentile(latencies, 50),
+                    "latency_ms_p95": _percentile(latencies, 95),
                 }
+                for model, (calls, ok, operations, latencies) in snapshot.items()
             }
+        }
+
+
+class AICallMetrics:
+    """Ring buffer of per-call timings and token counts, tagged by operation.
+
+    Each record holds the client-side wait before the HTTP request was sent
+    (single-flight and failover), the HTTP time, time to first token for
+    streams, and Ollama's own counters: prompt_eval_count, eval_count and
+    the load/prompt/eval/total durations. ``queue_ms`` is HTTP time not
+    accounted for by Ollama's total_duration, i.e. time the request waited
+    in Ollama's queue plus network. When a stream is closed before Ollama's
+    final chunk the server counters are missing and ``eval_tokens`` is the
+    number of streamed chunks (one token each).
+    """
+    # Ollama field (nanoseconds) -> record field (milliseconds)
+    DURATIONS = (
+        ("total_duration", "server_ms"),
+        ("load_duration", "load_ms"),
+        ("prompt_eval_duration", "prompt_eval_ms"),
+        ("eval_duration", "eval_ms"),
+    )
+    SUMMARY_FIELDS = (
+        "wait_ms", "http_ms", "ttft_ms", "queue_ms", "server_ms", "load_ms", "prompt_eval_ms", "eval_ms",
+        "prompt_tokens", "eval_tokens", "tokens_per_second",
+    )
+
+    def __init__(self, size: int = None):
+        self.size = size or AI_METRICS_BUFFER_SIZE
+        self._calls = deque(maxlen=self.size)
+        self._lock = threading.Lock()
+
+    def start(self, operation: Optional[str], model: str, entered: float = None) -> Dict[str, Any]:
+        """A new call record; ``entered`` is when the caller asked for the generation"""
+        return {
+            "operation": operation or "default",
+            "model": model,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "_entered": entered if entered is not None else time.perf_counter(),
+            "ok": False,
+        }
+
+    @staticmethod
+    def sending(call: Dict[str, Any], endpoint: "OllamaEndpoint") -> float:
+        """Mark the HTTP request as sent and return the send time"""
+        sent = time.perf_counter()
+        call["endpoint"] = endpoint.url
+        call["wait_ms"] = round((sent - call["_entered"]) * 1000, 2)
+        call["_sent"] = sent
+        return sent
+
+    @classmethod
+    def apply_server_stats(cls, call: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Copy Ollama's counters and durations from a final response chunk"""
+        for source, target in cls.DURATIONS:
+            if result.get(source) is not None:
+                call[target] = round(result[source] / 1e6, 2)
+        if result.get("prompt_eval_count") is not None:
+            call["prompt_tokens"] = result["prompt_eval_count"]
+        if result.get("eval_count") is not None:
+            call["eval_tokens"] = result["eval_count"]
+        if result.get("eval_count") and result.get("eval_duration"):
+            call["tokens_per_second"] = round(result["eval_count"] / (result["eval_duration"] / 1e9), 1)
+        call["stats_source"] = "server"
+
+    def record(self, call: Dict[str, Any]) -> None:
+        call = dict(call)
+        sent = call.pop("_sent", None)
+        entered = call.pop("_entered", None)
+        if sent is not None and "http_ms" not in call:
+            call["http_ms"] = round((time.perf_counter() - sent) * 1000, 2)
+        if entered is not None:
+            call["total_ms"] = round((time.perf_counter() - entered) * 1000, 2)
+        if "http_ms" in call and "server_ms" in call:
+            call["queue_ms"] = round(max(0.0, call["http_ms"] - call["server_ms"]), 2)
+        with self._lock:
+            self._calls.append(call)
+
+    def recent(self, limit: int = 50, operation: str = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            calls = list(self._calls)
+        if operation:
+            calls = [c for c in calls if c["operation"] == operation]
+        return calls[-limit:][::-1]
+
+    @classmethod
+    def _summarize(cls, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        summary = {
+            "calls": len(calls),
+            "errors": sum(1 for c in calls if not c["ok"]),
+        }
+        for field in cls.SUMMARY_FIELDS:
+            values = [c[field] for c in calls if c.get(field) is not None]
+            if values:
+                summary[field] = {
+                    "p50": _percentile(values, 50),
+                    "p95": _percentile(values, 95),
+                    "p99": _percentile(values, 99),
+                    "max": round(max(values), 1),
+                }
+        return summary
+
+    def summary(self, operation: str = None) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+        by_operation: Dict[str, List[Dict[str, Any]]] = {}
+        for call in calls:
+            by_operation.setdefault(call["operation"], []).append(call)
+        if operation:
+            by_operation = {operation: by_operation.get(operation, [])}
+        return {
+            "buffer": {"size": len(calls), "capacity": self.size},
+            "overall": self._summarize(calls),
+            "operations": {op: self._summarize(op_calls) for op, op_calls in sorted(by_operation.items())},
+        }
+
+
+class OllamaAI:
+    def __init__(self, base_url: str = None, model: str = None, pool: OllamaPool = None,
+                 router: ModelRouter = None):
+        if pool is None:
+            pool = OllamaPool([base_url] if base_url else OLLAMA_ENDPOINTS)
+        self.pool = pool
+        self.model = model or OLLAMA_MODEL
+        # An explicit model pins every operation to it
+        self.router = router or (ModelRouter(self.model, self.model) if model else ModelRouter())
+        self.lifecycle = ModelLifecycle(self.pool, self.router.models())
+        self.single_flight = SingleFlight()
+        self.metrics = AICallMetrics()
+        self._stats_lock = threading.Lock()
+        self._json_stats = {"requests": 0, "completed": 0, "aborted_invalid": 0, "schema_failures": 0, "errors": 0}
+
+    @property
+    def base_url(self) -> str:
+        """Primary endpoint, kept for callers that talk to a single server"""
+        return self.pool.urls[0]
+
+    def is_available(self) -> bool:
+        """Check if at least one Ollama endpoint is running and available"""
+        return self.pool.check_health()
+
+    def generate_response(self, prompt: str, system_prompt: str = None, timeout: int = 120,
+                          operation: str = None) -> str:
+        """Generate a response using Ollama.
+
+        The model and limits come from the router for ``operation``. Identical
+        concurrent requests (same normalized prompt, model and options) share
+        one generation.
+        """
+        entered = time.perf_counter()
+        route = self.router.route(operation, prompt, system_prompt)
+        payload = {
+            "model": route.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": keep_alive_value(),
+            "options": route.options()
+        }
 
-            if system_prompt:
-                payload["system"] = system_prompt
+        if system_prompt:
+            payload["system"] = system_prompt
 
-            logger.info(f"Sending request to Ollama with model: {self.model}")
+        return self.single_flight.do(
+            request_key(payload),
+            lambda: self._post_generate(payload, timeout, operation, entered)
+        )
 
-            response = requests.post(
-                f"{self.base_url}/api/generate",
+    def generate_json(self, prompt: str, system_prompt: str = None, schema: Dict[str, Any] = None,
+                      timeout: int = 120, operation: str = None) -> Optional[Dict[str, Any]]:
+        """Generate a JSON object constrained by a schema.
+
+        The schema is passed to Ollama's structured output ``format`` option and
+        the streamed output is validated as it arrives; the generation is
+        aborted as soon as it can no longer parse. Returns None when no valid
+        object could be produced so callers can fall back.
+        """
+        entered = time.perf_counter()
+        route = self.router.route(operation, prompt, system_prompt)
+        payload = {
+            "model": route.model,
+            "prompt": prompt,
+            "stream": True,
+            "format": self._json_format(schema),
+            "keep_alive": keep_alive_value(),
+            "options": route.options()
+        }
+
+        if system_prompt:
+            payload["system"] = system_prompt
+
+        def run():
+            started = time.perf_counter()
+            call = self.metrics.start(operation, route.model, entered)
+            data = self._stream_json(payload, schema, timeout, call)
+            call["ok"] = data is not None
+            self.metrics.record(call)
+            self.router.record(route.model, operation, (time.perf_counter() - started) * 1000, data is not None)
+            return data
+
+        return self.single_flight.do(request_key(payload), run)
+
+    def embed(self, texts: List[str], model: str = None, timeout: int = 60) -> Optional[List[List[float]]]:
+        """Embed texts with Ollama's embeddings endpoint; None if it failed.
+
+        Uses the batched /api/embed and falls back to one /api/embeddings
+        call per text on servers that predate it.
+        """
+        model = model or OLLAMA_EMBED_MODEL
+        call = self.metrics.start("embed", model)
+
+        def send(endpoint: OllamaEndpoint) -> Optional[List[List[float]]]:
+            self.metrics.sending(call, endpoint)
+            response = endpoint.session.post(
+                f"{endpoint.url}/api/embed",
+                json={"model": model, "input": texts, "keep_alive": keep_alive_value()},
+                timeout=timeout
+            )
+            if response.status_code == 200:
+                result = response.json()
+                self.metrics.apply_server_stats(call, result)
+                return result.get("embeddings")
+            if response.status_code != 404:
+                logger.error(f"Ollama embed error: {response.status_code} - {response.text}")
+                return None
+
+            embeddings = []
+            for text in texts:
+                response = endpoint.session.post(
+                    f"{endpoint.url}/api/embeddings",
+                    json={"model": model, "prompt": text, "keep_alive": keep_alive_value()},
+                    timeout=timeout
+                )
+                if response.status_code != 200:
+                    logger.error(f"Ollama embeddings error: {response.status_code} - {response.text}")
+                    return None
+                embeddings.append(response.json().get("embedding"))
+            return embeddings
+
+        try:
+            embeddings = self.pool.request(send)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error requesting embeddings from Ollama: {e}")
+            embeddings = None
+        ok = bool(embeddings) and len(embeddings) == len(texts) and all(embeddings)
+        call["ok"] = ok
+        self.metrics.record(call)
+        return embeddings if ok else None
+
+    def _json_format(self, schema: Optional[Dict[str, Any]]) -> Any:
+        if OLLAMA_JSON_FORMAT == "schema" and schema:
+            return schema
+        return "json"
+
+    def structured_output_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._json_stats)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._json_stats[key] += 1
+
+    def _stream_json(self, payload: Dict[str, Any], schema: Optional[Dict[str, Any]],
+                     timeout: int, call: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stream a generation, validating incrementally and aborting on invalid output"""
+        self._count("requests")
+        try:
+            validator = self.pool.request(lambda endpoint: self._stream_from(endpoint, payload, timeout, call))
+        except requests.exceptions.Timeout:
+            logger.error(f"Ollama request timed out after {timeout} seconds")
+            self._count("errors")
+            return None
+        except requests.exceptions.ConnectionError:
+            logger.error("Cannot connect to Ollama service")
+            self._count("errors")
+            return None
+        except Exception as e:
+            logger.error(f"Error calling Ollama: {e}")
+            self._count("errors")
+            return None
+
+        if validator is None:
+            return None
+
+        if not validator.complete:
+            logger.warning(f"Ollama output ended before the JSON document was complete ({len(validator.text)} characters)")
+            self._count("aborted_invalid")
+            return None
+
+        data = json.loads(validator.text)
+        # Missing keys are filled with defaults by the callers, so only wrong
+        # types (which would break them) reject the output.
+        errors = validate_schema(data, schema, check_required=False) if schema else []
+        if errors:
+            logger.warning(f"Ollama output does not match schema: {'; '.join(errors[:5])}")
+            self._count("schema_failures")
+            return None
+
+        self._count("completed")
+        logger.info(f"Received structured response from Ollama: {len(validator.text)} characters")
+        return data
+
+    def _stream_from(self, endpoint: OllamaEndpoint, payload: Dict[str, Any],
+                     timeout: int, call: Dict[str, Any]) -> Optional[IncrementalJSONValidator]:
+        """Stream one generation from an endpoint into a validator; None if it was rejected"""
+        logger.info(f"Sending structured request to Ollama at {endpoint.url} with model: {payload['model']}")
+        self.lifecycle.mark_used(endpoint.url, payload["model"])
+        validator = IncrementalJSONValidator()
+        sent = self.metrics.sending(call, endpoint)
+        chunks = 0
+        trailing = 0
+
+        # Leaving the with-block closes the connection, which makes Ollama
+        # stop generating tokens for this request.
+        with endpoint.session.post(
+            f"{endpoint.url}/api/generate",
+            json=payload,
+            stream=True,
+            timeout=timeout
+        ) as response:
+            if response.status_code != 200:
+                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                self._count("errors")
+                return None
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                chunks += 1
+                if chunks == 1:
+                    call["ttft_ms"] = round((time.perf_counter() - sent) * 1000, 2)
+                call["eval_tokens"] = chunks
+                call["stats_source"] = "client"
+                if chunk.get("done"):
+                    self.metrics.apply_server_stats(call, chunk)
+                if chunk.get("error"):
+                    logger.error(f"Ollama stream error: {chunk['error']}")
+                    self._count("errors")
+                    return None
+
+                if not validator.complete:
+                    try:
+                        validator.feed(chunk.get("response", ""))
+                    except JSONStreamError as e:
+                        logger.warning(f"Aborting generation, output is not valid JSON: {e}")
+                        self._count("aborted_invalid")
+                        return None
+                elif chunk.get("response", "").strip():
+                    # The document is complete; keep reading up to the final
+                    # chunk with the server timings, unless the model rambles on
+                    trailing += 1
+                    if trailing > MAX_TRAILING_CHUNKS:
+                        logger.warning("Closing stream: generation continued after the JSON document ended")
+                        break
+
+                if chunk.get("done"):
+                    break
+
+        call["http_ms"] = round((time.perf_counter() - sent) * 1000, 2)
+        return validator
+
+    def _post_generate(self, payload: Dict[str, Any], timeout: int, operation: str = None,
+                       entered: float = None) -> str:
+        """Send a single generate request to the least-loaded Ollama endpoint"""
+        call = self.metrics.start(operation, payload["model"], entered)
+
+        def send(endpoint: OllamaEndpoint):
+            logger.info(f"Sending request to Ollama at {endpoint.url} with model: {payload['model']}")
+            self.lifecycle.mark_used(endpoint.url, payload["model"])
+            self.metrics.sending(call, endpoint)
+            return endpoint.session.post(
+                f"{endpoint.url}/api/generate",
                 json=payload,
                 timeout=timeout
             )
 
+        started = time.perf_counter()
+        try:
+            response = self.pool.request(send)
+            self.router.record(payload["model"], operation, (time.perf_counter() - started) * 1000,
+                               response.status_code == 200)
+
             if response.status_code == 200:
                 result = response.json()
+                self.metrics.apply_server_stats(call, result)
+                call["ok"] = True
                 ai_response = result.get("response", "")
                 logger.info(f"Received response from Ollama: {len(ai_response)} characters")
                 return ai_response
@@ -75,6 +1201,9 @@ class OllamaAI:
         except Exception as e:
             logger.error(f"Error calling Ollama: {e}")
             return "AI service temporarily unavailable"
+        finally:
+            self.metrics.record(call)
 
 # Global AI instance
-ollama_ai = OllamaAI()
\ No newline at end of file
+ollama_ai = OllamaAI()
+model_lifecycle = ollama_ai.lifecycle
@@ -10,9 +10,12 @@ from backend.database import engine
 from backend.models import models
 from backend.routes import projects, tasks
 from backend.dependencies import get_db
-from backend.routes import devlogs, reminders, uploads, ai_planning, events
+from backend.routes import devlogs, reminders, uploads, ai_planning, events, admin, notifications
 from backend.models.models import Project, Reminder, Attachment, Event
 from backend.services.scheduler import scheduler
+from backend.services.plan_index import plan_index
+from ai import model_lifecycle
+from config import config
 
 from sqlalchemy.orm import Session
 from fastapi import Depends
@@ -21,9 +24,14 @@ from fastapi import Depends
 async def lifespan(app: FastAPI):
     # Startup
     await scheduler.start()
+    if config.OLLAMA_WARMUP_ON_STARTUP:
+        await model_lifecycle.start()
     yield
     # Shutdown
+    await model_lifecycle.stop()
     await scheduler.stop()
+    # Vectors added since the last periodic save
+    plan_index.flush()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -43,6 +51,8 @@ app.include_router(reminders.router)
 app.include_router(uploads.router)
 app.include_router(ai_planning.router)
 app.include_router(events.router)
+app.include_router(admin.router)
+app.include_router(notifications.router)
 
 # Initialize DB
 models.Base.metadata.create_all(bind=engine)
@@ -1,5 +1,5 @@
 # backend/models/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 from datetime import datetime
@@ -36,6 +36,7 @@ class Task(Base):
     order_index = Column(Integer, default=0)
     skills_required = Column(JSON, nullable=True)  # List of required skills
     dependencies = Column(JSON, nullable=True)  # List of task dependencies
+    dependency_ids = Column(JSON, nullable=True)  # Dependencies resolved to task ids
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.now)
@@ -47,6 +48,10 @@ class Task(Base):
     # Self-referential relationship for subtasks
     subtasks = relationship("Task", backref="parent_task", remote_side=[id])
 
+    __table_args__ = (
+        Index("ix_tasks_completed_deadline", "completed", "deadline"),
+    )
+
 
 
 class TimeLog(Base):
@@ -67,12 +72,27 @@ class Devlog(Base):
 
     project = relationship("Project", backref="devlogs")
 
+    __table_args__ = (
+        Index("ix_devlogs_project_created", "project_id", "created_at"),
+    )
+
 class Reminder(Base):
     __tablename__ = "reminders"
     id = Column(Integer, primary_key=True)
     message = Column(String)
     due_date = Column(DateTime)
     sent = Column(Boolean, default=False)
+    # Generated reminders are owned by a project; kind + period_key identify
+    # e.g. the weekly progress reminder ("progress", "2026-W42"). Manual
+    # reminders leave them NULL and are never deduplicated.
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
+    kind = Column(String, nullable=True)
+    period_key = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reminders_sent_due", "sent", "due_date"),
+        Index("ux_reminders_project_kind_period", "project_id", "kind", "period_key", unique=True),
+    )
 
 
 class Attachment(Base):
@@ -151,6 +171,75 @@ class ScheduleAdjustment(Base):
     task = relationship("Task", backref="schedule_adjustments")
 
 
+class ProjectAnalysis(Base):
+    __tablename__ = "project_analyses"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+    version = Column(Integer, default=1)  # Increments per project
+    state_key = Column(String)  # Fingerprint of the project state the analysis was made from
+    analysis = Column(JSON)
+    created_at = Column(DateTime, default=datetime.now)
+
+    project = relationship("Project", backref="analyses")
+
+    __table_args__ = (
+        Index("ix_project_analyses_project_state", "project_id", "state_key"),
+        Index("ux_project_analyses_project_version", "project_id", "version", unique=True),
+    )
+
+
+class ProjectInsightSnapshot(Base):
+    __tablename__ = "project_insight_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    analysis_id = Column(Integer, ForeignKey("project_analyses.id"), nullable=True)
+    insights = Column(JSON)  # Same structure as /ai/project-insights, plus the analysis
+    created_at = Column(DateTime, default=datetime.now)
+
+    project = relationship("Project", backref="insight_snapshots")
+
+
+class ScheduledJobState(Base):
+    """Last run of each cron job, so restarts neither repeat nor silently skip runs"""
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    cron = Column(String)
+    last_scheduled_for = Column(DateTime, nullable=True)  # Cron time of the last run started
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_status = Column(String, nullable=True)  # running, ok, error, timeout, skipped
+    last_error = Column(Text, nullable=True)
+    next_run_at = Column(DateTime, nullable=True)
+    run_count = Column(Integer, default=0)
+
+
+class NotificationDeadLetter(Base):
+    """A reminder notification that still failed after every retry"""
+    __tablename__ = "notification_dead_letters"
+
+    id = Column(Integer, primary_key=True)
+    reminder_id = Column(Integer, ForeignKey("reminders.id", ondelete="SET NULL"), nullable=True, index=True)
+    channel = Column(String)  # log, smtp, webhook, sse
+    message = Column(String)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class SchedulerLease(Base):
+    """Lease held by the one worker process that runs the scheduler"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)  # host:pid:nonce of the leader
+    acquired_at = Column(DateTime, nullable=True)
+    renewed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # UTC
+
+
 class Event(Base):
     __tablename__ = "events"
 
@@ -180,3 +269,7 @@ class Event(Base):
     # Relationships
     project = relationship("Project", backref="events")
     task = relationship("Task", backref="events")
+
+    __table_args__ = (
+        Index("ix_events_completed_start", "completed", "start_time"),
+    )
@@ -53,6 +53,9 @@ class ReminderCreate(ReminderBase): pass
 class Reminder(ReminderBase):
     id: int
     sent: bool
+    project_id: Optional[int] = None
+    kind: Optional[str] = None
+    period_key: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
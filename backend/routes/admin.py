@@ -0,0 +1,54 @@
+# backend/routes/admin.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from backend.services.job_executor import job_executor, job_run_log, loop_lag_monitor
+from backend.services.reminder_dispatcher import reminder_dispatcher
+from backend.services.deadline_watcher import deadline_watcher
+from backend.services.scheduler import scheduler
+from backend.services.leader_election import leader_elector
+
+router = APIRouter()
+
+@router.get("/admin/scheduler")
+async def scheduler_status(window_seconds: float = 300):
+    """Event-loop lag over the last window, cron jobs, scheduler job pool, reminder and deadline queues"""
+    next_due = reminder_dispatcher.next_due()
+    return JSONResponse({
+        "worker": leader_elector.holder_id,
+        "is_leader": scheduler.is_leader,
+        "loop_lag": loop_lag_monitor.summary(window_seconds),
+        "cron_jobs": scheduler.job_status(),
+        "jobs": job_executor.stats(),
+        "reminders": {
+            "queued": len(reminder_dispatcher),
+            "next_due": next_due.isoformat() if next_due else None,
+        },
+        "deadlines": deadline_watcher.status(),
+    })
+
+@router.get("/admin/jobs")
+async def job_runs(recent: int = 10):
+    """Per scheduler job: run and error counts, percentile duration and lag, and the latest runs"""
+    return JSONResponse({
+        "worker": leader_elector.holder_id,
+        "is_leader": scheduler.is_leader,
+        "jobs": job_run_log.summary(max(0, recent)),
+    })
+
+@router.get("/admin/jobs/{name}")
+async def job_run_history(name: str, limit: int = 50):
+    """Latest recorded runs of one scheduler job, newest first"""
+    if name not in job_run_log:
+        raise HTTPException(status_code=404, detail="No runs recorded for this job")
+    return JSONResponse({"job": name, "runs": job_run_log.runs(name, max(0, limit))})
+
+@router.get("/admin/scheduler/leader")
+async def scheduler_leader():
+    """Which worker holds the scheduler lease, and whether it is this one"""
+    lease = await run_in_threadpool(leader_elector.lease)
+    return JSONResponse({
+        "worker": leader_elector.holder_id,
+        "is_leader": scheduler.is_leader,
+        "lease": lease,
+    })
@@ -1,14 +1,26 @@
 # backend/routes/ai_planning.py
-from fastapi import APIRouter, Depends, Form, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
 from backend.models import models
 from backend.dependencies import get_db
 from backend.services.ai_planning_service import ai_planning_service
+from backend.services.plan_import import plan_importer, PlanValidationError
+from backend.services.insights_service import insights_service
+from backend.services.template_planner import template_planner
+from backend.services.plan_index import plan_index
 from typing import Optional
 import json
 from datetime import datetime, timedelta
 
+try:
+    from config import config
+    AI_PLAN_MODE = config.AI_PLAN_MODE
+except ImportError:
+    # Fallback if config is not available
+    AI_PLAN_MODE = "single"
+
 router = APIRouter()
 
 @router.get("/ai/status")
@@ -17,7 +29,8 @@ async def ai_status():
     try:
         from ai import ollama_ai
 
-        if not ollama_ai.is_available():
+        # The health probe is a blocking HTTP call; keep it off the event loop
+        if not await run_in_threadpool(ollama_ai.is_available):
             return JSONResponse({
                 "status": "unavailable",
                 "message": "Ollama service is not running",
@@ -25,16 +38,22 @@ async def ai_status():
             })
 
         # Test a simple response
-        test_response = ollama_ai.generate_response(
+        test_response = await run_in_threadpool(
+            ollama_ai.generate_response,
             "Respond with exactly: {'test': 'success'}",
-            "You must respond with valid JSON only."
+            "You must respond with valid JSON only.",
+            operation="status_check"
         )
 
         return JSONResponse({
             "status": "available",
             "message": "AI service is working",
             "available": True,
-            "test_response": test_response[:100] + "..." if len(test_response) > 100 else test_response
+            "test_response": test_response[:100] + "..." if len(test_response) > 100 else test_response,
+            "single_flight": ollama_ai.single_flight.stats(),
+            "structured_output": ollama_ai.structured_output_stats(),
+            "endpoints": ollama_ai.pool.status(),
+            "models": ollama_ai.router.stats()
         })
 
     except Exception as e:
@@ -44,19 +63,50 @@ async def ai_status():
             "available": False
         })
 
+@router.get("/ai/model-status")
+async def model_status():
+    """Model load state, load times and eviction timings"""
+    from ai import model_lifecycle
+
+    return JSONResponse(model_lifecycle.status())
+
+@router.get("/ai/metrics")
+async def ai_metrics(operation: Optional[str] = None, recent: int = 0):
+    """Latency and token percentiles of recent AI calls per operation"""
+    from ai import ollama_ai
+
+    metrics = ollama_ai.metrics.summary(operation)
+    if recent > 0:
+        metrics["recent"] = ollama_ai.metrics.recent(recent, operation)
+    return JSONResponse(metrics)
+
 @router.post("/ai/create-project-plan")
 async def create_ai_project_plan(
+    background_tasks: BackgroundTasks,
     project_description: str = Form(...),
     project_title: str = Form(""),
+    plan_mode: str = Form(""),
     db: Session = Depends(get_db)
 ):
-    """Create a new project with AI-generated plan"""
+    """Create a new project with AI-generated plan.
+
+    In "fast" mode the project is created from the template plan right away
+    and the model-generated plan replaces it in the background.
+    """
     try:
-        # Generate AI plan
-        plan_data = ai_planning_service.create_project_plan(
-            project_description, 
-            project_title if project_title else None
-        )
+        fast = (plan_mode or AI_PLAN_MODE) == "fast"
+        if fast:
+            plan_data = template_planner.plan(project_description, project_title or None)
+        else:
+            # Generate AI plan
+            # Run the AI call off the event loop; the request session is not
+            # used (and holds no connection) until the plan is stored below
+            plan_data = await run_in_threadpool(
+                ai_planning_service.create_project_plan,
+                project_description, 
+                project_title if project_title else None,
+                mode=plan_mode or None
+            )
         
         if "error" in plan_data:
             return JSONResponse(
@@ -64,70 +114,37 @@ async def create_ai_project_plan(
                 content={"error": plan_data["error"]}
             )
         
-        # Create project
-        project = models.Project(
-            title=plan_data.get("project_title", project_title or "AI Generated Project"),
-            description=plan_data.get("project_description", project_description)
-        )
-        db.add(project)
-        db.flush()  # Get the project ID
-        
-        # Save the AI plan
-        project_plan = models.ProjectPlan(
-            project_id=project.id,
-            ai_generated=True,
-            plan_data=plan_data,
-            estimated_duration_weeks=plan_data.get("estimated_duration_weeks", 4),
-            difficulty_level=plan_data.get("difficulty_level", "intermediate")
+        # Validate and store the project, plan, tasks, milestones and risks
+        # with bulk inserts in one transaction
+        result = plan_importer.import_project_plan(
+            db, plan_data, project_title or None, project_description
         )
-        db.add(project_plan)
-        
-        # Create tasks from AI plan
-        if "tasks" in plan_data:
-            for i, task_data in enumerate(plan_data["tasks"]):
-                task = models.Task(
-                    title=task_data.get("title", f"Task {i+1}"),
-                    description=task_data.get("description", ""),
-                    project_id=project.id,
-                    estimated_hours=task_data.get("estimated_hours", 4),
-                    priority=task_data.get("priority", "medium"),
-                    ai_generated=True,
-                    order_index=i,
-                    skills_required=task_data.get("skills_required", []),
-                    dependencies=task_data.get("dependencies", [])
-                )
-                db.add(task)
-        
-        # Create milestones
-        if "milestones" in plan_data:
-            for milestone_data in plan_data["milestones"]:
-                milestone = models.ProjectMilestone(
-                    project_id=project.id,
-                    name=milestone_data.get("name", "Milestone"),
-                    description=milestone_data.get("description", ""),
-                    target_week=milestone_data.get("week", 1)
-                )
-                db.add(milestone)
-        
-        # Create risks
-        if "risks" in plan_data:
-            for risk_data in plan_data["risks"]:
-                risk = models.ProjectRisk(
-                    project_id=project.id,
-                    risk_description=risk_data.get("risk", ""),
-                    impact_level=risk_data.get("impact", "medium"),
-                    mitigation_strategy=risk_data.get("mitigation", "")
-                )
-                db.add(risk)
-        
-        db.commit()
+        if fast:
+            background_tasks.add_task(
+                ai_planning_service.refine_project_plan,
+                result["project_id"], project_description, project_title or None
+            )
+        else:
+            # Make the plan available as an example for similar future projects
+            background_tasks.add_task(
+                plan_index.add_plan, result["plan_id"], project_title or None, project_description, plan_data
+            )
         
         return JSONResponse({
             "success": True,
-            "project_id": project.id,
-            "plan_data": plan_data
+            "project_id": result["project_id"],
+            "plan_data": plan_data,
+            "refinement": "pending" if fast else None,
+            "unresolved_dependencies": result["unresolved_dependencies"],
+            "timings": result["timings"]
         })
         
+    except PlanValidationError as e:
+        db.rollback()
+        return JSONResponse(
+            status_code=422,
+            content={"error": "AI plan failed validation", "details": e.errors}
+        )
     except Exception as e:
         db.rollback()
         return JSONResponse(
@@ -138,11 +155,14 @@ async def create_ai_project_plan(
 @router.post("/ai/analyze-project/{project_id}")
 async def analyze_project_progress(
     project_id: int,
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Analyze project progress using AI"""
+    """Analyze project progress using AI, reusing the stored analysis if nothing changed"""
     try:
-        analysis = ai_planning_service.analyze_project_progress(project_id)
+        analysis = await run_in_threadpool(
+            ai_planning_service.analyze_project_progress, project_id, reuse=not refresh
+        )
         return JSONResponse(analysis)
     except Exception as e:
         return JSONResponse(
@@ -154,27 +174,20 @@ async def analyze_project_progress(
 async def auto_adjust_schedule(
     project_id: int,
     delay_reason: str = Form(""),
+    snapshot_id: Optional[int] = Form(None),
     db: Session = Depends(get_db)
 ):
-    """Automatically adjust project schedule based on AI analysis"""
+    """Automatically adjust project schedule based on AI analysis.
+
+    Pass the snapshot_id returned by /ai/analyze-project to apply that
+    analysis without regenerating it.
+    """
     try:
-        result = ai_planning_service.auto_adjust_schedule(project_id, delay_reason)
-        
-        if result.get("success") and result.get("adjustments_made"):
-            # Log the schedule adjustments
-            for adjustment in result["adjustments_made"]:
-                schedule_adj = models.ScheduleAdjustment(
-                    project_id=project_id,
-                    adjustment_reason=delay_reason or "AI-suggested adjustment",
-                    old_deadline=datetime.fromisoformat(adjustment["old_deadline"]) if adjustment["old_deadline"] else None,
-                    new_deadline=datetime.fromisoformat(adjustment["new_deadline"]),
-                    ai_suggested=True,
-                    applied=True
-                )
-                db.add(schedule_adj)
-            
-            db.commit()
-        
+        # The service records ScheduleAdjustment rows in the same transaction
+        # that moves the deadlines
+        result = await run_in_threadpool(
+            ai_planning_service.auto_adjust_schedule, project_id, delay_reason, snapshot_id
+        )
         return JSONResponse(result)
         
     except Exception as e:
@@ -183,6 +196,31 @@ async def auto_adjust_schedule(
             content={"error": f"Failed to adjust schedule: {str(e)}"}
         )
 
+@router.post("/ai/replan-project/{project_id}")
+async def replan_project(
+    project_id: int,
+    project_description: Optional[str] = Form(None),
+    instructions: str = Form("")
+):
+    """Regenerate only the unfinished part of a project's plan.
+
+    Completed tasks are kept as they are; open tasks are updated, added or
+    removed in place, so task ids, time logs and deadlines survive.
+    """
+    try:
+        result = await run_in_threadpool(
+            ai_planning_service.replan_project, project_id, project_description, instructions
+        )
+        if result.get("error") == "Project not found":
+            return JSONResponse(status_code=404, content=result)
+        return JSONResponse(result)
+
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Failed to re-plan project: {str(e)}"}
+        )
+
 @router.post("/ai/break-down-task")
 async def break_down_task(
     task_description: str = Form(...),
@@ -192,7 +230,8 @@ async def break_down_task(
 ):
     """Break down a complex task into subtasks using AI"""
     try:
-        breakdown = ai_planning_service.suggest_task_breakdown(
+        breakdown = await run_in_threadpool(
+            ai_planning_service.suggest_task_breakdown,
             task_description, 
             project_context
         )
@@ -205,106 +244,55 @@ async def break_down_task(
         
         # If project_id is provided, create the subtasks
         if project_id and "subtasks" in breakdown:
-            # Create parent task first
-            parent_task = models.Task(
-                title=breakdown.get("original_task", task_description),
-                description=f"Parent task broken down by AI. Total estimated hours: {breakdown.get('estimated_total_hours', 0)}",
-                project_id=project_id,
-                estimated_hours=breakdown.get("estimated_total_hours", 0),
-                ai_generated=True
-            )
-            db.add(parent_task)
-            db.flush()
-            
-            # Create subtasks
-            for subtask_data in breakdown["subtasks"]:
-                subtask = models.Task(
-                    title=subtask_data.get("title", "Subtask"),
-                    description=subtask_data.get("description", ""),
-                    project_id=project_id,
-                    parent_task_id=parent_task.id,
-                    estimated_hours=subtask_data.get("estimated_hours", 1),
-                    order_index=subtask_data.get("order", 0),
-                    ai_generated=True,
-                    skills_required=subtask_data.get("skills_needed", []),
-                    dependencies=subtask_data.get("dependencies", [])
-                )
-                db.add(subtask)
-            
-            db.commit()
-            breakdown["parent_task_id"] = parent_task.id
+            result = plan_importer.import_subtasks(db, project_id, breakdown, task_description)
+            breakdown["parent_task_id"] = result["parent_task_id"]
+            breakdown["timings"] = result["timings"]
         
         return JSONResponse(breakdown)
         
+    except PlanValidationError as e:
+        db.rollback()
+        return JSONResponse(
+            status_code=422,
+            content={"error": "AI breakdown failed validation", "details": e.errors}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"error": f"Failed to break down task: {str(e)}"}
         )
 
+@router.get("/ai/analyze-project/{project_id}")
+async def get_latest_analysis(project_id: int):
+    """Latest stored analysis for a project, without running the model"""
+    analysis = await run_in_threadpool(ai_planning_service.get_analysis_snapshot, project_id)
+    if analysis is None:
+        return JSONResponse(status_code=404, content={"error": "No analysis stored for this project yet"})
+    created_at = datetime.fromisoformat(analysis["snapshot_created_at"])
+    analysis["snapshot_age_seconds"] = round((datetime.now() - created_at).total_seconds())
+    return JSONResponse(analysis)
+
 @router.get("/ai/project-insights/{project_id}")
 async def get_project_insights(
     project_id: int,
+    refresh: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get comprehensive AI insights for a project"""
+    """Get comprehensive AI insights for a project.
+
+    Answers from the last precomputed snapshot (with its age); refresh=true
+    recomputes the insights and the model analysis now.
+    """
     try:
-        project = db.query(models.Project).filter(models.Project.id == project_id).first()
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        # Get project plan if exists
-        project_plan = db.query(models.ProjectPlan).filter(
-            models.ProjectPlan.project_id == project_id
-        ).first()
-        
-        # Get milestones
-        milestones = db.query(models.ProjectMilestone).filter(
-            models.ProjectMilestone.project_id == project_id
-        ).all()
-        
-        # Get risks
-        risks = db.query(models.ProjectRisk).filter(
-            models.ProjectRisk.project_id == project_id
-        ).all()
-        
-        # Get recent schedule adjustments
-        adjustments = db.query(models.ScheduleAdjustment).filter(
-            models.ScheduleAdjustment.project_id == project_id
-        ).order_by(models.ScheduleAdjustment.created_at.desc()).limit(5).all()
-        
-        insights = {
-            "project": {
-                "id": project.id,
-                "title": project.title,
-                "description": project.description
-            },
-            "plan": project_plan.plan_data if project_plan else None,
-            "milestones": [
-                {
-                    "name": m.name,
-                    "description": m.description,
-                    "target_week": m.target_week,
-                    "completed": m.completed
-                } for m in milestones
-            ],
-            "risks": [
-                {
-                    "description": r.risk_description,
-                    "impact": r.impact_level,
-                    "mitigation": r.mitigation_strategy,
-                    "status": r.status
-                } for r in risks
-            ],
-            "recent_adjustments": [
-                {
-                    "reason": a.adjustment_reason,
-                    "old_deadline": a.old_deadline.isoformat() if a.old_deadline else None,
-                    "new_deadline": a.new_deadline.isoformat() if a.new_deadline else None,
-                    "date": a.created_at.isoformat()
-                } for a in adjustments
-            ]
-        }
+        if not refresh:
+            snapshot = insights_service.latest_snapshot(db, project_id)
+            if snapshot:
+                return JSONResponse(snapshot)
+
+        # No snapshot yet, or an explicit refresh: only refresh runs the model
+        insights = await run_in_threadpool(insights_service.precompute, project_id, refresh)
+        if insights is None:
+            return JSONResponse(status_code=404, content={"error": "Project not found"})
         
         return JSONResponse(insights)
         
@@ -0,0 +1,52 @@
+# backend/routes/notifications.py
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from backend.models import models
+from backend.dependencies import get_db
+from backend.services.notifications import notification_broadcaster
+
+router = APIRouter()
+
+# Comment line sent when idle so proxies keep the stream open
+SSE_KEEPALIVE_SECONDS = 15
+
+@router.get("/notifications/stream")
+async def notification_stream(request: Request):
+    """Server-sent events for reminders as they fall due (the sse notification channel)"""
+    queue = notification_broadcaster.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: reminder\ndata: {json.dumps(event)}\n\n"
+        finally:
+            notification_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/notifications/dead-letters")
+def list_dead_letters(limit: int = 100, db: Session = Depends(get_db)):
+    """Notifications that failed on every retry, newest first"""
+    rows = db.query(models.NotificationDeadLetter).order_by(
+        models.NotificationDeadLetter.id.desc()
+    ).limit(limit).all()
+    return JSONResponse({"dead_letters": [
+        {
+            "id": row.id,
+            "reminder_id": row.reminder_id,
+            "channel": row.channel,
+            "message": row.message,
+            "error": row.error,
+            "attempts": row.attempts,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+        for row in rows
+    ]})
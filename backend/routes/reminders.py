@@ -6,6 +6,7 @@ from datetime import datetime, timedelta, timezone
 from backend.models import models
 from backend.dependencies import get_db
 from backend.services.reminder_service import reminder_service
+from backend.services.reminder_dispatcher import reminder_dispatcher
 from typing import Optional
 
 router = APIRouter()
@@ -20,6 +21,7 @@ def create_reminder(
     reminder = models.Reminder(message=message, due_date=parsed_due)
     db.add(reminder)
     db.commit()
+    reminder_dispatcher.schedule(reminder.id, reminder.due_date)
     return RedirectResponse("/", status_code=303)
 
 @router.post("/reminders/auto-generate")
@@ -28,11 +30,17 @@ def auto_generate_reminders(
 ):
     """Manually trigger auto-generation of reminders"""
     try:
-        reminder_service.auto_generate_progress_reminders(project_id)
-        return JSONResponse({"status": "success", "message": "Auto-generated reminders created"})
+        created = reminder_service.auto_generate_progress_reminders(project_id)
+        return JSONResponse({"status": "success", "message": "Auto-generated reminders created", "created": created})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reminders/generate-content")
+def generate_all_social_content():
+    """Generate social media content for every project in one batch"""
+    contents = reminder_service.generate_all_social_content()
+    return JSONResponse({"contents": {str(project_id): content for project_id, content in contents.items()}})
+
 @router.get("/reminders/generate-content/{project_id}")
 def generate_social_content(
     project_id: int,
@@ -63,11 +71,14 @@ def quick_create_reminder(
     reminder = models.Reminder(
         message=f"Share update: {project.title}",
         due_date=due_date,
-        sent=False
+        sent=False,
+        project_id=project.id,
+        kind="manual"
     )
 
     db.add(reminder)
     db.commit()
+    reminder_dispatcher.schedule(reminder.id, reminder.due_date)
 
     return RedirectResponse("/", status_code=303)
 
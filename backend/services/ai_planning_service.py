@@ -1,28 +1,251 @@
 # backend/services/ai_planning_service.py
 import json
+import time
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal
-from backend.models.models import Project, Task, Devlog, TimeLog
+from backend.database import SessionLocal, session_scope
+from backend.models.models import (
+    Project, Task, Devlog, TimeLog, ScheduleAdjustment, ProjectAnalysis, ProjectPlan, ProjectMilestone
+)
+from backend.services.context_builder import project_context_builder, compact_json
+from backend.services.title_index import TaskTitleIndex
+from backend.services.template_planner import template_planner
+from backend.services.plan_import import plan_importer, _PhaseTimer
+from backend.services.plan_index import plan_index
 from ai import ollama_ai
 
+try:
+    from config import config
+    AI_PLAN_MODE = config.AI_PLAN_MODE
+    AI_PLAN_SECTION_WORKERS = config.AI_PLAN_SECTION_WORKERS
+    PLAN_INDEX_TOP_K = config.PLAN_INDEX_TOP_K
+    PLAN_INDEX_MIN_SIMILARITY = config.PLAN_INDEX_MIN_SIMILARITY
+    PLAN_REUSE_SIMILARITY = config.PLAN_REUSE_SIMILARITY
+except ImportError:
+    # Fallback if config is not available
+    AI_PLAN_MODE = "single"
+    AI_PLAN_SECTION_WORKERS = 3
+    PLAN_INDEX_TOP_K = 2
+    PLAN_INDEX_MIN_SIMILARITY = 0.75
+    PLAN_REUSE_SIMILARITY = 0.97
+
 logger = logging.getLogger(__name__)
 
+# JSON schemas passed to Ollama's structured output so generations match the
+# structures the planning methods below expect.
+PLAN_TASK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "estimated_hours": {"type": "number"},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "dependencies": {"type": "array", "items": {"type": "string"}},
+        "skills_required": {"type": "array", "items": {"type": "string"}},
+        "deliverables": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["title", "description", "estimated_hours", "priority"]
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "project_title": {"type": "string"},
+        "project_description": {"type": "string"},
+        "estimated_duration_weeks": {"type": "integer"},
+        "difficulty_level": {"type": "string", "enum": ["beginner", "intermediate", "advanced"]},
+        "tasks": {"type": "array", "items": PLAN_TASK_SCHEMA},
+        "milestones": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"},
+                    "week": {"type": "integer"},
+                    "tasks_included": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["name", "week"]
+            }
+        },
+        "risks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "risk": {"type": "string"},
+                    "impact": {"type": "string", "enum": ["high", "medium", "low"]},
+                    "mitigation": {"type": "string"}
+                },
+                "required": ["risk", "impact", "mitigation"]
+            }
+        },
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["tasks"]
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_health": {"type": "string", "enum": ["good", "concerning", "critical"]},
+        "progress_analysis": {"type": "string"},
+        "schedule_status": {"type": "string", "enum": ["ahead", "on_track", "slightly_behind", "behind"]},
+        "bottlenecks": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "action": {"type": "string"},
+                    "reason": {"type": "string"},
+                    "priority": {"type": "string", "enum": ["high", "medium", "low"]}
+                },
+                "required": ["action"]
+            }
+        },
+        "schedule_adjustments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "task": {"type": "string"},
+                    "current_deadline": {"type": "string"},
+                    "suggested_deadline": {"type": "string"},
+                    "reason": {"type": "string"}
+                },
+                "required": ["task", "suggested_deadline"]
+            }
+        },
+        "next_steps": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["overall_health", "schedule_status"]
+}
+
+BREAKDOWN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "original_task": {"type": "string"},
+        "estimated_total_hours": {"type": "number"},
+        "subtasks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "estimated_hours": {"type": "number"},
+                    "order": {"type": "integer"},
+                    "dependencies": {"type": "array", "items": {"type": "string"}},
+                    "skills_needed": {"type": "array", "items": {"type": "string"}},
+                    "acceptance_criteria": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["title", "estimated_hours"]
+            }
+        },
+        "notes": {"type": "string"}
+    },
+    "required": ["subtasks"]
+}
+
+# Incremental re-plan: only changes to the open tasks, referenced by number
+REPLAN_TASK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ref": {"type": "integer"},
+        **{key: PLAN_TASK_SCHEMA["properties"][key]
+           for key in ("title", "description", "estimated_hours", "priority", "dependencies")}
+    },
+    "required": ["title"]
+}
+
+REPLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "update_tasks": {"type": "array", "items": REPLAN_TASK_SCHEMA},
+        "new_tasks": {"type": "array", "items": REPLAN_TASK_SCHEMA},
+        "remove_refs": {"type": "array", "items": {"type": "integer"}},
+        "milestones": PLAN_SCHEMA["properties"]["milestones"]
+    },
+    "required": ["update_tasks", "new_tasks", "remove_refs"]
+}
+
+# Section schemas for sectioned plan generation: tasks first, then the rest in parallel
+PLAN_TASKS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        key: PLAN_SCHEMA["properties"][key]
+        for key in ("project_title", "project_description", "estimated_duration_weeks", "difficulty_level", "tasks")
+    },
+    "required": ["tasks"]
+}
+
+PLAN_SECTION_SCHEMAS = {
+    section: {
+        "type": "object",
+        "properties": {section: PLAN_SCHEMA["properties"][section]},
+        "required": [section]
+    }
+    for section in ("milestones", "risks", "recommendations")
+}
+
+PLAN_SECTION_EXAMPLES = {
+    "milestones": """{"milestones": [{"name": "Project Setup Complete", "description": "Development environment ready", "week": 1, "tasks_included": ["Setup Development Environment"]}]}""",
+    "risks": """{"risks": [{"risk": "Technical complexity higher than expected", "impact": "medium", "mitigation": "Break down complex tasks further"}]}""",
+    "recommendations": """{"recommendations": ["Start with a simple prototype", "Plan regular progress reviews"]}""",
+}
+
+# Section generations are short and independent, so they run side by side
+_section_executor = ThreadPoolExecutor(max_workers=AI_PLAN_SECTION_WORKERS, thread_name_prefix="plan-section")
+
 class AIProjectPlanningService:
-    def __init__(self):
-        self.db = SessionLocal()
-    
-    def __del__(self):
-        if hasattr(self, 'db'):
-            self.db.close()
-    
-    def create_project_plan(self, project_description: str, project_title: str = None) -> Dict[str, Any]:
-        """Generate a comprehensive project plan using AI"""
+    """AI planning operations.
+
+    The service holds no database session. Each method reads what it needs
+    in a short-lived session, calls the model with no connection checked
+    out, and writes results back in a separate brief transaction, so
+    concurrent requests never share a session or keep a transaction open
+    during a generation.
+    """
+
+    def create_project_plan(self, project_description: str, project_title: str = None,
+                            mode: str = None) -> Dict[str, Any]:
+        """Generate a comprehensive project plan using AI.
+
+        ``mode`` is "single" (one generation for the whole plan),
+        "sectioned" (tasks first, then milestones, risks and recommendations
+        concurrently) or "fast" (the template plan, without the model); it
+        defaults to AI_PLAN_MODE. When Ollama is unavailable the template
+        plan is returned.
+
+        The most similar stored plans are shown to the model as examples; a
+        stored plan at least PLAN_REUSE_SIMILARITY similar is reused as is.
+        """
         try:
+            mode = mode or AI_PLAN_MODE
+            if mode == "fast":
+                return template_planner.plan(project_description, project_title)
+
             if not ollama_ai.is_available():
-                return {"error": "AI service not available. Please ensure Ollama is running."}
+                logger.warning("AI service not available, using template plan")
+                return self._create_fallback_plan(project_title, project_description)
+
+            similar = plan_index.similar_plans(project_title, project_description, k=PLAN_INDEX_TOP_K,
+                                               min_similarity=PLAN_INDEX_MIN_SIMILARITY)
+            if similar and similar[0]["similarity"] >= PLAN_REUSE_SIMILARITY:
+                return self._reuse_plan(similar[0], project_title, project_description)
+            examples = self._plan_examples(similar)
+
+            if mode == "sectioned":
+                return self._create_sectioned_plan(project_description, project_title, examples)
 
             system_prompt = """You are an expert project manager. You MUST respond with valid JSON only.
             Do not include any text before or after the JSON. Start your response with { and end with }."""
@@ -30,7 +253,7 @@ class AIProjectPlanningService:
             prompt = f"""Create a project plan for: "{project_title or 'New Project'}"
 
 Description: {project_description}
-
+{examples}
 Respond with ONLY this JSON structure (no other text):
 {{
     "project_title": "Clear project title",
@@ -78,37 +301,131 @@ Respond with ONLY this JSON structure (no other text):
     ]
 }}"""
 
-            response = ollama_ai.generate_response(prompt, system_prompt)
+            plan_data = ollama_ai.generate_json(prompt, system_prompt, schema=PLAN_SCHEMA,
+                                               operation="create_project_plan")
 
-            # Clean the response - remove any non-JSON content
-            response = response.strip()
+            if plan_data is None:
+                logger.error("AI did not produce a valid project plan, using fallback plan")
+                return self._create_fallback_plan(project_title, project_description)
 
-            # Try to extract JSON if there's extra text
-            if not response.startswith('{'):
-                # Look for JSON in the response
-                start_idx = response.find('{')
-                end_idx = response.rfind('}')
-                if start_idx != -1 and end_idx != -1:
-                    response = response[start_idx:end_idx+1]
+            # Validate required fields and provide defaults
+            return self._validate_and_fix_plan_data(plan_data, project_title, project_description)
 
-            # Try to parse JSON response
-            try:
-                plan_data = json.loads(response)
+        except Exception as e:
+            logger.error(f"Error creating project plan: {e}")
+            return {"error": f"Failed to create project plan: {str(e)}"}
 
-                # Validate required fields and provide defaults
-                plan_data = self._validate_and_fix_plan_data(plan_data, project_title, project_description)
-                return plan_data
+    def _create_sectioned_plan(self, project_description: str, project_title: str = None,
+                               examples: str = "") -> Dict[str, Any]:
+        """Generate the task list, then milestones, risks and recommendations in parallel"""
+        started = time.perf_counter()
+        system_prompt = """You are an expert project manager. You MUST respond with valid JSON only.
+            Do not include any text before or after the JSON. Start your response with { and end with }."""
 
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing failed: {e}")
-                logger.error(f"Raw response: {response[:500]}...")
+        prompt = f"""Create the task list for the project: "{project_title or 'New Project'}"
 
-                # Return a fallback plan
-                return self._create_fallback_plan(project_title, project_description)
+Description: {project_description}
+{examples}
+Respond with ONLY this JSON structure (no other text):
+{{
+    "project_title": "Clear project title",
+    "project_description": "Enhanced description",
+    "estimated_duration_weeks": 4,
+    "difficulty_level": "intermediate",
+    "tasks": [
+        {{
+            "title": "Setup Development Environment",
+            "description": "Install tools and configure workspace",
+            "estimated_hours": 4,
+            "priority": "high",
+            "dependencies": [],
+            "skills_required": ["development"],
+            "deliverables": ["configured environment"]
+        }}
+    ]
+}}"""
 
-        except Exception as e:
-            logger.error(f"Error creating project plan: {e}")
-            return {"error": f"Failed to create project plan: {str(e)}"}
+        plan_data = ollama_ai.generate_json(prompt, system_prompt, schema=PLAN_TASKS_SCHEMA,
+                                           operation="plan_tasks")
+        if plan_data is None:
+            logger.error("AI did not produce a valid task list, using fallback plan")
+            return self._create_fallback_plan(project_title, project_description)
+
+        plan_data = self._validate_and_fix_plan_data(plan_data, project_title, project_description)
+        tasks_done = time.perf_counter()
+
+        task_summary = json.dumps(
+            [{"title": t["title"], "estimated_hours": t["estimated_hours"], "dependencies": t["dependencies"]}
+             for t in plan_data["tasks"]],
+            separators=(",", ":")
+        )
+        futures = {
+            section: _section_executor.submit(
+                self._generate_plan_section, section, plan_data, task_summary, system_prompt
+            )
+            for section in PLAN_SECTION_SCHEMAS
+        }
+        fallback = self._create_fallback_plan(project_title, project_description)
+        for section, future in futures.items():
+            result = future.result()
+            if result is None:
+                logger.warning(f"Plan section '{section}' failed, using fallback content")
+                # Fallback milestones name tasks this plan may not have
+                result = [] if section == "milestones" else fallback[section]
+            plan_data[section] = result
+
+        finished = time.perf_counter()
+        logger.info(
+            f"Sectioned plan generated in {(finished - started) * 1000:.0f} ms "
+            f"(tasks {(tasks_done - started) * 1000:.0f} ms, sections {(finished - tasks_done) * 1000:.0f} ms)"
+        )
+        return plan_data
+
+    def _plan_examples(self, similar: List[Dict[str, Any]], max_tasks: int = 12) -> str:
+        """Outline similar stored plans as few-shot examples for the prompt"""
+        if not similar:
+            return ""
+        lines = ["\nSimilar plans that were accepted before, as examples of scope and granularity:"]
+        for match in similar:
+            plan = match["plan_data"]
+            outline = {
+                "project_title": plan.get("project_title"),
+                "estimated_duration_weeks": plan.get("estimated_duration_weeks"),
+                "tasks": [
+                    {"title": t.get("title"), "estimated_hours": t.get("estimated_hours"),
+                     "dependencies": t.get("dependencies", [])}
+                    for t in plan.get("tasks", [])[:max_tasks]
+                ],
+                "milestones": [m.get("name") for m in plan.get("milestones", [])],
+            }
+            lines.append(compact_json(outline))
+        return "\n".join(lines) + "\n"
+
+    def _reuse_plan(self, match: Dict[str, Any], project_title: str, project_description: str) -> Dict[str, Any]:
+        """Copy a near-identical stored plan instead of generating one"""
+        logger.info(f"Reusing stored plan {match['plan_id']} (similarity {match['similarity']:.3f})")
+        plan_data = json.loads(json.dumps(match["plan_data"]))
+        if project_title:
+            plan_data["project_title"] = project_title
+        plan_data["project_description"] = project_description
+        plan_data["planner"] = {"source": "reused", "plan_id": match["plan_id"], "similarity": match["similarity"]}
+        return self._validate_and_fix_plan_data(plan_data, project_title, project_description)
+
+    def _generate_plan_section(self, section: str, plan_data: dict, task_summary: str,
+                               system_prompt: str) -> Optional[list]:
+        """Generate one bounded plan section from the already generated task list"""
+        prompt = f"""Project: "{plan_data['project_title']}" ({plan_data['estimated_duration_weeks']} weeks)
+
+Description: {plan_data['project_description']}
+
+Tasks: {task_summary}
+
+Based on these tasks, list the project {section}. Respond with ONLY this JSON structure:
+{PLAN_SECTION_EXAMPLES[section]}"""
+
+        result = ollama_ai.generate_json(prompt, system_prompt, schema=PLAN_SECTION_SCHEMAS[section],
+                                        operation=f"plan_{section}")
+        return result.get(section, []) if result is not None else None
 
     def _validate_and_fix_plan_data(self, plan_data: dict, project_title: str, project_description: str) -> dict:
         """Validate and fix plan data structure"""
@@ -135,124 +452,137 @@ Respond with ONLY this JSON structure (no other text):
         return plan_data
 
     def _create_fallback_plan(self, project_title: str, project_description: str) -> dict:
-        """Create a basic fallback plan when AI fails"""
+        """Create a plan from the local templates when AI fails"""
+        return template_planner.plan(project_description, project_title)
+
+    def refine_project_plan(self, project_id: int, project_description: str,
+                            project_title: str = None, mode: str = None) -> Dict[str, Any]:
+        """Replace a template plan with a model-generated one.
+
+        Runs after a "fast" plan was stored. Tasks the user already completed
+        or logged time on are kept; if the model fails the template plan
+        stays in place.
+        """
+        mode = mode if mode in ("single", "sectioned") else "single"
+        try:
+            if not ollama_ai.is_available():
+                return {"error": "AI service not available"}
+
+            plan_data = self.create_project_plan(project_description, project_title, mode=mode)
+            if "error" in plan_data:
+                return plan_data
+            source = (plan_data.get("planner") or {}).get("source")
+            if source == "template":
+                return {"error": "Model did not produce a plan, keeping the template plan"}
+
+            # A reused stored plan keeps its stamp and is not indexed a second time
+            generated = source != "reused"
+            if generated:
+                plan_data["planner"] = {"source": "model", "refined_from": "template"}
+            with session_scope() as db:
+                result = plan_importer.replace_plan(db, project_id, plan_data)
+            if generated:
+                plan_index.add_plan(result["plan_id"], project_title, project_description, plan_data)
+            logger.info(f"Refined plan for project {project_id}: {result['timings']}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error refining project plan: {e}")
+            return {"error": f"Failed to refine project plan: {str(e)}"}
+
+    def project_state_key(self, db: Session, project_id: int) -> str:
+        """Fingerprint of everything an analysis depends on.
+
+        Any task added, completed or edited (updated_at), any new devlog, or a
+        new day (which changes what is overdue) produces a different key.
+        """
+        tasks = db.query(
+            func.count(Task.id), func.sum(Task.completed), func.max(Task.id), func.max(Task.updated_at)
+        ).filter(Task.project_id == project_id).one()
+        devlogs = db.query(func.count(Devlog.id), func.max(Devlog.created_at)).filter(
+            Devlog.project_id == project_id
+        ).one()
+        state = [datetime.now().date().isoformat(), *tasks, *devlogs]
+        return hashlib.sha1(json.dumps(state, default=str).encode("utf-8")).hexdigest()[:20]
+
+    def get_analysis_snapshot(self, project_id: int, snapshot_id: int = None) -> Optional[Dict[str, Any]]:
+        """A stored analysis by id, or the latest one for the project"""
+        with SessionLocal() as db:
+            query = db.query(ProjectAnalysis).filter(ProjectAnalysis.project_id == project_id)
+            if snapshot_id is not None:
+                query = query.filter(ProjectAnalysis.id == snapshot_id)
+            snapshot = query.order_by(ProjectAnalysis.version.desc()).first()
+            return self._snapshot_result(snapshot, reused=True) if snapshot else None
+
+    def _snapshot_result(self, snapshot: ProjectAnalysis, reused: bool) -> Dict[str, Any]:
         return {
-            "project_title": project_title or "New Project",
-            "project_description": project_description,
-            "estimated_duration_weeks": 4,
-            "difficulty_level": "intermediate",
-            "tasks": [
-                {
-                    "title": "Project Planning",
-                    "description": "Define project scope and requirements",
-                    "estimated_hours": 8,
-                    "priority": "high",
-                    "dependencies": [],
-                    "skills_required": ["planning"],
-                    "deliverables": ["project plan"]
-                },
-                {
-                    "title": "Setup Development Environment",
-                    "description": "Configure tools and workspace",
-                    "estimated_hours": 4,
-                    "priority": "high",
-                    "dependencies": ["Project Planning"],
-                    "skills_required": ["development"],
-                    "deliverables": ["development environment"]
-                },
-                {
-                    "title": "Implementation Phase 1",
-                    "description": "Begin core development work",
-                    "estimated_hours": 16,
-                    "priority": "high",
-                    "dependencies": ["Setup Development Environment"],
-                    "skills_required": ["development"],
-                    "deliverables": ["initial implementation"]
-                },
-                {
-                    "title": "Testing and Review",
-                    "description": "Test functionality and review progress",
-                    "estimated_hours": 8,
-                    "priority": "medium",
-                    "dependencies": ["Implementation Phase 1"],
-                    "skills_required": ["testing"],
-                    "deliverables": ["test results"]
-                }
-            ],
-            "milestones": [
-                {
-                    "name": "Project Setup Complete",
-                    "description": "Planning and environment ready",
-                    "week": 1,
-                    "tasks_included": ["Project Planning", "Setup Development Environment"]
-                },
-                {
-                    "name": "First Implementation",
-                    "description": "Core functionality implemented",
-                    "week": 3,
-                    "tasks_included": ["Implementation Phase 1"]
-                }
-            ],
-            "risks": [
-                {
-                    "risk": "Scope creep during development",
-                    "impact": "medium",
-                    "mitigation": "Regular scope reviews and clear requirements"
-                },
-                {
-                    "risk": "Technical challenges",
-                    "impact": "medium",
-                    "mitigation": "Research and prototyping before full implementation"
-                }
-            ],
-            "recommendations": [
-                "Start with a minimal viable version",
-                "Plan regular progress reviews",
-                "Document decisions and learnings",
-                "Test early and often"
-            ]
+            **snapshot.analysis,
+            "snapshot_id": snapshot.id,
+            "snapshot_version": snapshot.version,
+            "snapshot_created_at": snapshot.created_at.isoformat(),
+            "reused": reused,
         }
-    
-    def analyze_project_progress(self, project_id: int) -> Dict[str, Any]:
-        """Analyze current project progress and suggest adjustments"""
+
+    def _save_analysis_snapshot(self, project_id: int, state_key: str, analysis: Dict[str, Any],
+                                attempts: int = 3) -> Dict[str, Any]:
+        """Store an analysis as the project's next version.
+
+        The (project_id, version) index is unique, so a concurrent analysis
+        that took the same version makes the insert fail; it is retried with
+        the next free version.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                with session_scope() as db:
+                    version = (db.query(func.max(ProjectAnalysis.version)).filter(
+                        ProjectAnalysis.project_id == project_id
+                    ).scalar() or 0) + 1
+                    snapshot = ProjectAnalysis(project_id=project_id, version=version, state_key=state_key,
+                                               analysis=analysis)
+                    db.add(snapshot)
+                    db.flush()
+                    return self._snapshot_result(snapshot, reused=False)
+            except IntegrityError:
+                if attempt == attempts:
+                    raise
+                logger.info(f"Analysis version for project {project_id} taken concurrently, retrying")
+
+    def analyze_project_progress(self, project_id: int, reuse: bool = True) -> Dict[str, Any]:
+        """Analyze current project progress and suggest adjustments.
+
+        Model analyses are stored as versioned snapshots keyed by the project
+        state. With ``reuse`` the latest snapshot for an unchanged state is
+        returned without calling the model.
+        """
         try:
-            project = self.db.query(Project).filter(Project.id == project_id).first()
-            if not project:
-                return {"error": "Project not found"}
-            
+            # Read everything the prompt needs, then release the session
+            with SessionLocal() as db:
+                project = db.query(Project).filter(Project.id == project_id).first()
+                if not project:
+                    return {"error": "Project not found"}
+
+                state_key = self.project_state_key(db, project_id)
+                if reuse:
+                    snapshot = db.query(ProjectAnalysis).filter(
+                        ProjectAnalysis.project_id == project_id,
+                        ProjectAnalysis.state_key == state_key
+                    ).order_by(ProjectAnalysis.version.desc()).first()
+                    if snapshot:
+                        logger.info(f"Reusing analysis snapshot {snapshot.id} for project {project_id}")
+                        return self._snapshot_result(snapshot, reused=True)
+
+                # Prepare a size-bounded context for AI
+                project_context = project_context_builder.build(db, project)
+
             if not ollama_ai.is_available():
                 return {"error": "AI service not available"}
             
-            # Gather project data
-            tasks = self.db.query(Task).filter(Task.project_id == project_id).all()
-            devlogs = self.db.query(Devlog).filter(Devlog.project_id == project_id).order_by(Devlog.created_at.desc()).limit(10).all()
-            time_logs = self.db.query(TimeLog).join(Task).filter(Task.project_id == project_id).all()
-            
-            # Calculate metrics
-            total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t.completed])
-            overdue_tasks = len([t for t in tasks if t.deadline and t.deadline < datetime.now() and not t.completed])
-            total_time_logged = sum([tl.duration_minutes for tl in time_logs])
-            
-            # Prepare context for AI
-            project_context = {
-                "project_title": project.title,
-                "project_description": project.description,
-                "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "completion_percentage": (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
-                "overdue_tasks": overdue_tasks,
-                "total_hours_logged": total_time_logged / 60,
-                "recent_devlogs": [{"date": dl.created_at.strftime("%Y-%m-%d"), "entry": dl.entry_text} for dl in devlogs],
-                "task_details": [{"title": t.title, "completed": t.completed, "deadline": t.deadline.isoformat() if t.deadline else None} for t in tasks]
-            }
-            
             system_prompt = """You are an expert project manager. You MUST respond with valid JSON only.
             Do not include any text before or after the JSON. Start your response with { and end with }."""
 
             prompt = f"""Analyze this project and respond with ONLY this JSON structure:
 
-Project Data: {json.dumps(project_context, indent=2)}
+Project Data: {compact_json(project_context)}
 
 {{
     "overall_health": "good",
@@ -278,19 +608,10 @@ Project Data: {json.dumps(project_context, indent=2)}
     "next_steps": ["Complete current tasks", "Review progress", "Plan next phase"]
 }}"""
 
-            response = ollama_ai.generate_response(prompt, system_prompt)
-
-            # Clean the response
-            response = response.strip()
-            if not response.startswith('{'):
-                start_idx = response.find('{')
-                end_idx = response.rfind('}')
-                if start_idx != -1 and end_idx != -1:
-                    response = response[start_idx:end_idx+1]
-
-            try:
-                analysis = json.loads(response)
+            analysis = ollama_ai.generate_json(prompt, system_prompt, schema=ANALYSIS_SCHEMA,
+                                              operation="analyze_project_progress")
 
+            if analysis is not None:
                 # Validate and provide defaults
                 analysis.setdefault("overall_health", "good")
                 analysis.setdefault("progress_analysis", f"Project is {project_context['completion_percentage']:.1f}% complete")
@@ -300,8 +621,8 @@ Project Data: {json.dumps(project_context, indent=2)}
                 analysis.setdefault("schedule_adjustments", [])
                 analysis.setdefault("next_steps", ["Continue with current tasks"])
 
-                return analysis
-            except json.JSONDecodeError:
+                return self._save_analysis_snapshot(project_id, state_key, analysis)
+            else:
                 # Return a basic analysis based on the data
                 return {
                     "overall_health": "good" if project_context['completion_percentage'] > 50 else "concerning",
@@ -328,7 +649,8 @@ Project Data: {json.dumps(project_context, indent=2)}
         """Break down a complex task into smaller, manageable subtasks"""
         try:
             if not ollama_ai.is_available():
-                return {"error": "AI service not available"}
+                logger.warning("AI service not available, using template breakdown")
+                return template_planner.break_down(task_description)
 
             system_prompt = """You are an expert at task breakdown. You MUST respond with valid JSON only.
             Do not include any text before or after the JSON. Start your response with { and end with }."""
@@ -373,19 +695,10 @@ Context: {project_context}
     "notes": "Consider breaking down further if any subtask exceeds 8 hours"
 }}"""
 
-            response = ollama_ai.generate_response(prompt, system_prompt)
-
-            # Clean the response
-            response = response.strip()
-            if not response.startswith('{'):
-                start_idx = response.find('{')
-                end_idx = response.rfind('}')
-                if start_idx != -1 and end_idx != -1:
-                    response = response[start_idx:end_idx+1]
-
-            try:
-                breakdown = json.loads(response)
+            breakdown = ollama_ai.generate_json(prompt, system_prompt, schema=BREAKDOWN_SCHEMA,
+                                               operation="suggest_task_breakdown")
 
+            if breakdown is not None:
                 # Validate and provide defaults
                 breakdown.setdefault("original_task", task_description)
                 breakdown.setdefault("estimated_total_hours", 8)
@@ -404,90 +717,224 @@ Context: {project_context}
 
                 return breakdown
 
-            except json.JSONDecodeError:
-                # Return a basic breakdown
-                return {
-                    "original_task": task_description,
-                    "estimated_total_hours": 8,
-                    "subtasks": [
-                        {
-                            "title": "Research and Planning",
-                            "description": "Understand requirements and plan approach",
-                            "estimated_hours": 2,
-                            "order": 1,
-                            "dependencies": [],
-                            "skills_needed": ["analysis"],
-                            "acceptance_criteria": ["Requirements clear", "Plan documented"]
-                        },
-                        {
-                            "title": "Implementation",
-                            "description": "Execute the main work",
-                            "estimated_hours": 4,
-                            "order": 2,
-                            "dependencies": ["Research and Planning"],
-                            "skills_needed": ["implementation"],
-                            "acceptance_criteria": ["Work completed", "Quality checked"]
-                        },
-                        {
-                            "title": "Review and Finalize",
-                            "description": "Review work and finalize",
-                            "estimated_hours": 2,
-                            "order": 3,
-                            "dependencies": ["Implementation"],
-                            "skills_needed": ["review"],
-                            "acceptance_criteria": ["Review complete", "Task finalized"]
-                        }
-                    ],
-                    "notes": "Basic task breakdown - consider customizing based on specific requirements"
-                }
+            else:
+                # Return a template breakdown
+                return template_planner.break_down(task_description)
                 
         except Exception as e:
             logger.error(f"Error breaking down task: {e}")
             return {"error": f"Failed to break down task: {str(e)}"}
     
-    def auto_adjust_schedule(self, project_id: int, delay_reason: str = "") -> Dict[str, Any]:
-        """Automatically adjust project schedule based on current progress and delays"""
+    def _plan_diff(self, project: Project, plan: Optional[ProjectPlan], tasks: List[Task],
+                   milestones: List[ProjectMilestone], project_description: str = None) -> Dict[str, Any]:
+        """Compare the current tasks and milestones with the stored plan.
+
+        Open tasks get a short numeric ``ref`` the model uses to address
+        them. Completed work is summarized by title only.
+        """
+        plan_data = (plan.plan_data if plan else None) or {}
+        plan_tasks = TaskTitleIndex(plan_data.get("tasks", []), key=lambda t: t.get("title", ""))
+
+        open_tasks, completed, edited, added = [], [], [], []
+        matched_plan_titles = set()
+        for task in tasks:
+            planned = plan_tasks.match(task.title)
+            if planned is not None:
+                matched_plan_titles.add(planned.get("title"))
+            if task.completed:
+                completed.append(task.title)
+                continue
+            entry = {
+                "ref": len(open_tasks) + 1,
+                "title": task.title,
+                "estimated_hours": task.estimated_hours,
+                "priority": task.priority or "medium",
+                "dependencies": task.dependencies or [],
+            }
+            if planned is None:
+                added.append(task.title)
+            elif (task.title != planned.get("title")
+                  or (task.description or "") != (planned.get("description") or "")
+                  or task.estimated_hours != planned.get("estimated_hours")
+                  or (task.priority or "medium") != planned.get("priority", "medium")):
+                edited.append(task.title)
+            open_tasks.append((task, entry))
+
+        removed_by_user = [
+            t.get("title") for t in plan_data.get("tasks", []) if t.get("title") not in matched_plan_titles
+        ]
+        old_description = plan_data.get("project_description") or project.description or ""
+        new_description = project_description or project.description or ""
+        return {
+            "open_tasks": open_tasks,
+            "completed": completed,
+            "edited": edited,
+            "added": added,
+            "removed_by_user": removed_by_user,
+            "description_changed": new_description.strip() != old_description.strip(),
+            "old_description": old_description,
+            "new_description": new_description,
+            "open_milestones": [m.name for m in milestones if not m.completed],
+            "completed_milestones": [m.name for m in milestones if m.completed],
+        }
+
+    def replan_project(self, project_id: int, project_description: str = None,
+                       instructions: str = "") -> Dict[str, Any]:
+        """Re-plan only the unfinished part of a project.
+
+        The current tasks and milestones are diffed against the stored plan;
+        the model sees the open tasks, what changed since the plan was made
+        and completed work by title only, and answers with updates, new
+        tasks and removals by ref. These are applied as a minimal set of
+        inserts, updates and deletes, and completed work is never touched.
+        """
+        try:
+            timer = _PhaseTimer()
+            with SessionLocal() as db:
+                project = db.query(Project).filter(Project.id == project_id).first()
+                if not project:
+                    return {"error": "Project not found"}
+                plan = db.query(ProjectPlan).filter(
+                    ProjectPlan.project_id == project_id
+                ).order_by(ProjectPlan.id.desc()).first()
+                tasks = db.query(Task).filter(
+                    Task.project_id == project_id, Task.parent_task_id.is_(None)
+                ).order_by(Task.order_index, Task.id).all()
+                milestones = db.query(ProjectMilestone).filter(ProjectMilestone.project_id == project_id).all()
+                diff = self._plan_diff(project, plan, tasks, milestones, project_description)
+                project_title = project.title
+            timer.mark("diff")
+
+            if not diff["open_tasks"] and not diff["description_changed"] and not instructions:
+                return {"success": True, "summary": "Nothing left to re-plan", "changes": {}, "timings": timer.timings}
+
+            if not ollama_ai.is_available():
+                return {"error": "AI service not available"}
+
+            changes = {key: diff[key] for key in ("edited", "added", "removed_by_user") if diff[key]}
+            if diff["description_changed"]:
+                changes["description_was"] = diff["old_description"]
+            context = {
+                "project_title": project_title,
+                "project_description": diff["new_description"],
+                "open_tasks": [entry for _, entry in diff["open_tasks"]],
+                "completed_tasks": diff["completed"][:30],
+                "completed_task_count": len(diff["completed"]),
+                "open_milestones": diff["open_milestones"],
+                "changes_since_plan": changes,
+            }
+
+            system_prompt = """You are an expert project manager. You MUST respond with valid JSON only.
+            Do not include any text before or after the JSON. Start your response with { and end with }."""
+
+            prompt = f"""Revise the remaining work of this project. Completed tasks are done and must not be repeated.
+
+Project: {compact_json(context)}
+{f"Instructions: {instructions}" if instructions else ""}
+Only list what changes. Tasks you do not mention stay as they are. Refer to open tasks by "ref".
+Respond with ONLY this JSON structure:
+{{
+    "summary": "What changed and why",
+    "update_tasks": [{{"ref": 2, "title": "Build Core Features", "description": "Updated scope", "estimated_hours": 12, "priority": "high", "dependencies": []}}],
+    "new_tasks": [{{"title": "Add Export", "description": "Export data as CSV", "estimated_hours": 4, "priority": "medium", "dependencies": ["Build Core Features"]}}],
+    "remove_refs": [3],
+    "milestones": [{{"name": "Feature Complete", "description": "Remaining features done", "week": 2, "tasks_included": ["Add Export"]}}]
+}}"""
+            timer.mark("prompt")
+
+            result = ollama_ai.generate_json(prompt, system_prompt, schema=REPLAN_SCHEMA, operation="replan_project")
+            timer.mark("generate")
+            if result is None:
+                return {"error": "AI did not produce a valid re-plan"}
+
+            refs = {entry["ref"]: task.id for task, entry in diff["open_tasks"]}
+            with session_scope() as db:
+                applied = plan_importer.apply_replan(
+                    db, project_id, refs, result,
+                    project_description if diff["description_changed"] else None
+                )
+            timer.mark("apply")
+
+            logger.info(
+                f"Re-planned project {project_id}: sent {len(diff['open_tasks'])} open of "
+                f"{len(diff['open_tasks']) + len(diff['completed'])} tasks, applied {applied['counts']}"
+            )
+            return {
+                "success": True,
+                "summary": result.get("summary", ""),
+                "changes": applied,
+                "context": {
+                    "open_tasks_sent": len(diff["open_tasks"]),
+                    "completed_tasks": len(diff["completed"]),
+                    "changes_since_plan": changes,
+                },
+                "timings": timer.timings,
+            }
+
+        except Exception as e:
+            logger.error(f"Error re-planning project: {e}")
+            return {"error": f"Failed to re-plan project: {str(e)}"}
+
+    def auto_adjust_schedule(self, project_id: int, delay_reason: str = "",
+                             snapshot_id: int = None) -> Dict[str, Any]:
+        """Automatically adjust project schedule based on current progress and delays.
+
+        With ``snapshot_id`` the suggestions of that stored analysis are
+        applied without running the model; otherwise the project is analyzed,
+        reusing a snapshot when the project has not changed since.
+        """
         try:
-            # First analyze the project
-            analysis = self.analyze_project_progress(project_id)
+            if snapshot_id is not None:
+                analysis = self.get_analysis_snapshot(project_id, snapshot_id)
+                if analysis is None:
+                    return {"error": f"Analysis snapshot {snapshot_id} not found for this project"}
+            else:
+                analysis = self.analyze_project_progress(project_id)
             
             if "error" in analysis:
                 return analysis
             
-            # Get project and tasks
-            project = self.db.query(Project).filter(Project.id == project_id).first()
-            tasks = self.db.query(Task).filter(Task.project_id == project_id).all()
-            
-            # Apply AI-suggested schedule adjustments
+            # Apply AI-suggested schedule adjustments in one brief transaction
             adjustments_made = []
             
-            if "schedule_adjustments" in analysis:
-                for adjustment in analysis["schedule_adjustments"]:
+            with session_scope() as db:
+                tasks = db.query(Task).filter(Task.project_id == project_id).all()
+                task_index = TaskTitleIndex(tasks)
+
+                for adjustment in analysis.get("schedule_adjustments", []):
                     task_title = adjustment.get("task")
                     new_deadline = adjustment.get("suggested_deadline")
                     reason = adjustment.get("reason")
                     
-                    # Find matching task
-                    matching_task = next((t for t in tasks if t.title == task_title), None)
+                    # Find matching task, tolerating approximate titles
+                    matching_task = task_index.match(task_title)
                     
                     if matching_task and new_deadline:
                         try:
                             new_deadline_dt = datetime.fromisoformat(new_deadline)
-                            old_deadline = matching_task.deadline
-                            matching_task.deadline = new_deadline_dt
-                            
-                            adjustments_made.append({
-                                "task": task_title,
-                                "old_deadline": old_deadline.isoformat() if old_deadline else None,
-                                "new_deadline": new_deadline,
-                                "reason": reason
-                            })
                         except ValueError:
                             logger.warning(f"Invalid date format for task {task_title}: {new_deadline}")
-            
-            # Commit changes
-            if adjustments_made:
-                self.db.commit()
+                            continue
+
+                        old_deadline = matching_task.deadline
+                        matching_task.deadline = new_deadline_dt
+                        db.add(ScheduleAdjustment(
+                            project_id=project_id,
+                            task_id=matching_task.id,
+                            adjustment_reason=delay_reason or "AI-suggested adjustment",
+                            old_deadline=old_deadline,
+                            new_deadline=new_deadline_dt,
+                            ai_suggested=True,
+                            applied=True
+                        ))
+
+                        adjustments_made.append({
+                            "task": matching_task.title,
+                            "task_id": matching_task.id,
+                            "old_deadline": old_deadline.isoformat() if old_deadline else None,
+                            "new_deadline": new_deadline,
+                            "reason": reason
+                        })
             
             return {
                 "success": True,
@@ -0,0 +1,191 @@
+# backend/services/context_builder.py
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from backend.models.models import Project, Task, Devlog, TimeLog
+
+try:
+    from config import config
+    AI_CONTEXT_TOKEN_BUDGET = config.AI_CONTEXT_TOKEN_BUDGET
+    AI_CONTEXT_DEVLOG_CHARS = config.AI_CONTEXT_DEVLOG_CHARS
+except ImportError:
+    # Fallback if config is not available
+    AI_CONTEXT_TOKEN_BUDGET = 1500
+    AI_CONTEXT_DEVLOG_CHARS = 280
+
+logger = logging.getLogger(__name__)
+
+# Roughly four characters per token for English text and compact JSON
+CHARS_PER_TOKEN = 4
+PRIORITY_WEIGHT = {"high": 30, "medium": 15, "low": 5}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, good enough for budgeting prompt sections"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class ProjectContextBuilder:
+    """Build the project context sent with analyze_project_progress.
+
+    Task statistics are aggregated in SQL and summarized as numbers; only the
+    most relevant tasks (overdue, high priority, recently changed, due soon)
+    and truncated devlogs are listed, and they are added only while the
+    estimated prompt size stays within the token budget. The number of rows
+    read is bounded too, so context size no longer grows with project size.
+    """
+    def __init__(self, token_budget: int = None, devlog_chars: int = None,
+                 max_candidate_tasks: int = 100, devlog_share: float = 0.3):
+        self.token_budget = token_budget or AI_CONTEXT_TOKEN_BUDGET
+        self.devlog_chars = devlog_chars or AI_CONTEXT_DEVLOG_CHARS
+        self.max_candidate_tasks = max_candidate_tasks
+        self.devlog_share = devlog_share
+
+    def build(self, db: Session, project: Project, now: datetime = None) -> Dict[str, Any]:
+        now = now or datetime.now()
+        context = {
+            "project_title": project.title,
+            "project_description": _truncate(project.description, 600),
+            **self._task_stats(db, project.id, now),
+        }
+
+        tasks = self._ranked_tasks(db, project.id, now)
+        devlogs = self._recent_devlogs(db, project.id)
+
+        context["task_details"] = []
+        context["recent_devlogs"] = []
+        used = estimate_tokens(compact_json(context))
+        devlog_reserve = int(self.token_budget * self.devlog_share)
+
+        # Tasks first, leaving room for devlogs, then devlogs, then any tasks
+        # that still fit in what the devlogs did not use.
+        remaining_tasks = []
+        for task in tasks:
+            cost = estimate_tokens(compact_json(task)) + 1
+            if used + cost <= self.token_budget - devlog_reserve:
+                context["task_details"].append(task)
+                used += cost
+            else:
+                remaining_tasks.append(task)
+
+        for devlog in devlogs:
+            cost = estimate_tokens(compact_json(devlog)) + 1
+            if used + cost > self.token_budget:
+                break
+            context["recent_devlogs"].append(devlog)
+            used += cost
+
+        for task in remaining_tasks:
+            cost = estimate_tokens(compact_json(task)) + 1
+            if used + cost > self.token_budget:
+                break
+            context["task_details"].append(task)
+            used += cost
+
+        context["tasks_omitted"] = context["total_tasks"] - len(context["task_details"])
+        logger.info(
+            f"Built context for project {project.id}: ~{used} tokens, "
+            f"{len(context['task_details'])}/{context['total_tasks']} tasks, "
+            f"{len(context['recent_devlogs'])} devlogs"
+        )
+        return context
+
+    def _task_stats(self, db: Session, project_id: int, now: datetime) -> Dict[str, Any]:
+        is_open = Task.completed.isnot(True)
+        row = db.query(
+            func.count(Task.id),
+            func.sum(case((Task.completed.is_(True), 1), else_=0)),
+            func.sum(case((is_open & (Task.deadline < now), 1), else_=0)),
+            func.sum(case((is_open & (Task.deadline >= now) & (Task.deadline < now + timedelta(days=7)), 1), else_=0)),
+            func.sum(case((is_open, Task.estimated_hours), else_=0)),
+        ).filter(Task.project_id == project_id).one()
+        total, completed, overdue, due_soon, remaining_hours = [value or 0 for value in row]
+
+        open_by_priority = dict(
+            db.query(Task.priority, func.count(Task.id))
+            .filter(Task.project_id == project_id, is_open)
+            .group_by(Task.priority)
+            .all()
+        )
+
+        minutes_logged = db.query(func.sum(TimeLog.duration_minutes)).join(Task).filter(
+            Task.project_id == project_id
+        ).scalar() or 0
+
+        return {
+            "total_tasks": total,
+            "completed_tasks": completed,
+            "completion_percentage": round(completed / total * 100, 1) if total > 0 else 0,
+            "overdue_tasks": overdue,
+            "due_next_7_days": due_soon,
+            "open_tasks_by_priority": {str(k or "medium"): v for k, v in open_by_priority.items()},
+            "estimated_hours_remaining": round(float(remaining_hours), 1),
+            "total_hours_logged": round(minutes_logged / 60, 1),
+        }
+
+    def _ranked_tasks(self, db: Session, project_id: int, now: datetime) -> List[Dict[str, Any]]:
+        """Pick a bounded set of candidate tasks in SQL, then rank them by relevance"""
+        priority_rank = case((Task.priority == "high", 0), (Task.priority == "medium", 1), else_=2)
+        overdue_rank = case((Task.deadline < now, 0), else_=1)
+        open_tasks = db.query(Task).filter(
+            Task.project_id == project_id,
+            Task.completed.isnot(True)
+        ).order_by(overdue_rank, priority_rank, Task.updated_at.desc()).limit(self.max_candidate_tasks).all()
+
+        week_ago = now - timedelta(days=7)
+        recently_completed = db.query(Task).filter(
+            Task.project_id == project_id,
+            Task.completed.is_(True),
+            Task.updated_at >= week_ago
+        ).order_by(Task.updated_at.desc()).limit(10).all()
+
+        scored = []
+        for task in open_tasks + recently_completed:
+            score = PRIORITY_WEIGHT.get(task.priority or "medium", 15)
+            overdue = bool(task.deadline and task.deadline < now and not task.completed)
+            if overdue:
+                score += 100
+            elif task.deadline and not task.completed and task.deadline < now + timedelta(days=14):
+                score += 10
+            if task.updated_at and task.updated_at >= week_ago:
+                age_days = (now - task.updated_at).total_seconds() / 86400
+                score += 20 * max(0.0, 1 - age_days / 7)
+            if task.completed:
+                score -= 20
+
+            entry = {"title": _truncate(task.title, 80), "completed": bool(task.completed)}
+            if task.deadline:
+                entry["deadline"] = task.deadline.strftime("%Y-%m-%d")
+            if task.priority and task.priority != "medium":
+                entry["priority"] = task.priority
+            if overdue:
+                entry["overdue"] = True
+            scored.append((score, entry))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [entry for _, entry in scored]
+
+    def _recent_devlogs(self, db: Session, project_id: int) -> List[Dict[str, str]]:
+        devlogs = db.query(Devlog).filter(
+            Devlog.project_id == project_id
+        ).order_by(Devlog.created_at.desc()).limit(10).all()
+        return [
+            {"date": dl.created_at.strftime("%Y-%m-%d"), "entry": _truncate(dl.entry_text, self.devlog_chars)}
+            for dl in devlogs
+        ]
+
+
+# Global builder instance
+project_context_builder = ProjectContextBuilder()
@@ -0,0 +1,130 @@
+# backend/services/cron.py
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Set
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# (name, lowest, highest, names mapped to numbers)
+FIELDS = [
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, {name: i + 1 for i, name in enumerate(MONTH_NAMES)}),
+    ("day of week", 0, 7, {name: i for i, name in enumerate(DAY_NAMES)}),
+]
+
+# Give up looking for a match this far ahead (e.g. "0 0 30 2 *" never matches)
+SEARCH_YEARS = 5
+
+
+class CronError(ValueError):
+    """The cron expression cannot be parsed"""
+
+
+def _parse_value(text: str, name: str, low: int, high: int, names: dict) -> int:
+    value = names.get(text.lower())
+    if value is None:
+        try:
+            value = int(text)
+        except ValueError:
+            raise CronError(f"invalid {name} value '{text}'")
+    if not low <= value <= high:
+        raise CronError(f"{name} value {value} is outside {low}-{high}")
+    return value
+
+
+def _parse_field(text: str, name: str, low: int, high: int, names: dict) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"invalid {name} step '{step_text}'")
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start = _parse_value(start_text, name, low, high, names)
+            end = _parse_value(end_text, name, low, high, names)
+            if start > end:
+                raise CronError(f"invalid {name} range '{part}'")
+        else:
+            start = _parse_value(part, name, low, high, names)
+            # "5/15" means every 15 starting at 5
+            end = high if step > 1 else start
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A standard five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports ``*``, lists, ranges, steps, month and weekday names and the
+    ``@daily``-style aliases. As in cron, when both day fields are
+    restricted a day matching either one matches. Times are naive local
+    datetimes.
+    """
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise CronError(f"expected 5 fields, got {len(fields)} in '{expression}'")
+        parsed = [_parse_field(text, *spec) for text, spec in zip(fields, FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 7 is also Sunday; Python counts Monday as 0
+        self.weekdays = {(day % 7 - 1) % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        self._sorted_minutes: List[int] = sorted(self.minutes)
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = moment.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> Optional[datetime]:
+        """The first matching minute strictly after ``moment``, or None if there is none"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * SEARCH_YEARS)
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            later = [m for m in self._sorted_minutes if m >= candidate.minute]
+            if not later:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            return candidate.replace(minute=later[0])
+        return None
+
+    def between(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """Matching times after ``start`` up to and including ``end``"""
+        moment = self.next_after(start)
+        while moment is not None and moment <= end:
+            yield moment
+            moment = self.next_after(moment)
@@ -0,0 +1,297 @@
+# backend/services/deadline_watcher.py
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from backend.database import SessionLocal, session_scope
+from backend.models.models import Event, Reminder, Task
+from backend.services.reminder_service import reminder_service
+from backend.services.reminder_dispatcher import reminder_dispatcher
+from backend.services.job_executor import job_executor, job_run_log
+
+try:
+    from config import config
+    DEADLINE_LEAD_HOURS = config.DEADLINE_LEAD_HOURS
+    DEADLINE_HORIZON_HOURS = config.DEADLINE_HORIZON_HOURS
+    DEADLINE_REFRESH_SECONDS = config.DEADLINE_REFRESH_SECONDS
+    REMINDER_RETRY_SECONDS = config.REMINDER_RETRY_SECONDS
+except ImportError:
+    # Fallback if config is not available
+    DEADLINE_LEAD_HOURS = [24.0, 1.0]
+    DEADLINE_HORIZON_HOURS = 48.0
+    DEADLINE_REFRESH_SECONDS = 300.0
+    REMINDER_RETRY_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+# Reminder kind for each watched model, and the column holding its due time
+SOURCES = {
+    "task_deadline": (Task, Task.deadline),
+    "event_start": (Event, Event.start_time),
+}
+
+# (kind, item id, lead hours, due time) identifies one lead-time reminder
+EntryKey = Tuple[str, int, float, datetime]
+
+
+def _to_utc(moment: datetime) -> datetime:
+    """Naive local time (as stored on tasks and events) to naive UTC (as used by reminders)"""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class DeadlineWatcher:
+    """Emit reminders ahead of task deadlines and event start times.
+
+    Open tasks and events due within the next ``horizon_hours`` are kept in
+    a min-heap ordered by when each lead-time reminder should fire. The
+    heap is filled incrementally from ``(completed, deadline)`` and
+    ``(completed, start_time)`` index range scans: each refresh reads only
+    the slice of time that has just entered the horizon, plus items inside
+    it whose ``updated_at`` changed since the previous refresh, so the cost
+    does not grow with the number of open tasks. When an entry fires the
+    item is checked again (still open, same due time) and a reminder is
+    written through the ``Reminder`` model for the reminder dispatcher to
+    deliver. The reminder's kind and period key identify the item, lead
+    and due time, so a restart never repeats one. Entries from a failed
+    emit go back on the heap and fire again after ``retry_seconds``.
+    """
+    def __init__(self, lead_hours: List[float] = None, horizon_hours: float = None,
+                 refresh_seconds: float = None, retry_seconds: float = None):
+        self.lead_hours = sorted(set(DEADLINE_LEAD_HOURS if lead_hours is None else lead_hours), reverse=True)
+        self.horizon_hours = max(horizon_hours or DEADLINE_HORIZON_HOURS, max(self.lead_hours, default=0))
+        self.refresh_seconds = refresh_seconds or DEADLINE_REFRESH_SECONDS
+        self.retry_seconds = retry_seconds or REMINDER_RETRY_SECONDS
+        self._heap: List[Tuple[datetime, EntryKey]] = []
+        self._queued: Dict[EntryKey, Tuple[str, Optional[int]]] = {}
+        self._covered_until: Optional[datetime] = None
+        self._last_refresh: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.running = False
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_fire(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _queue(self, kind: str, item_id: int, title: str, project_id: Optional[int],
+               due: datetime, now: datetime) -> int:
+        """Queue the lead-time reminders still to come for one item; call with the lock held.
+
+        Leads that have already passed collapse into one reminder for the
+        shortest of them, e.g. a task added 30 minutes before its deadline
+        gets a single reminder now rather than one per lead.
+        """
+        due_utc = _to_utc(due)
+        if due_utc <= now:
+            return 0
+        queued = 0
+        passed = False
+        for lead in reversed(self.lead_hours):
+            fire_at = due_utc - timedelta(hours=lead)
+            if fire_at <= now:
+                if passed:
+                    continue
+                passed = True
+            key = (kind, item_id, lead, due)
+            if key in self._queued:
+                continue
+            # A lead that has already passed fires now, not at its (missed) time
+            heapq.heappush(self._heap, (max(fire_at, now), key))
+            self._queued[key] = (title or "", project_id)
+            queued += 1
+        return queued
+
+    def refresh(self) -> int:
+        """Queue items that entered the horizon or changed since the last refresh"""
+        if not self.lead_hours:
+            return 0
+        now = datetime.now()
+        horizon_end = now + timedelta(hours=self.horizon_hours)
+        with self._lock:
+            covered_until, last_refresh = self._covered_until, self._last_refresh
+
+        rows = []
+        with SessionLocal() as db:
+            for kind, (model, due_column) in SOURCES.items():
+                columns = (model.id, model.title, model.project_id, due_column)
+                # Newly inside the horizon: a range scan on (completed, due time)
+                rows += [(kind, *row) for row in db.query(*columns).filter(
+                    model.completed == False,
+                    due_column > (covered_until or now),
+                    due_column <= horizon_end
+                )]
+                if covered_until is not None:
+                    # Added or moved within the part of the horizon already read
+                    rows += [(kind, *row) for row in db.query(*columns).filter(
+                        model.completed == False,
+                        due_column > now,
+                        due_column <= covered_until,
+                        model.updated_at >= last_refresh
+                    )]
+
+        now_utc = datetime.utcnow()
+        with self._lock:
+            queued = sum(
+                self._queue(kind, item_id, title, project_id, due, now_utc)
+                for kind, item_id, title, project_id, due in rows
+            )
+            self._covered_until = horizon_end
+            self._last_refresh = now
+        return queued
+
+    def _pop_due(self, now: datetime) -> Tuple[List[Tuple[EntryKey, str, Optional[int]]], Optional[datetime]]:
+        """Entries due to fire by ``now``, and the earliest of their fire times"""
+        due, earliest = [], None
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, key = heapq.heappop(self._heap)
+                title, project_id = self._queued.pop(key, ("", None))
+                due.append((key, title, project_id))
+                earliest = earliest or fire_at
+        return due, earliest
+
+    def _requeue(self, entries: List[Tuple[EntryKey, str, Optional[int]]], fire_at: datetime) -> None:
+        """Put popped entries back on the heap to fire at ``fire_at``"""
+        with self._lock:
+            for key, title, project_id in entries:
+                if key in self._queued:
+                    continue
+                heapq.heappush(self._heap, (fire_at, key))
+                self._queued[key] = (title, project_id)
+
+    def _message(self, kind: str, title: str, due: datetime) -> str:
+        if kind == "event_start":
+            return f"📅 Event '{title}' starts at {due:%Y-%m-%d %H:%M}"
+        return f"⏰ Task '{title}' is due at {due:%Y-%m-%d %H:%M}"
+
+    def emit(self, entries: List[Tuple[EntryKey, str, Optional[int]]]) -> int:
+        """Write reminders for fired entries whose item is still open and due at the same time"""
+        now = datetime.utcnow()
+        rows: List[Dict[str, Any]] = []
+        with session_scope() as db:
+            current: Dict[Tuple[str, int], datetime] = {}
+            for kind, (model, due_column) in SOURCES.items():
+                ids = {key[1] for key, _, _ in entries if key[0] == kind}
+                if ids:
+                    current.update(
+                        ((kind, item_id), due) for item_id, due in db.query(model.id, due_column).filter(
+                            model.id.in_(ids), model.completed == False
+                        )
+                    )
+            for (kind, item_id, lead, due), title, project_id in entries:
+                if current.get((kind, item_id)) != due:
+                    # Completed, deleted or moved; a moved item is queued again by the next refresh
+                    continue
+                rows.append({
+                    "message": self._message(kind, title, due),
+                    "due_date": now,
+                    "sent": False,
+                    "project_id": project_id,
+                    "kind": kind,
+                    "period_key": f"{item_id}:{lead:g}h:{due:%Y-%m-%dT%H:%M:%S}",
+                })
+
+            # The unique index treats NULL projects as distinct, so check those rows here
+            ownerless = {row["period_key"] for row in rows if row["project_id"] is None}
+            if ownerless:
+                existing: Set[Tuple[str, str]] = set(db.query(Reminder.kind, Reminder.period_key).filter(
+                    Reminder.project_id.is_(None),
+                    Reminder.kind.in_(SOURCES),
+                    Reminder.period_key.in_(ownerless)
+                ).all())
+                rows = [
+                    row for row in rows
+                    if row["project_id"] is not None or (row["kind"], row["period_key"]) not in existing
+                ]
+            created = reminder_service.insert_generated_reminders(db, rows)
+
+        if created:
+            reminder_dispatcher.load_new()
+        return created
+
+    async def run(self):
+        """Refresh the queue and emit reminders as entries fall due until stopped"""
+        if not self.lead_hours:
+            logger.info("Deadline watcher disabled: no DEADLINE_LEAD_HOURS")
+            return
+        self.running = True
+        # Start from an empty queue: another worker may have led in the meantime
+        with self._lock:
+            self._heap, self._queued = [], {}
+            self._covered_until = self._last_refresh = None
+        loop = asyncio.get_running_loop()
+        next_refresh = loop.time()
+        loaded_once = False
+
+        while self.running:
+            try:
+                due, earliest = self._pop_due(datetime.utcnow())
+                if due:
+                    try:
+                        # Lag is measured from the earliest fire time in the batch
+                        async with job_run_log.track(
+                            "deadline_emit", earliest.replace(tzinfo=timezone.utc).timestamp()
+                        ) as run:
+                            created = await job_executor.run("deadline_emit", self.emit, due, timeout=60)
+                            run["rows"] = created
+                    except Exception as e:
+                        # refresh only reads new or changed items, so it would never queue these again
+                        retry_at = datetime.utcnow() + timedelta(seconds=self.retry_seconds)
+                        logger.error(
+                            f"Deadline emit of {len(due)} reminders failed, retrying in {self.retry_seconds:g}s: {e}"
+                        )
+                        self._requeue(due, retry_at)
+                        continue
+                    self.emitted += created
+                    if created:
+                        logger.info(f"⏰ Deadline watcher created {created} reminders")
+                    continue
+
+                if loop.time() >= next_refresh:
+                    async with job_run_log.track("deadline_refresh") as run:
+                        queued = await job_executor.run("deadline_refresh", self.refresh, timeout=60)
+                        run["rows"] = queued
+                    next_refresh = loop.time() + self.refresh_seconds
+                    if not loaded_once:
+                        logger.info(
+                            f"⏰ Deadline watcher queued {queued} reminders for the next {self.horizon_hours:g}h"
+                        )
+                        loaded_once = True
+                    continue
+
+                timeout = next_refresh - loop.time()
+                next_fire = self.next_fire()
+                if next_fire is not None:
+                    timeout = min(timeout, (next_fire - datetime.utcnow()).total_seconds())
+                if timeout > 0:
+                    await asyncio.sleep(timeout)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in deadline watcher: {e}")
+                await asyncio.sleep(60)
+
+    def stop(self):
+        self.running = False
+
+    def status(self) -> Dict[str, Any]:
+        next_fire = self.next_fire()
+        with self._lock:
+            covered_until = self._covered_until
+        return {
+            "lead_hours": self.lead_hours,
+            "queued": len(self),
+            "next_fire": next_fire.isoformat() if next_fire else None,
+            "covered_until": covered_until.isoformat() if covered_until else None,
+            "emitted": self.emitted,
+        }
+
+
+# Global watcher instance
+deadline_watcher = DeadlineWatcher()
@@ -0,0 +1,179 @@
+# backend/services/insights_service.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal, session_scope
+from backend.models.models import (
+    Project, ProjectPlan, ProjectMilestone, ProjectRisk, ScheduleAdjustment,
+    ProjectInsightSnapshot, Task, Devlog
+)
+from backend.services.ai_planning_service import ai_planning_service
+from backend.services.job_executor import job_executor
+
+try:
+    from config import config
+    INSIGHTS_ACTIVITY_DAYS = config.INSIGHTS_ACTIVITY_DAYS
+    INSIGHTS_PRECOMPUTE_CONCURRENCY = config.INSIGHTS_PRECOMPUTE_CONCURRENCY
+    INSIGHTS_SNAPSHOTS_KEPT = config.INSIGHTS_SNAPSHOTS_KEPT
+except ImportError:
+    # Fallback if config is not available
+    INSIGHTS_ACTIVITY_DAYS = 7
+    INSIGHTS_PRECOMPUTE_CONCURRENCY = 2
+    INSIGHTS_SNAPSHOTS_KEPT = 3
+
+logger = logging.getLogger(__name__)
+
+
+class InsightsService:
+    """Build project insights and keep precomputed snapshots of them.
+
+    A nightly job analyzes projects with recent activity and stores the
+    insights, including the model analysis, as ProjectInsightSnapshot rows
+    so the insights endpoint can answer from the last snapshot.
+    """
+
+    def build_insights(self, db: Session, project_id: int) -> Optional[Dict[str, Any]]:
+        """Current insights for a project straight from the database"""
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            return None
+
+        # Get the latest project plan if one exists
+        project_plan = db.query(ProjectPlan).filter(
+            ProjectPlan.project_id == project_id
+        ).order_by(ProjectPlan.id.desc()).first()
+
+        milestones = db.query(ProjectMilestone).filter(ProjectMilestone.project_id == project_id).all()
+        risks = db.query(ProjectRisk).filter(ProjectRisk.project_id == project_id).all()
+
+        # Get recent schedule adjustments
+        adjustments = db.query(ScheduleAdjustment).filter(
+            ScheduleAdjustment.project_id == project_id
+        ).order_by(ScheduleAdjustment.created_at.desc()).limit(5).all()
+
+        return {
+            "project": {
+                "id": project.id,
+                "title": project.title,
+                "description": project.description
+            },
+            "plan": project_plan.plan_data if project_plan else None,
+            "milestones": [
+                {
+                    "name": m.name,
+                    "description": m.description,
+                    "target_week": m.target_week,
+                    "completed": m.completed
+                } for m in milestones
+            ],
+            "risks": [
+                {
+                    "description": r.risk_description,
+                    "impact": r.impact_level,
+                    "mitigation": r.mitigation_strategy,
+                    "status": r.status
+                } for r in risks
+            ],
+            "recent_adjustments": [
+                {
+                    "reason": a.adjustment_reason,
+                    "old_deadline": a.old_deadline.isoformat() if a.old_deadline else None,
+                    "new_deadline": a.new_deadline.isoformat() if a.new_deadline else None,
+                    "date": a.created_at.isoformat()
+                } for a in adjustments
+            ]
+        }
+
+    def latest_snapshot(self, db: Session, project_id: int) -> Optional[Dict[str, Any]]:
+        snapshot = db.query(ProjectInsightSnapshot).filter(
+            ProjectInsightSnapshot.project_id == project_id
+        ).order_by(ProjectInsightSnapshot.created_at.desc(), ProjectInsightSnapshot.id.desc()).first()
+        return self._snapshot_result(snapshot) if snapshot else None
+
+    def _snapshot_result(self, snapshot: ProjectInsightSnapshot) -> Dict[str, Any]:
+        return {
+            **snapshot.insights,
+            "snapshot_id": snapshot.id,
+            "snapshot_created_at": snapshot.created_at.isoformat(),
+            "snapshot_age_seconds": round((datetime.now() - snapshot.created_at).total_seconds()),
+        }
+
+    def precompute(self, project_id: int, analyze: bool = True) -> Optional[Dict[str, Any]]:
+        """Compute and store an insights snapshot for one project.
+
+        With ``analyze`` the model analysis is refreshed (reusing a stored one
+        if the project has not changed); otherwise the latest stored analysis
+        is included as is.
+        """
+        if analyze:
+            analysis = ai_planning_service.analyze_project_progress(project_id)
+            if "error" in analysis:
+                logger.warning(f"Insights for project {project_id} stored without analysis: {analysis['error']}")
+                analysis = ai_planning_service.get_analysis_snapshot(project_id)
+        else:
+            analysis = ai_planning_service.get_analysis_snapshot(project_id)
+
+        with session_scope() as db:
+            insights = self.build_insights(db, project_id)
+            if insights is None:
+                return None
+            insights["analysis"] = analysis
+
+            snapshot = ProjectInsightSnapshot(
+                project_id=project_id,
+                analysis_id=analysis.get("snapshot_id") if analysis else None,
+                insights=insights
+            )
+            db.add(snapshot)
+            db.flush()
+
+            # Keep only the most recent snapshots per project
+            stale_ids = [row.id for row in db.query(ProjectInsightSnapshot.id).filter(
+                ProjectInsightSnapshot.project_id == project_id
+            ).order_by(ProjectInsightSnapshot.id.desc()).offset(INSIGHTS_SNAPSHOTS_KEPT)]
+            if stale_ids:
+                db.query(ProjectInsightSnapshot).filter(
+                    ProjectInsightSnapshot.id.in_(stale_ids)
+                ).delete(synchronize_session=False)
+
+            return self._snapshot_result(snapshot)
+
+    def active_project_ids(self, since: datetime) -> List[int]:
+        """Projects with tasks changed or devlogs written since ``since``"""
+        with SessionLocal() as db:
+            recent = union(
+                select(Task.project_id).where(Task.updated_at >= since),
+                select(Devlog.project_id).where(Devlog.created_at >= since),
+            )
+            return sorted(pid for pid in db.execute(recent).scalars() if pid is not None)
+
+    async def precompute_active_projects(self) -> Dict[str, int]:
+        """Refresh snapshots for recently active projects with bounded concurrency.
+
+        A project that fails is logged and skipped so the others still run;
+        returns how many were refreshed (``rows``) and how many failed.
+        """
+        since = datetime.now() - timedelta(days=INSIGHTS_ACTIVITY_DAYS)
+        project_ids = await job_executor.run(
+            "insights_active_projects", self.active_project_ids, since, timeout=60
+        )
+        semaphore = asyncio.Semaphore(INSIGHTS_PRECOMPUTE_CONCURRENCY)
+
+        async def run(project_id: int) -> bool:
+            async with semaphore:
+                try:
+                    return await job_executor.run("insights_precompute", self.precompute, project_id) is not None
+                except Exception as e:
+                    logger.error(f"Failed to precompute insights for project {project_id}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(run(pid) for pid in project_ids))
+        logger.info(f"Precomputed insights for {sum(results)}/{len(project_ids)} active projects")
+        return {"rows": sum(results), "failures": len(results) - sum(results)}
+
+
+# Global service instance
+insights_service = InsightsService()
@@ -0,0 +1,290 @@
+# backend/services/job_executor.py
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from ai import _percentile
+
+try:
+    from config import config
+    SCHEDULER_JOB_WORKERS = config.SCHEDULER_JOB_WORKERS
+    SCHEDULER_JOB_TIMEOUT = config.SCHEDULER_JOB_TIMEOUT
+    LOOP_LAG_INTERVAL_MS = config.LOOP_LAG_INTERVAL_MS
+    LOOP_LAG_WARN_MS = config.LOOP_LAG_WARN_MS
+except ImportError:
+    # Fallback if config is not available
+    SCHEDULER_JOB_WORKERS = 4
+    SCHEDULER_JOB_TIMEOUT = 600.0
+    LOOP_LAG_INTERVAL_MS = 100.0
+    LOOP_LAG_WARN_MS = 100.0
+
+logger = logging.getLogger(__name__)
+
+
+class JobTimeoutError(TimeoutError):
+    """A scheduler job ran past its timeout"""
+
+
+class JobExecutor:
+    """Run blocking scheduler jobs in a dedicated thread pool.
+
+    Scheduler jobs do synchronous SQLAlchemy and HTTP work; running them
+    here keeps them off the event loop and out of the threadpool that
+    serves sync routes, so a slow sweep cannot starve requests. Each call
+    has a timeout. A thread cannot be interrupted, so a job that times out
+    keeps its worker until it returns; it is counted as ``overrunning``
+    so a stuck job shows up instead of silently eating the pool.
+    """
+    def __init__(self, max_workers: int = None, default_timeout: float = None):
+        self.max_workers = max_workers or SCHEDULER_JOB_WORKERS
+        self.default_timeout = default_timeout or SCHEDULER_JOB_TIMEOUT
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.running = 0
+        self.overrunning = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduler-job")
+            return self._pool
+
+    def _call(self, name: str, fn: Callable, args: tuple, kwargs: dict, state: Dict[str, bool]) -> Any:
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                state["finished"] = True
+                if state["timed_out"]:
+                    self.overrunning -= 1
+                    logger.warning(f"Scheduler job {name} finished after its timeout")
+
+    async def run(self, name: str, fn: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the job pool and await its result"""
+        timeout = timeout or self.default_timeout
+        state = {"timed_out": False, "finished": False}
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor(), lambda: self._call(name, fn, args, kwargs, state))
+        try:
+            # shield: on timeout stop waiting, but let the thread run to completion
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+                if not state["finished"]:
+                    state["timed_out"] = True
+                    self.overrunning += 1
+            logger.error(f"Scheduler job {name} timed out after {timeout:g}s")
+            raise JobTimeoutError(f"{name} timed out after {timeout:g}s")
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self.running,
+                "overrunning": self.overrunning,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a sleeping coroutine.
+
+    Sleeps ``interval`` at a time; any extra delay is time the loop spent
+    running code that did not yield. Samples go to a ring buffer and stalls
+    above ``warn_ms`` are logged.
+    """
+    def __init__(self, interval_ms: float = None, warn_ms: float = None, size: int = 3000):
+        self.interval = (interval_ms or LOOP_LAG_INTERVAL_MS) / 1000
+        self.warn_ms = warn_ms or LOOP_LAG_WARN_MS
+        self._samples: deque = deque(maxlen=size)
+        self.max_ms = 0.0
+        self.stalls = 0
+        self.running = False
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.running = True
+        while self.running:
+            try:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag_ms = max(0.0, (loop.time() - expected) * 1000)
+                self._samples.append((time.time(), lag_ms))
+                self.max_ms = max(self.max_ms, lag_ms)
+                if lag_ms >= self.warn_ms:
+                    self.stalls += 1
+                    logger.warning(f"Event loop blocked for {lag_ms:.0f}ms")
+            except asyncio.CancelledError:
+                break
+
+    def stop(self):
+        self.running = False
+
+    def summary(self, window_seconds: float = 300) -> Dict[str, Any]:
+        since = time.time() - window_seconds
+        lags = [lag for at, lag in list(self._samples) if at >= since]
+        return {
+            "interval_ms": self.interval * 1000,
+            "window_seconds": window_seconds,
+            "samples": len(lags),
+            "p50_ms": _percentile(lags, 50),
+            "p99_ms": _percentile(lags, 99),
+            "window_max_ms": round(max(lags), 1) if lags else None,
+            "max_ms": round(self.max_ms, 1),
+            "stalls": self.stalls,
+            "warn_ms": self.warn_ms,
+        }
+
+
+def _timestamp(at: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(at).isoformat(timespec="milliseconds") if at is not None else None
+
+
+class JobRunLog:
+    """Recent runs of each scheduler job with their timings, in per-job ring buffers.
+
+    A run records when it was meant to start and when it actually started
+    and finished, so both its duration and its scheduling lag (actual minus
+    intended start) are known, along with its status, error, the rows it
+    processed and how many items in it failed. Each job keeps its last ``size`` runs, so a job that runs
+    every few seconds does not push out a weekly one. Times are Unix
+    timestamps; callers convert their own clock with ``datetime.timestamp``.
+    """
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._runs: Dict[str, deque] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._runs
+
+    @asynccontextmanager
+    async def track(self, name: str, scheduled_at: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Record the wrapped block as one run of ``name``.
+
+        The yielded dict can be updated with ``rows`` and ``failures``, or with
+        ``status`` and ``error`` when the block handles its own failures; an
+        exception escaping the block is recorded and re-raised.
+        """
+        run = {"status": "ok", "error": None, "rows": None, "failures": None}
+        started = time.time()
+        try:
+            yield run
+        except (asyncio.TimeoutError, JobTimeoutError) as e:
+            run.update(status="timeout", error=str(e) or "timed out")
+            raise
+        except asyncio.CancelledError:
+            run.update(status="cancelled")
+            raise
+        except Exception as e:
+            run.update(status="error", error=str(e))
+            raise
+        finally:
+            self.record(name, started, time.time(), scheduled_at, **run)
+
+    def record(self, name: str, started_at: float, finished_at: float, scheduled_at: Optional[float] = None,
+               status: str = "ok", error: Optional[str] = None, rows: Optional[int] = None,
+               failures: Optional[int] = None) -> None:
+        entry = {
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "scheduled_at": scheduled_at,
+            "duration_ms": (finished_at - started_at) * 1000,
+            "lag_ms": (started_at - scheduled_at) * 1000 if scheduled_at is not None else None,
+            "status": status,
+            "error": error,
+            "rows": rows,
+            "failures": failures,
+        }
+        with self._lock:
+            runs = self._runs.get(name)
+            if runs is None:
+                runs = self._runs[name] = deque(maxlen=self.size)
+                self._totals[name] = {"runs": 0, "errors": 0}
+            runs.append(entry)
+            self._totals[name]["runs"] += 1
+            if status != "ok":
+                self._totals[name]["errors"] += 1
+
+    def _public(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "scheduled_for": _timestamp(entry["scheduled_at"]),
+            "started_at": _timestamp(entry["started_at"]),
+            "finished_at": _timestamp(entry["finished_at"]),
+            "duration_ms": round(entry["duration_ms"], 1),
+            "lag_ms": round(entry["lag_ms"], 1) if entry["lag_ms"] is not None else None,
+            "status": entry["status"],
+            "error": entry["error"],
+            "rows": entry["rows"],
+            "failures": entry["failures"],
+        }
+
+    def summary(self, recent: int = 10) -> Dict[str, Any]:
+        """Per job: totals, percentile duration and lag over the buffered runs, and the latest runs"""
+        with self._lock:
+            snapshot = {name: (list(runs), dict(self._totals[name])) for name, runs in self._runs.items()}
+        jobs = {}
+        for name, (runs, totals) in sorted(snapshot.items()):
+            durations = [run["duration_ms"] for run in runs]
+            lags = [run["lag_ms"] for run in runs if run["lag_ms"] is not None]
+            jobs[name] = {
+                **totals,
+                "buffered": len(runs),
+                "failed_recent": sum(1 for run in runs if run["status"] != "ok"),
+                "rows_recent": sum(run["rows"] or 0 for run in runs),
+                "item_failures_recent": sum(run["failures"] or 0 for run in runs),
+                "duration_ms": {
+                    "p50": _percentile(durations, 50),
+                    "p95": _percentile(durations, 95),
+                    "p99": _percentile(durations, 99),
+                    "max": round(max(durations), 1) if durations else None,
+                },
+                "lag_ms": {
+                    "p50": _percentile(lags, 50),
+                    "p95": _percentile(lags, 95),
+                    "p99": _percentile(lags, 99),
+                    "max": round(max(lags), 1) if lags else None,
+                },
+                "recent": [self._public(run) for run in reversed(runs[-recent:])] if recent else [],
+            }
+        return jobs
+
+    def runs(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Latest runs of one job, newest first"""
+        with self._lock:
+            runs = list(self._runs.get(name, ()))
+        return [self._public(run) for run in reversed(runs[-limit:])] if limit else []
+
+
+# Global instances
+job_executor = JobExecutor()
+loop_lag_monitor = LoopLagMonitor()
+job_run_log = JobRunLog()
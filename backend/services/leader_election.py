@@ -0,0 +1,147 @@
+# backend/services/leader_election.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from backend.database import SessionLocal, session_scope
+from backend.models.models import SchedulerLease
+
+try:
+    from config import config
+    SCHEDULER_LEASE_TTL = config.SCHEDULER_LEASE_TTL
+except ImportError:
+    # Fallback if config is not available
+    SCHEDULER_LEASE_TTL = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """Elect one process to run the scheduler through a lease row in the database.
+
+    Every worker tries to take the ``scheduler_leases`` row with a single
+    conditional UPDATE that only succeeds if the lease is free, expired or
+    already its own, so exactly one worker holds it at a time. The holder
+    renews it every third of the TTL; if the holder dies the lease expires
+    and another worker takes over within one TTL. A leader that cannot
+    renew before its lease runs out steps down on its own. Lease times use
+    the workers' clocks, so workers on different hosts need synced clocks.
+    Lease queries run on a thread of their own rather than the scheduler
+    job pool, so long jobs filling that pool cannot delay a renewal and
+    make a healthy leader step down.
+    """
+    def __init__(self, name: str = "scheduler", ttl: float = None):
+        self.name = name
+        self.ttl = ttl or SCHEDULER_LEASE_TTL
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.expires_at: Optional[datetime] = None
+        self.running = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leader-lease")
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; True if this process holds it afterwards"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        renewal = {"renewed_at": now, "expires_at": expires_at}
+        with session_scope() as db:
+            renewed = db.execute(
+                update(SchedulerLease).where(
+                    SchedulerLease.name == self.name, SchedulerLease.holder == self.holder_id
+                ).values(**renewal)
+            ).rowcount
+            if not renewed:
+                renewed = db.execute(
+                    update(SchedulerLease).where(
+                        SchedulerLease.name == self.name,
+                        or_(SchedulerLease.expires_at < now, SchedulerLease.holder.is_(None))
+                    ).values(holder=self.holder_id, acquired_at=now, **renewal)
+                ).rowcount
+        if not renewed:
+            try:
+                with session_scope() as db:
+                    db.execute(insert(SchedulerLease), [
+                        {"name": self.name, "holder": self.holder_id, "acquired_at": now, **renewal}
+                    ])
+                renewed = 1
+            except IntegrityError:
+                # Another worker holds the row
+                renewed = 0
+        self.expires_at = expires_at if renewed else None
+        return bool(renewed)
+
+    def release(self) -> None:
+        """Give the lease up so another worker can take it without waiting for expiry"""
+        with session_scope() as db:
+            db.execute(
+                update(SchedulerLease).where(
+                    SchedulerLease.name == self.name, SchedulerLease.holder == self.holder_id
+                ).values(holder=None, expires_at=datetime.utcnow())
+            )
+
+    def lease(self) -> Optional[Dict[str, Any]]:
+        with SessionLocal() as db:
+            row = db.get(SchedulerLease, self.name)
+            if row is None:
+                return None
+            return {
+                "name": row.name,
+                "holder": row.holder,
+                "acquired_at": row.acquired_at.isoformat() if row.acquired_at else None,
+                "renewed_at": row.renewed_at.isoformat() if row.renewed_at else None,
+                "expires_at": row.expires_at.isoformat() if row.expires_at else None,
+                "expired": row.expires_at is None or row.expires_at < datetime.utcnow(),
+            }
+
+    async def _call(self, fn: Callable[[], Any], timeout: float) -> Any:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._executor, fn), timeout)
+
+    async def run(self, on_elected: Callable[[], Awaitable[None]], on_demoted: Callable[[], Awaitable[None]],
+                  on_renewed: Callable[[], Awaitable[None]] = None):
+        """Campaign for the lease until stopped, calling back on every change of role"""
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    held = await self._call(self.try_acquire, timeout=self.ttl / 3)
+                except Exception as e:
+                    logger.error(f"Could not renew scheduler lease: {e}")
+                    # Keep leading only while the lease taken earlier is still valid
+                    held = self.is_leader and self.expires_at is not None and datetime.utcnow() < self.expires_at
+
+                if held and not self.is_leader:
+                    self.is_leader = True
+                    logger.info(f"👑 {self.holder_id} is now the scheduler leader")
+                    await on_elected()
+                elif not held and self.is_leader:
+                    self.is_leader = False
+                    logger.warning(f"{self.holder_id} lost the scheduler lease")
+                    await on_demoted()
+                elif held and on_renewed:
+                    await on_renewed()
+
+                await asyncio.sleep(self.ttl / 3)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self.is_leader:
+                self.is_leader = False
+                await on_demoted()
+                try:
+                    await self._call(self.release, timeout=10)
+                except Exception as e:
+                    logger.error(f"Could not release scheduler lease: {e}")
+
+    def stop(self):
+        self.running = False
+
+
+# Global elector instance
+leader_elector = LeaderElector()
@@ -0,0 +1,317 @@
+# backend/services/notifications.py
+import asyncio
+import logging
+import random
+import smtplib
+from collections import deque
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from backend.services.job_executor import job_executor
+
+try:
+    from config import config
+    NOTIFICATION_CHANNELS = config.NOTIFICATION_CHANNELS
+    NOTIFICATION_WORKERS = config.NOTIFICATION_WORKERS
+    NOTIFICATION_BATCH_SIZE = config.NOTIFICATION_BATCH_SIZE
+    NOTIFICATION_MAX_ATTEMPTS = config.NOTIFICATION_MAX_ATTEMPTS
+    NOTIFICATION_RETRY_BACKOFF = config.NOTIFICATION_RETRY_BACKOFF
+    NOTIFICATION_TIMEOUT = config.NOTIFICATION_TIMEOUT
+    NOTIFICATION_WEBHOOK_URL = config.NOTIFICATION_WEBHOOK_URL
+    SMTP_HOST = config.SMTP_HOST
+    SMTP_PORT = config.SMTP_PORT
+    SMTP_USERNAME = config.SMTP_USERNAME
+    SMTP_PASSWORD = config.SMTP_PASSWORD
+    SMTP_STARTTLS = config.SMTP_STARTTLS
+    SMTP_FROM = config.SMTP_FROM
+    SMTP_TO = config.SMTP_TO
+except ImportError:
+    # Fallback if config is not available
+    NOTIFICATION_CHANNELS = ["log"]
+    NOTIFICATION_WORKERS = 4
+    NOTIFICATION_BATCH_SIZE = 50
+    NOTIFICATION_MAX_ATTEMPTS = 3
+    NOTIFICATION_RETRY_BACKOFF = 2.0
+    NOTIFICATION_TIMEOUT = 10.0
+    NOTIFICATION_WEBHOOK_URL = ""
+    SMTP_HOST = ""
+    SMTP_PORT = 587
+    SMTP_USERNAME = ""
+    SMTP_PASSWORD = ""
+    SMTP_STARTTLS = True
+    SMTP_FROM = ""
+    SMTP_TO = ""
+
+logger = logging.getLogger(__name__)
+
+
+def notification_payload(notification: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-friendly form of a notification, as sent to webhooks and SSE clients"""
+    due_date = notification.get("due_date")
+    return {
+        "reminder_id": notification.get("reminder_id"),
+        "message": notification.get("message"),
+        "due_date": due_date.isoformat() if isinstance(due_date, datetime) else due_date,
+    }
+
+
+class NotificationChannel:
+    """Delivers batches of notifications.
+
+    ``send_batch`` returns one entry per notification: None when it was
+    delivered, or the error. Raising means nothing in the batch was
+    delivered, e.g. the server could not be reached; a connection lost
+    partway through fails only the items not yet sent, so the ones
+    already delivered are not retried.
+    """
+    name = "channel"
+
+    async def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class LogChannel(NotificationChannel):
+    name = "log"
+
+    async def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        for notification in notifications:
+            logger.info(f"🔔 REMINDER DUE: {notification['message']}")
+            logger.info(f"📅 Due date: {notification['due_date']}")
+        return [None] * len(notifications)
+
+
+class SmtpChannel(NotificationChannel):
+    """Email each notification, using one SMTP session for the whole batch"""
+    name = "smtp"
+
+    def __init__(self, host: str = None, port: int = None, username: str = None, password: str = None,
+                 starttls: bool = None, sender: str = None, recipients: str = None, timeout: float = None):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.username = username if username is not None else SMTP_USERNAME
+        self.password = password if password is not None else SMTP_PASSWORD
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.sender = sender or SMTP_FROM
+        self.recipients = [r.strip() for r in (recipients or SMTP_TO).split(",") if r.strip()]
+        self.timeout = timeout or NOTIFICATION_TIMEOUT
+
+    def _message(self, notification: Dict[str, Any]) -> MIMEMultipart:
+        message = MIMEMultipart()
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message["Subject"] = f"Reminder: {notification['message'][:60]}"
+        message.attach(MIMEText(f"{notification['message']}\n\nDue: {notification['due_date']}", "plain", "utf-8"))
+        return message
+
+    def _send(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for notification in notifications:
+                try:
+                    smtp.send_message(self._message(notification), self.sender, self.recipients)
+                    errors.append(None)
+                except smtplib.SMTPServerDisconnected as e:
+                    # This and the remaining items were not sent; the rest of the batch was
+                    errors.extend([f"SMTP disconnected: {e}"] * (len(notifications) - len(errors)))
+                    return errors
+                except smtplib.SMTPException as e:
+                    errors.append(f"SMTP error: {e}")
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                # Everything was handed over already; a failing QUIT changes nothing
+                pass
+        return errors
+
+    async def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        if not self.host or not self.recipients:
+            raise RuntimeError("SMTP_HOST and SMTP_TO must be set for the smtp channel")
+        return await job_executor.run(
+            "smtp_send", self._send, notifications, timeout=self.timeout * (len(notifications) + 2)
+        )
+
+
+class WebhookChannel(NotificationChannel):
+    """POST each notification as JSON over a pooled keep-alive HTTP session"""
+    name = "webhook"
+
+    def __init__(self, url: str = None, timeout: float = None, pool_size: int = None):
+        self.url = url or NOTIFICATION_WEBHOOK_URL
+        self.timeout = timeout or NOTIFICATION_TIMEOUT
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or NOTIFICATION_WORKERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _send(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for notification in notifications:
+            try:
+                response = self.session.post(self.url, json=notification_payload(notification), timeout=self.timeout)
+                errors.append(None if response.ok else f"HTTP {response.status_code}: {response.text[:200]}")
+            except requests.exceptions.ConnectionError as e:
+                # The endpoint is gone: fail this and the remaining items, keep what was delivered
+                errors.extend([f"Connection error: {e}"] * (len(notifications) - len(errors)))
+                return errors
+            except requests.exceptions.RequestException as e:
+                errors.append(str(e))
+        return errors
+
+    async def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        if not self.url:
+            raise RuntimeError("NOTIFICATION_WEBHOOK_URL must be set for the webhook channel")
+        return await job_executor.run(
+            "webhook_send", self._send, notifications, timeout=self.timeout * (len(notifications) + 1)
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class NotificationBroadcaster:
+    """Fan notifications out to connected in-app (SSE) clients.
+
+    Each client gets a bounded queue; a client that stops reading loses
+    its oldest events rather than holding memory. Only clients connected
+    to the worker that runs the scheduler receive events.
+    """
+    def __init__(self, queue_size: int = 100, recent_size: int = 20):
+        self.queue_size = queue_size
+        self._subscribers: set = set()
+        self.recent: deque = deque(maxlen=recent_size)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Queue an event for every subscriber; call from the event loop"""
+        self.recent.append(event)
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+        return len(self._subscribers)
+
+
+class SseChannel(NotificationChannel):
+    name = "sse"
+
+    def __init__(self, broadcaster: NotificationBroadcaster):
+        self.broadcaster = broadcaster
+
+    async def send_batch(self, notifications: List[Dict[str, Any]]) -> List[Optional[str]]:
+        for notification in notifications:
+            self.broadcaster.publish(notification_payload(notification))
+        return [None] * len(notifications)
+
+
+class NotificationPipeline:
+    """Deliver notifications through every configured channel.
+
+    Notifications are split into batches per channel and delivered by a
+    bounded pool of concurrent workers. Items that fail are retried with
+    exponential backoff and jitter, and after ``max_attempts`` they are
+    returned as dead letters for the caller to store. One failing channel
+    does not hold back the others.
+    """
+    def __init__(self, channel_names: List[str] = None, workers: int = None, batch_size: int = None,
+                 max_attempts: int = None, backoff: float = None):
+        self.channel_names = channel_names or NOTIFICATION_CHANNELS
+        self.workers = workers or NOTIFICATION_WORKERS
+        self.batch_size = batch_size or NOTIFICATION_BATCH_SIZE
+        self.max_attempts = max_attempts or NOTIFICATION_MAX_ATTEMPTS
+        self.backoff = NOTIFICATION_RETRY_BACKOFF if backoff is None else backoff
+        self._channels: Optional[List[NotificationChannel]] = None
+
+    def _build_channel(self, name: str) -> NotificationChannel:
+        if name == "log":
+            return LogChannel()
+        if name == "smtp":
+            return SmtpChannel()
+        if name == "webhook":
+            return WebhookChannel()
+        if name == "sse":
+            return SseChannel(notification_broadcaster)
+        raise ValueError(f"Unknown notification channel: {name}")
+
+    @property
+    def channels(self) -> List[NotificationChannel]:
+        if self._channels is None:
+            self._channels = [self._build_channel(name) for name in self.channel_names]
+        return self._channels
+
+    async def deliver(self, notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send notifications on all channels; returns the ones that failed for good"""
+        if not notifications:
+            return []
+        semaphore = asyncio.Semaphore(self.workers)
+        batches = [
+            (channel, notifications[start:start + self.batch_size])
+            for channel in self.channels
+            for start in range(0, len(notifications), self.batch_size)
+        ]
+        results = await asyncio.gather(*(
+            self._deliver_batch(semaphore, channel, batch) for channel, batch in batches
+        ))
+        return [dead for dead_letters in results for dead in dead_letters]
+
+    async def _deliver_batch(self, semaphore: asyncio.Semaphore, channel: NotificationChannel,
+                             batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        pending, errors = batch, []
+        for attempt in range(1, self.max_attempts + 1):
+            async with semaphore:
+                try:
+                    results = await channel.send_batch(pending)
+                except Exception as e:
+                    results = [f"{type(e).__name__}: {e}"] * len(pending)
+            failed = [(item, error) for item, error in zip(pending, results) if error]
+            if not failed:
+                return []
+            pending, errors = [item for item, _ in failed], [error for _, error in failed]
+            if attempt < self.max_attempts:
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"{len(pending)} {channel.name} notifications failed (attempt {attempt}), "
+                    f"retrying in {delay:.1f}s: {errors[0]}"
+                )
+                # Back off outside the semaphore so other batches keep flowing
+                await asyncio.sleep(delay)
+
+        logger.error(f"{len(pending)} {channel.name} notifications failed after {self.max_attempts} attempts")
+        return [
+            {
+                "reminder_id": item.get("reminder_id"),
+                "channel": channel.name,
+                "message": item.get("message"),
+                "error": error,
+                "attempts": self.max_attempts,
+            }
+            for item, error in zip(pending, errors)
+        ]
+
+    def close(self) -> None:
+        for channel in self._channels or []:
+            channel.close()
+
+
+# Global instances
+notification_broadcaster = NotificationBroadcaster()
+notification_pipeline = NotificationPipeline()
@@ -0,0 +1,562 @@
+# backend/services/plan_import.py
+import time
+import logging
+from typing import Dict, List, Any, Optional, Set
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from backend.models.models import Project, Task, ProjectPlan, ProjectMilestone, ProjectRisk
+from backend.services.title_index import TaskTitleIndex
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("high", "medium", "low")
+
+
+class PlanValidationError(ValueError):
+    """The plan is structurally unusable; ``errors`` lists every problem found"""
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _title_key(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+class _PhaseTimer:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.timings[f"{phase}_ms"] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+
+class PlanImporter:
+    """Persist AI-generated plans with bulk inserts.
+
+    The whole plan is validated before anything is written. Tasks, milestones
+    and risks are then each inserted with a single executemany INSERT, and
+    task dependency titles are resolved to ids in the same transaction.
+    Timings are reported per phase.
+    """
+
+    def validate_tasks(self, tasks: Any, hours_key: str = "estimated_hours", label: str = "tasks") -> List[str]:
+        errors = []
+        if not isinstance(tasks, list):
+            return [f"{label} must be a list"]
+        for i, task in enumerate(tasks):
+            if not isinstance(task, dict):
+                errors.append(f"{label}[{i}] must be an object")
+                continue
+            title = task.get("title")
+            if title is not None and not isinstance(title, str):
+                errors.append(f"{label}[{i}].title must be a string")
+            hours = task.get(hours_key)
+            if hours is not None and (isinstance(hours, bool) or not isinstance(hours, (int, float)) or hours < 0):
+                errors.append(f"{label}[{i}].{hours_key} must be a non-negative number")
+            deps = task.get("dependencies")
+            if deps is not None and (not isinstance(deps, list) or not all(isinstance(d, str) for d in deps)):
+                errors.append(f"{label}[{i}].dependencies must be a list of titles")
+        return errors
+
+    def validate(self, plan_data: Any) -> None:
+        if not isinstance(plan_data, dict):
+            raise PlanValidationError(["plan must be an object"])
+
+        errors = self.validate_tasks(plan_data.get("tasks", []))
+        for key in ("milestones", "risks"):
+            items = plan_data.get(key, [])
+            if not isinstance(items, list):
+                errors.append(f"{key} must be a list")
+            else:
+                errors += [f"{key}[{i}] must be an object" for i, item in enumerate(items) if not isinstance(item, dict)]
+        weeks = plan_data.get("estimated_duration_weeks")
+        if weeks is not None and (isinstance(weeks, bool) or not isinstance(weeks, (int, float))):
+            errors.append("estimated_duration_weeks must be a number")
+
+        if errors:
+            raise PlanValidationError(errors)
+
+    def import_project_plan(self, db: Session, plan_data: Dict[str, Any], project_title: str = None,
+                            project_description: str = None) -> Dict[str, Any]:
+        """Create a project with its plan, tasks, milestones and risks, and commit"""
+        timer = _PhaseTimer()
+        self.validate(plan_data)
+        timer.mark("validate")
+
+        project_id = db.execute(
+            insert(Project).returning(Project.id),
+            [{
+                "title": plan_data.get("project_title", project_title or "AI Generated Project"),
+                "description": plan_data.get("project_description", project_description),
+            }]
+        ).scalar_one()
+        plan_id = db.execute(
+            insert(ProjectPlan).returning(ProjectPlan.id),
+            [{
+                "project_id": project_id,
+                "ai_generated": True,
+                "plan_data": plan_data,
+                "estimated_duration_weeks": plan_data.get("estimated_duration_weeks", 4),
+                "difficulty_level": plan_data.get("difficulty_level", "intermediate"),
+            }]
+        ).scalar_one()
+        timer.mark("project")
+
+        counts = self._insert_plan_items(db, project_id, plan_data, timer)
+
+        db.commit()
+        timer.mark("commit")
+
+        logger.info(
+            f"Imported plan for project {project_id}: {len(counts['task_ids'])} tasks, "
+            f"{counts['milestones']} milestones, {counts['risks']} risks ({timer.timings})"
+        )
+        return {
+            "project_id": project_id,
+            "plan_id": plan_id,
+            "task_ids": counts["task_ids"],
+            "unresolved_dependencies": counts["unresolved_dependencies"],
+            "timings": timer.timings,
+        }
+
+    def replace_plan(self, db: Session, project_id: int, plan_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Swap a project's generated plan for a new one, keeping work already done.
+
+        Generated tasks that are still open with no time logged or deadline
+        set are deleted, along with open milestones and active risks; the new
+        plan's items are inserted in their place, skipping tasks whose titles
+        match a kept task. Kept tasks' dependencies are then relinked in the
+        same transaction so none points at a deleted task. The caller commits.
+        """
+        timer = _PhaseTimer()
+        self.validate(plan_data)
+        timer.mark("validate")
+
+        untouched = select(Task.id).where(
+            Task.project_id == project_id,
+            Task.ai_generated.is_(True),
+            Task.parent_task_id.is_(None),
+            Task.completed.isnot(True),
+            Task.deadline.is_(None),
+            ~Task.timelogs.any()
+        )
+        removed = db.execute(
+            delete(Task).where(Task.id.in_(untouched)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.execute(
+            delete(ProjectMilestone).where(
+                ProjectMilestone.project_id == project_id, ProjectMilestone.completed.isnot(True)
+            ).execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(ProjectRisk).where(
+                ProjectRisk.project_id == project_id, ProjectRisk.status == "active"
+            ).execution_options(synchronize_session=False)
+        )
+        kept_titles = {
+            _title_key(title or "") for title in db.execute(
+                select(Task.title).where(Task.project_id == project_id, Task.parent_task_id.is_(None))
+            ).scalars()
+        }
+        timer.mark("clear")
+
+        plan_id = db.execute(
+            select(ProjectPlan.id).where(ProjectPlan.project_id == project_id).order_by(ProjectPlan.id.desc())
+        ).scalars().first()
+        plan_values = {
+            "plan_data": plan_data,
+            "estimated_duration_weeks": plan_data.get("estimated_duration_weeks", 4),
+            "difficulty_level": plan_data.get("difficulty_level", "intermediate"),
+        }
+        if plan_id is None:
+            plan_id = db.execute(
+                insert(ProjectPlan).returning(ProjectPlan.id),
+                [{"project_id": project_id, "ai_generated": True, **plan_values}]
+            ).scalar_one()
+        else:
+            db.execute(update(ProjectPlan).where(ProjectPlan.id == plan_id).values(**plan_values))
+        timer.mark("plan")
+
+        counts = self._insert_plan_items(db, project_id, plan_data, timer, skip_titles=kept_titles)
+        relinked = self._relink_kept_tasks(db, project_id, set(counts["task_ids"]))
+        timer.mark("relink")
+        return {
+            "project_id": project_id,
+            "plan_id": plan_id,
+            "removed_tasks": removed,
+            "relinked_tasks": relinked,
+            "task_ids": counts["task_ids"],
+            "unresolved_dependencies": counts["unresolved_dependencies"],
+            "timings": timer.timings,
+        }
+
+    def apply_replan(self, db: Session, project_id: int, refs: Dict[int, int], replan: Dict[str, Any],
+                     project_description: str = None) -> Dict[str, Any]:
+        """Apply an incremental re-plan as the smallest set of row changes.
+
+        ``refs`` maps the numbers the model used for open tasks to task ids.
+        Updates are one executemany UPDATE, new tasks one bulk INSERT, and
+        removals one DELETE limited to open tasks with no time logged; open
+        milestones are replaced only when the re-plan lists milestones. The
+        stored plan is then rewritten from the tasks as they now are. The
+        caller commits.
+        """
+        timer = _PhaseTimer()
+        errors = self.validate_tasks(replan.get("update_tasks", []), label="update_tasks")
+        errors += self.validate_tasks(replan.get("new_tasks", []), label="new_tasks")
+        if errors:
+            raise PlanValidationError(errors)
+        timer.mark("validate")
+
+        current = {
+            task.id: task for task in db.execute(
+                select(Task).where(Task.id.in_(list(refs.values())))
+            ).scalars()
+        }
+        updates, dependency_titles, ignored = [], {}, []
+        for item in replan.get("update_tasks", []):
+            task = current.get(refs.get(item.get("ref")))
+            if task is None:
+                ignored.append(item.get("ref"))
+                continue
+            priority = item.get("priority")
+            updates.append({
+                "id": task.id,
+                "title": item.get("title") or task.title,
+                "description": item.get("description", task.description),
+                "estimated_hours": item.get("estimated_hours", task.estimated_hours),
+                "priority": priority if priority in PRIORITIES else task.priority,
+                "dependencies": item.get("dependencies", task.dependencies or []),
+            })
+            if "dependencies" in item:
+                dependency_titles[task.id] = item["dependencies"]
+        if updates:
+            db.execute(update(Task), updates)
+        timer.mark("updates")
+
+        remove_ids = [refs[ref] for ref in replan.get("remove_refs", []) if ref in refs]
+        removed_ids = []
+        if remove_ids:
+            # Completed tasks and tasks with time logged are kept
+            removed_ids = list(db.execute(
+                select(Task.id).where(Task.id.in_(remove_ids), Task.completed.isnot(True), ~Task.timelogs.any())
+            ).scalars())
+        if removed_ids:
+            db.execute(
+                delete(Task).where(Task.id.in_(removed_ids)).execution_options(synchronize_session=False)
+            )
+        timer.mark("deletes")
+
+        next_order = db.execute(
+            select(func.coalesce(func.max(Task.order_index), -1)).where(Task.project_id == project_id)
+        ).scalar_one() + 1
+        new_rows = [
+            {
+                "title": task_data.get("title") or f"Task {next_order + i + 1}",
+                "description": task_data.get("description", ""),
+                "project_id": project_id,
+                "estimated_hours": task_data.get("estimated_hours", 4),
+                "priority": task_data.get("priority") if task_data.get("priority") in PRIORITIES else "medium",
+                "ai_generated": True,
+                "order_index": next_order + i,
+                "skills_required": [],
+                "dependencies": task_data.get("dependencies", []),
+            }
+            for i, task_data in enumerate(replan.get("new_tasks", []))
+        ]
+        new_ids = self._insert_tasks(db, new_rows)
+        for row, task_id in zip(new_rows, new_ids):
+            dependency_titles[task_id] = row["dependencies"]
+        timer.mark("inserts")
+
+        tasks = list(db.execute(
+            select(Task).where(Task.project_id == project_id, Task.parent_task_id.is_(None))
+            .order_by(Task.order_index, Task.id).execution_options(populate_existing=True)
+        ).scalars())
+        unresolved = self._resolve_dependency_titles(db, tasks, dependency_titles)
+        if removed_ids:
+            removed_titles = {_title_key(current[task_id].title or "") for task_id in removed_ids}
+            dangling = [
+                {
+                    "id": task.id,
+                    "dependency_ids": [i for i in task.dependency_ids if i not in removed_ids],
+                    "dependencies": [t for t in task.dependencies or [] if _title_key(t) not in removed_titles],
+                }
+                for task in tasks
+                if task.id not in dependency_titles and set(task.dependency_ids or []) & set(removed_ids)
+            ]
+            if dangling:
+                db.execute(update(Task), dangling)
+        timer.mark("dependencies")
+
+        milestones = replan.get("milestones") or []
+        if milestones:
+            db.execute(
+                delete(ProjectMilestone).where(
+                    ProjectMilestone.project_id == project_id, ProjectMilestone.completed.isnot(True)
+                ).execution_options(synchronize_session=False)
+            )
+            db.execute(insert(ProjectMilestone), [
+                {
+                    "project_id": project_id,
+                    "name": milestone_data.get("name", "Milestone"),
+                    "description": milestone_data.get("description", ""),
+                    "target_week": milestone_data.get("week", 1),
+                }
+                for milestone_data in milestones
+            ])
+        timer.mark("milestones")
+
+        if project_description:
+            db.execute(update(Project).where(Project.id == project_id).values(description=project_description))
+        plan_id = self._store_replan(db, project_id, tasks, milestones, project_description)
+        timer.mark("plan")
+
+        counts = {
+            "updated": len(updates),
+            "inserted": len(new_ids),
+            "deleted": len(removed_ids),
+            "milestones_replaced": len(milestones),
+        }
+        return {
+            "plan_id": plan_id,
+            "counts": counts,
+            "updated_task_ids": [row["id"] for row in updates],
+            "inserted_task_ids": new_ids,
+            "deleted_task_ids": removed_ids,
+            "kept_task_ids": [task_id for task_id in remove_ids if task_id not in removed_ids],
+            "ignored_refs": ignored,
+            "unresolved_dependencies": unresolved,
+            "timings": timer.timings,
+        }
+
+    def _resolve_dependency_titles(self, db: Session, tasks: List[Task],
+                                   dependency_titles: Dict[int, List[str]]) -> List[Dict[str, str]]:
+        """Map dependency titles of changed tasks to any task in the project"""
+        if not dependency_titles:
+            return []
+        index = TaskTitleIndex(tasks)
+        updates, unresolved = [], []
+        for task_id, titles in dependency_titles.items():
+            dependency_ids = []
+            for title in titles or []:
+                match = index.match(title)
+                if match is None or match.id == task_id:
+                    unresolved.append({"task_id": task_id, "dependency": title})
+                elif match.id not in dependency_ids:
+                    dependency_ids.append(match.id)
+            updates.append({"id": task_id, "dependency_ids": dependency_ids})
+        db.execute(update(Task), updates)
+        return unresolved
+
+    def _store_replan(self, db: Session, project_id: int, tasks: List[Task],
+                      milestones: List[Dict[str, Any]], project_description: str = None) -> Optional[int]:
+        """Rewrite the latest stored plan so the next re-plan diffs against it"""
+        plan = db.execute(
+            select(ProjectPlan).where(ProjectPlan.project_id == project_id).order_by(ProjectPlan.id.desc())
+        ).scalars().first()
+        if plan is None:
+            return None
+        plan_data = dict(plan.plan_data or {})
+        plan_data["tasks"] = [
+            {
+                "title": task.title,
+                "description": task.description or "",
+                "estimated_hours": task.estimated_hours,
+                "priority": task.priority or "medium",
+                "dependencies": task.dependencies or [],
+            }
+            for task in tasks
+        ]
+        if milestones:
+            plan_data["milestones"] = milestones
+        if project_description:
+            plan_data["project_description"] = project_description
+        plan_data["planner"] = {**(plan_data.get("planner") or {}), "replanned": True}
+        db.execute(update(ProjectPlan).where(ProjectPlan.id == plan.id).values(plan_data=plan_data))
+        return plan.id
+
+    def _insert_plan_items(self, db: Session, project_id: int, plan_data: Dict[str, Any],
+                           timer: _PhaseTimer, skip_titles=()) -> Dict[str, Any]:
+        """Bulk insert a plan's tasks, milestones and risks"""
+        task_rows = [
+            {
+                "title": task_data.get("title") or f"Task {i+1}",
+                "description": task_data.get("description", ""),
+                "project_id": project_id,
+                "estimated_hours": task_data.get("estimated_hours", 4),
+                "priority": task_data.get("priority") if task_data.get("priority") in PRIORITIES else "medium",
+                "ai_generated": True,
+                "order_index": i,
+                "skills_required": task_data.get("skills_required", []),
+                "dependencies": task_data.get("dependencies", []),
+            }
+            for i, task_data in enumerate(plan_data.get("tasks", []))
+        ]
+        task_rows = [row for row in task_rows if _title_key(row["title"]) not in skip_titles]
+        task_ids = self._insert_tasks(db, task_rows)
+        timer.mark("tasks")
+
+        unresolved = self._resolve_dependencies(db, task_rows, task_ids)
+        timer.mark("dependencies")
+
+        milestone_rows = [
+            {
+                "project_id": project_id,
+                "name": milestone_data.get("name", "Milestone"),
+                "description": milestone_data.get("description", ""),
+                "target_week": milestone_data.get("week", 1),
+            }
+            for milestone_data in plan_data.get("milestones", [])
+        ]
+        if milestone_rows:
+            db.execute(insert(ProjectMilestone), milestone_rows)
+        timer.mark("milestones")
+
+        risk_rows = [
+            {
+                "project_id": project_id,
+                "risk_description": risk_data.get("risk", ""),
+                "impact_level": risk_data.get("impact", "medium"),
+                "mitigation_strategy": risk_data.get("mitigation", ""),
+            }
+            for risk_data in plan_data.get("risks", [])
+        ]
+        if risk_rows:
+            db.execute(insert(ProjectRisk), risk_rows)
+        timer.mark("risks")
+
+        return {
+            "task_ids": task_ids,
+            "unresolved_dependencies": unresolved,
+            "milestones": len(milestone_rows),
+            "risks": len(risk_rows),
+        }
+
+    def import_subtasks(self, db: Session, project_id: int, breakdown: Dict[str, Any],
+                        task_description: str) -> Dict[str, Any]:
+        """Create a parent task and its AI-generated subtasks, and commit"""
+        timer = _PhaseTimer()
+        subtasks = breakdown.get("subtasks", [])
+        errors = self.validate_tasks(subtasks, label="subtasks")
+        if errors:
+            raise PlanValidationError(errors)
+        timer.mark("validate")
+
+        parent_task_id = db.execute(
+            insert(Task).returning(Task.id),
+            [{
+                "title": breakdown.get("original_task", task_description),
+                "description": f"Parent task broken down by AI. Total estimated hours: {breakdown.get('estimated_total_hours', 0)}",
+                "project_id": project_id,
+                "estimated_hours": breakdown.get("estimated_total_hours", 0),
+                "ai_generated": True,
+            }]
+        ).scalar_one()
+        timer.mark("parent")
+
+        task_rows = [
+            {
+                "title": subtask_data.get("title") or "Subtask",
+                "description": subtask_data.get("description", ""),
+                "project_id": project_id,
+                "parent_task_id": parent_task_id,
+                "estimated_hours": subtask_data.get("estimated_hours", 1),
+                "order_index": subtask_data.get("order", 0),
+                "ai_generated": True,
+                "skills_required": subtask_data.get("skills_needed", []),
+                "dependencies": subtask_data.get("dependencies", []),
+            }
+            for subtask_data in subtasks
+        ]
+        task_ids = self._insert_tasks(db, task_rows)
+        timer.mark("tasks")
+
+        unresolved = self._resolve_dependencies(db, task_rows, task_ids)
+        timer.mark("dependencies")
+
+        db.commit()
+        timer.mark("commit")
+
+        return {
+            "parent_task_id": parent_task_id,
+            "task_ids": task_ids,
+            "unresolved_dependencies": unresolved,
+            "timings": timer.timings,
+        }
+
+    def _relink_kept_tasks(self, db: Session, project_id: int, new_ids: Set[int]) -> int:
+        """Point the dependencies of tasks kept by replace_plan at tasks that still exist.
+
+        Dependency titles are resolved against every top-level task now in
+        the project, so a dependency on a replaced task follows it to the new
+        task with the same title. Ids without a title (linked by hand) are
+        kept while their task exists; ids of deleted tasks are dropped.
+        """
+        rows = db.execute(
+            select(Task.id, Task.title, Task.dependencies, Task.dependency_ids)
+            .where(Task.project_id == project_id, Task.parent_task_id.is_(None))
+            .order_by(Task.id)
+        ).all()
+        ids_by_title: Dict[str, int] = {}
+        for task_id, title, _, _ in rows:
+            ids_by_title.setdefault(_title_key(title or ""), task_id)
+        existing = {task_id for task_id, _, _, _ in rows}
+
+        updates = []
+        for task_id, _, dependencies, dependency_ids in rows:
+            if task_id in new_ids:
+                continue
+            relinked = []
+            for title in dependencies or []:
+                dependency_id = ids_by_title.get(_title_key(title or ""))
+                if dependency_id is not None and dependency_id != task_id and dependency_id not in relinked:
+                    relinked.append(dependency_id)
+            relinked += [
+                i for i in dependency_ids or [] if i in existing and i != task_id and i not in relinked
+            ]
+            if relinked != list(dependency_ids or []):
+                updates.append({"id": task_id, "dependency_ids": relinked})
+
+        if updates:
+            db.execute(update(Task), updates)
+        return len(updates)
+
+    def _insert_tasks(self, db: Session, task_rows: List[Dict[str, Any]]) -> List[int]:
+        if not task_rows:
+            return []
+        result = db.execute(insert(Task).returning(Task.id, sort_by_parameter_order=True), task_rows)
+        return list(result.scalars())
+
+    def _resolve_dependencies(self, db: Session, task_rows: List[Dict[str, Any]],
+                              task_ids: List[int]) -> List[Dict[str, str]]:
+        """Map dependency titles to the ids just inserted and store them with one executemany UPDATE"""
+        ids_by_title: Dict[str, int] = {}
+        for row, task_id in zip(task_rows, task_ids):
+            ids_by_title.setdefault(_title_key(row["title"]), task_id)
+
+        updates = []
+        unresolved = []
+        for row, task_id in zip(task_rows, task_ids):
+            dependency_ids = []
+            for title in row["dependencies"] or []:
+                dependency_id = ids_by_title.get(_title_key(title))
+                if dependency_id is None or dependency_id == task_id:
+                    unresolved.append({"task": row["title"], "dependency": title})
+                else:
+                    dependency_ids.append(dependency_id)
+            if dependency_ids:
+                updates.append({"id": task_id, "dependency_ids": dependency_ids})
+
+        if updates:
+            # ORM bulk UPDATE by primary key: a single executemany statement
+            db.execute(update(Task), updates)
+        return unresolved
+
+
+# Global importer instance
+plan_importer = PlanImporter()
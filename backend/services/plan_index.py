@@ -0,0 +1,261 @@
+# backend/services/plan_index.py
+import os
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from backend.database import SessionLocal
+from backend.models.models import Project, ProjectPlan
+from ai import ollama_ai
+
+try:
+    from config import config
+    OLLAMA_EMBED_MODEL = config.OLLAMA_EMBED_MODEL
+    PLAN_INDEX_ENABLED = config.PLAN_INDEX_ENABLED
+    PLAN_INDEX_PATH = config.PLAN_INDEX_PATH
+    PLAN_INDEX_SYNC_RETRY_SECONDS = config.PLAN_INDEX_SYNC_RETRY_SECONDS
+    PLAN_INDEX_SAVE_SECONDS = config.PLAN_INDEX_SAVE_SECONDS
+except ImportError:
+    # Fallback if config is not available
+    OLLAMA_EMBED_MODEL = "nomic-embed-text"
+    PLAN_INDEX_ENABLED = True
+    PLAN_INDEX_PATH = "plan_index.npz"
+    PLAN_INDEX_SYNC_RETRY_SECONDS = 300.0
+    PLAN_INDEX_SAVE_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+# Plans these planners produced are not used as examples
+NOT_INDEXED_SOURCES = ("template", "reused")
+
+
+def plan_text(title: Optional[str], description: Optional[str]) -> str:
+    """The text a plan is indexed and looked up by"""
+    return f"{(title or '').strip()}\n{(description or '').strip()}".strip()
+
+
+class PlanVectorIndex:
+    """Cosine-similarity index over the descriptions of stored project plans.
+
+    Vectors come from Ollama's embeddings endpoint, are kept L2-normalized
+    in one float32 NumPy matrix (so cosine similarity is a single
+    matrix-vector product) and persisted to an .npz file. Plans stored
+    before the index existed are embedded on first use; after that each
+    saved plan is added incrementally. Query embeddings are cached so the
+    text embedded to search for similar plans is not embedded again when
+    the resulting plan is saved.
+
+    The database stays the source of truth: the file is rewritten whole,
+    at most once every ``save_seconds`` (and on ``flush`` at shutdown), and
+    plans missing from it after a crash are embedded again by ``sync``. A
+    sync that fails, e.g. because the embedding model is not pulled, is
+    retried at most once every ``sync_retry_seconds`` rather than on every
+    search.
+    """
+    def __init__(self, path: str = None, model: str = None, cache_size: int = 128,
+                 sync_retry_seconds: float = None, save_seconds: float = None):
+        self.path = path or PLAN_INDEX_PATH
+        self.model = model or OLLAMA_EMBED_MODEL
+        self.cache_size = cache_size
+        self.sync_retry_seconds = PLAN_INDEX_SYNC_RETRY_SECONDS if sync_retry_seconds is None else sync_retry_seconds
+        self.save_seconds = PLAN_INDEX_SAVE_SECONDS if save_seconds is None else save_seconds
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._plan_ids = np.zeros(0, dtype=np.int64)
+        self._loaded = False
+        self._synced = False
+        self._sync_attempted_at: Optional[float] = None
+        self._dirty = False
+        self._saved_at: Optional[float] = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._plan_ids)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if str(data["model"]) != self.model:
+                    logger.info(f"Plan index was built with {data['model']}, rebuilding for {self.model}")
+                    return
+                self._vectors = data["vectors"].astype(np.float32)
+                self._plan_ids = data["plan_ids"].astype(np.int64)
+        except Exception as e:
+            logger.warning(f"Could not load plan index from {self.path}, rebuilding: {e}")
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, vectors=self._vectors, plan_ids=self._plan_ids, model=np.array(self.model))
+        os.replace(tmp_path, self.path)
+
+    def _save_if_due(self, force: bool = False) -> None:
+        """Write pending changes if the last save is old enough; caller holds the lock"""
+        if not self._dirty or self._vectors is None:
+            return
+        now = time.monotonic()
+        if force or self._saved_at is None or now - self._saved_at >= self.save_seconds:
+            self._save()
+            self._dirty = False
+            self._saved_at = now
+
+    def flush(self) -> None:
+        """Write any unsaved vectors to disk"""
+        with self._lock:
+            self._save_if_due(force=True)
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+            now = time.monotonic()
+            # One attempt at a time, and a failed one waits out the retry interval
+            due = not self._synced and (
+                self._sync_attempted_at is None or now - self._sync_attempted_at >= self.sync_retry_seconds
+            )
+            if due:
+                self._sync_attempted_at = now
+        if due:
+            self.sync()
+
+    def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Normalized embeddings for texts, served from the cache where possible"""
+        keys = [hashlib.sha1(text.encode("utf-8")).hexdigest() for text in texts]
+        with self._lock:
+            cached = {key: self._cache[key] for key in keys if key in self._cache}
+        missing = [text for key, text in zip(keys, texts) if key not in cached]
+        if missing:
+            embeddings = ollama_ai.embed(missing, model=self.model)
+            if embeddings is None:
+                return None
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+            missing_keys = [key for key in keys if key not in cached]
+            with self._lock:
+                for key, vector in zip(missing_keys, vectors):
+                    cached[key] = vector
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.stack([cached[key] for key in keys])
+
+    def _put(self, plan_ids: List[int], vectors: np.ndarray) -> None:
+        """Insert or replace vectors by plan id; caller holds the lock and saves"""
+        if self._vectors is not None and self._vectors.shape[1] != vectors.shape[1]:
+            logger.warning("Embedding size changed, rebuilding plan index")
+            self._vectors, self._plan_ids = None, np.zeros(0, dtype=np.int64)
+        keep = ~np.isin(self._plan_ids, plan_ids)
+        if self._vectors is None:
+            self._vectors = vectors
+        else:
+            self._vectors = np.vstack([self._vectors[keep], vectors])
+        self._plan_ids = np.concatenate([self._plan_ids[keep], np.asarray(plan_ids, dtype=np.int64)])
+        self._dirty = True
+
+    def sync(self, batch_size: int = 32) -> int:
+        """Embed stored plans that are missing from the index"""
+        with self._lock:
+            known = set(self._plan_ids.tolist())
+        with SessionLocal() as db:
+            rows = db.query(ProjectPlan.id, ProjectPlan.plan_data, Project.title, Project.description).join(
+                Project, Project.id == ProjectPlan.project_id
+            ).all()
+        pending = [
+            (plan_id, plan_text(title, description))
+            for plan_id, plan_data, title, description in rows
+            if plan_id not in known and self._indexable(plan_data)
+        ]
+
+        added = 0
+        try:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                vectors = self._embed([text for _, text in batch])
+                if vectors is None:
+                    logger.warning(
+                        f"Embeddings unavailable, plan index sync stopped; retrying in {self.sync_retry_seconds:g}s"
+                    )
+                    return added
+                with self._lock:
+                    self._put([plan_id for plan_id, _ in batch], vectors)
+                added += len(batch)
+        finally:
+            with self._lock:
+                self._save_if_due(force=True)
+        self._synced = True
+        if added:
+            logger.info(f"Added {added} stored plans to the plan index ({len(self)} total)")
+        return added
+
+    @staticmethod
+    def _indexable(plan_data: Any) -> bool:
+        if not isinstance(plan_data, dict) or not plan_data.get("tasks"):
+            return False
+        return (plan_data.get("planner") or {}).get("source") not in NOT_INDEXED_SOURCES
+
+    def add_plan(self, plan_id: int, title: Optional[str], description: Optional[str],
+                 plan_data: Dict[str, Any]) -> bool:
+        """Index a newly saved (or replaced) plan"""
+        if not PLAN_INDEX_ENABLED or not self._indexable(plan_data):
+            return False
+        try:
+            self._ensure_loaded()
+            vectors = self._embed([plan_text(title, description)])
+            if vectors is None:
+                return False
+            with self._lock:
+                self._put([plan_id], vectors)
+                self._save_if_due()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index plan {plan_id}: {e}")
+            return False
+
+    def search(self, title: Optional[str], description: Optional[str], k: int = 3) -> List[Tuple[int, float]]:
+        """Up to k (plan_id, cosine similarity) pairs, most similar first"""
+        if not PLAN_INDEX_ENABLED:
+            return []
+        try:
+            self._ensure_loaded()
+            with self._lock:
+                vectors, plan_ids = self._vectors, self._plan_ids
+            if vectors is None or not len(plan_ids):
+                return []
+            query = self._embed([plan_text(title, description)])
+            if query is None or query.shape[1] != vectors.shape[1]:
+                return []
+            scores = vectors @ query[0]
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(plan_ids[i]), float(scores[i])) for i in top]
+        except Exception as e:
+            logger.error(f"Plan index search failed: {e}")
+            return []
+
+    def similar_plans(self, title: Optional[str], description: Optional[str], k: int = 3,
+                      min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+        """Stored plans most similar to a description, with their plan data"""
+        matches = [(plan_id, score) for plan_id, score in self.search(title, description, k) if score >= min_similarity]
+        if not matches:
+            return []
+        with SessionLocal() as db:
+            plans = dict(db.query(ProjectPlan.id, ProjectPlan.plan_data).filter(
+                ProjectPlan.id.in_([plan_id for plan_id, _ in matches])
+            ).all())
+        # Plans deleted since they were indexed are skipped
+        return [
+            {"plan_id": plan_id, "similarity": round(score, 4), "plan_data": plans[plan_id]}
+            for plan_id, score in matches if plans.get(plan_id)
+        ]
+
+
+# Global index instance
+plan_index = PlanVectorIndex()
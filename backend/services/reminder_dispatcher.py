@@ -0,0 +1,193 @@
+# backend/services/reminder_dispatcher.py
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+from backend.database import SessionLocal
+from backend.models.models import Reminder
+from backend.services.reminder_service import reminder_service
+from backend.services.job_executor import job_executor, job_run_log
+
+try:
+    from config import config
+    REMINDER_RESYNC_SECONDS = config.REMINDER_RESYNC_SECONDS
+    REMINDER_RETRY_SECONDS = config.REMINDER_RETRY_SECONDS
+except ImportError:
+    # Fallback if config is not available
+    REMINDER_RESYNC_SECONDS = 3600
+    REMINDER_RETRY_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderDispatcher:
+    """Fire reminders at their due time from an in-memory min-heap.
+
+    Unsent reminders are loaded once with an indexed (sent, due_date) scan
+    and kept in a heap ordered by due date. The dispatcher sleeps until the
+    earliest one is due instead of polling; routes that create reminders
+    call ``schedule`` and wake it early when the new reminder is due
+    sooner. Reminders inserted by other worker processes are picked up by
+    ``load_new`` on the scheduler leader's lease renewals, and a full
+    reload every ``resync_seconds`` catches anything else. A sweep that
+    fails puts its reminders back on the heap to be retried after
+    ``retry_seconds``. Due dates are stored in UTC and compared with
+    ``datetime.utcnow()``.
+    """
+    def __init__(self, resync_seconds: float = None, retry_seconds: float = None):
+        self.resync_seconds = resync_seconds or REMINDER_RESYNC_SECONDS
+        self.retry_seconds = retry_seconds or REMINDER_RETRY_SECONDS
+        self._heap: List[Tuple[datetime, int]] = []
+        self._queued: Set[int] = set()
+        self._max_id = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.running = False
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_due(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def load(self) -> int:
+        """Rebuild the heap from the unsent reminders in the database"""
+        with SessionLocal() as db:
+            rows = db.query(Reminder.due_date, Reminder.id).filter(
+                Reminder.sent == False, Reminder.due_date.isnot(None)
+            ).order_by(Reminder.due_date).all()
+        with self._lock:
+            # Rows come sorted, which already satisfies the heap invariant
+            self._heap = [(due_date, reminder_id) for due_date, reminder_id in rows]
+            self._queued = {reminder_id for _, reminder_id in rows}
+            self._max_id = max(self._queued, default=self._max_id)
+        return len(rows)
+
+    def load_new(self) -> int:
+        """Queue unsent reminders inserted since the last load, e.g. by other workers"""
+        with self._lock:
+            max_id = self._max_id
+        with SessionLocal() as db:
+            rows = db.query(Reminder.id, Reminder.due_date).filter(
+                Reminder.id > max_id, Reminder.sent == False, Reminder.due_date.isnot(None)
+            ).all()
+        for reminder_id, due_date in rows:
+            self.schedule(reminder_id, due_date)
+        return len(rows)
+
+    def schedule(self, reminder_id: int, due_date: Optional[datetime]) -> None:
+        """Queue a new or rescheduled reminder; safe to call from any thread.
+
+        Does nothing unless the dispatcher is running, i.e. in the worker
+        that holds the scheduler lease; other workers' reminders reach it
+        through ``load_new``.
+        """
+        if due_date is None or not self.running:
+            return
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (due_date, reminder_id))
+            self._queued.add(reminder_id)
+            self._max_id = max(self._max_id, reminder_id)
+        if earliest is None or due_date < earliest:
+            self._wake()
+
+    def _wake(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            if asyncio.get_running_loop() is loop:
+                wakeup.set()
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(wakeup.set)
+
+    def _pop_due(self, now: datetime) -> Tuple[List[int], Optional[datetime]]:
+        """Ids of the reminders due by ``now``, and the earliest of their due dates"""
+        due, earliest = [], None
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_date, reminder_id = heapq.heappop(self._heap)
+                if reminder_id in self._queued:
+                    self._queued.discard(reminder_id)
+                    due.append(reminder_id)
+                    earliest = earliest or due_date
+        return due, earliest
+
+    async def run(self):
+        """Dispatch reminders until stopped"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.running = True
+        # The first pass loads the heap
+        next_resync = self._loop.time()
+        loaded_once = False
+
+        while self.running:
+            try:
+                due, earliest = self._pop_due(datetime.utcnow())
+                if due:
+                    try:
+                        # Lag is measured from the earliest due date in the sweep
+                        async with job_run_log.track(
+                            "reminder_sweep", earliest.replace(tzinfo=timezone.utc).timestamp()
+                        ) as run:
+                            rescheduled = await asyncio.wait_for(reminder_service.send_reminders(due), 600)
+                            run["rows"] = len(due) - len(rescheduled)
+                    except Exception as e:
+                        # The popped reminders are still unsent; queue them again instead of
+                        # leaving them for the next full resync
+                        retry_at = datetime.utcnow() + timedelta(seconds=self.retry_seconds)
+                        logger.error(
+                            f"Reminder sweep of {len(due)} reminders failed, retrying in {self.retry_seconds:g}s: {e}"
+                        )
+                        for reminder_id in due:
+                            self.schedule(reminder_id, retry_at)
+                        continue
+                    for reminder_id, due_date in rescheduled:
+                        self.schedule(reminder_id, due_date)
+                    continue
+
+                if self._loop.time() >= next_resync:
+                    async with job_run_log.track("reminder_load") as run:
+                        loaded = await job_executor.run("reminder_load", self.load, timeout=60)
+                        run["rows"] = loaded
+                    next_resync = self._loop.time() + self.resync_seconds
+                    if not loaded_once:
+                        logger.info(f"⏰ Reminder dispatcher loaded {loaded} pending reminders")
+                        loaded_once = True
+                    continue
+
+                timeout = next_resync - self._loop.time()
+                next_due = self.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, (next_due - datetime.utcnow()).total_seconds())
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in reminder dispatcher: {e}")
+                await asyncio.sleep(60)
+
+    def stop(self):
+        self.running = False
+        # A demoted worker's queue is rebuilt by ``load`` if it leads again
+        with self._lock:
+            self._heap, self._queued = [], set()
+        self._wake()
+
+
+# Global dispatcher instance
+reminder_dispatcher = ReminderDispatcher()
@@ -1,187 +1,215 @@
 # backend/services/reminder_service.py
-import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, func, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal
-from backend.models.models import Reminder, Project, Devlog, Task
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from backend.database import SessionLocal, session_scope
+from backend.models.models import Reminder, Project, Devlog, Task, NotificationDeadLetter
+from backend.services.job_executor import job_executor
+from backend.services.notifications import notification_pipeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Days of devlogs or completed tasks that count as recent activity
+ACTIVITY_DAYS = 7
+
 class ReminderService:
-    def __init__(self):
-        self.db = SessionLocal()
-    
-    def __del__(self):
-        if hasattr(self, 'db'):
-            self.db.close()
-    
-    def get_due_reminders(self) -> List[Reminder]:
-        """Get all reminders that are due and haven't been sent"""
+    def project_activity(self, db: Session, project_ids: Optional[List[int]] = None,
+                         devlog_limit: int = 2) -> Dict[int, Dict[str, Any]]:
+        """Activity, task counts and latest devlogs for many projects at once.
+
+        Three grouped queries cover every project regardless of how many
+        there are: devlog counts for the last week, task totals with
+        completed counts (overall and this week), and the latest devlogs
+        per project picked with a window function.
+        """
+        devlog_since = datetime.utcnow() - timedelta(days=ACTIVITY_DAYS)
+        task_since = datetime.now() - timedelta(days=ACTIVITY_DAYS)
+
+        project_query = db.query(Project.id, Project.title)
+        if project_ids is not None:
+            project_query = project_query.filter(Project.id.in_(project_ids))
+        stats = {
+            project_id: {
+                "title": title or "",
+                "recent_devlogs": 0,
+                "total_tasks": 0,
+                "completed_tasks": 0,
+                "recently_completed_tasks": 0,
+                "latest_devlogs": [],
+            }
+            for project_id, title in project_query
+        }
+        if not stats:
+            return stats
+        ids = list(stats)
+
+        for project_id, count in db.query(Devlog.project_id, func.count(Devlog.id)).filter(
+            Devlog.project_id.in_(ids), Devlog.created_at >= devlog_since
+        ).group_by(Devlog.project_id):
+            stats[project_id]["recent_devlogs"] = count
+
+        completed = case((Task.completed.is_(True), 1), else_=0)
+        recently_completed = case((and_(Task.completed.is_(True), Task.updated_at >= task_since), 1), else_=0)
+        for project_id, total, done, recent in db.query(
+            Task.project_id, func.count(Task.id), func.sum(completed), func.sum(recently_completed)
+        ).filter(Task.project_id.in_(ids)).group_by(Task.project_id):
+            stats[project_id].update(
+                total_tasks=total, completed_tasks=done or 0, recently_completed_tasks=recent or 0
+            )
+
+        if devlog_limit:
+            ranked = db.query(
+                Devlog.project_id,
+                Devlog.entry_text,
+                func.row_number().over(
+                    partition_by=Devlog.project_id, order_by=(Devlog.created_at.desc(), Devlog.id.desc())
+                ).label("rank")
+            ).filter(Devlog.project_id.in_(ids)).subquery()
+            for project_id, entry_text in db.query(ranked.c.project_id, ranked.c.entry_text).filter(
+                ranked.c.rank <= devlog_limit
+            ).order_by(ranked.c.project_id, ranked.c.rank):
+                stats[project_id]["latest_devlogs"].append(entry_text or "")
+
+        return stats
+
+    def _claim_reminders(self, reminder_ids: List[int]
+                         ) -> Tuple[List[Dict[str, Any]], List[Tuple[int, datetime]]]:
+        """Split the given reminders into ones to send now and ones whose due date moved later.
+
+        Reminders deleted or already sent since they were queued are skipped.
+        """
         now = datetime.utcnow()
-        return self.db.query(Reminder).filter(
-            Reminder.due_date <= now,
-            Reminder.sent == False
-        ).all()
-    
-    def mark_reminder_sent(self, reminder_id: int):
-        """Mark a reminder as sent"""
-        reminder = self.db.query(Reminder).filter(Reminder.id == reminder_id).first()
-        if reminder:
-            reminder.sent = True
-            self.db.commit()
-            logger.info(f"Marked reminder {reminder_id} as sent")
-    
-    def send_notification(self, reminder: Reminder) -> bool:
-        """Send notification for a reminder (placeholder for actual implementation)"""
-        try:
-            # For now, just log the reminder
-            logger.info(f"🔔 REMINDER DUE: {reminder.message}")
-            logger.info(f"📅 Due date: {reminder.due_date}")
-            
-            # Here you could integrate with:
-            # - Email notifications
-            # - Push notifications
-            # - Slack/Discord webhooks
-            # - Social media APIs
-            
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send notification for reminder {reminder.id}: {e}")
-            return False
-    
-    def auto_generate_progress_reminders(self, project_id: Optional[int] = None):
-        """Automatically generate reminders based on project activity"""
-        try:
-            # Get projects to generate reminders for
-            if project_id:
-                projects = self.db.query(Project).filter(Project.id == project_id).all()
-            else:
-                projects = self.db.query(Project).all()
-            
-            for project in projects:
-                # Check if project has recent activity (devlogs, completed tasks)
-                recent_activity = self._has_recent_activity(project)
-                
-                if recent_activity:
-                    # Generate reminder for next week
-                    next_week = datetime.utcnow() + timedelta(days=7)
-                    
-                    # Check if reminder already exists for this timeframe
-                    existing_reminder = self.db.query(Reminder).filter(
-                        Reminder.message.contains(project.title),
-                        Reminder.due_date.between(
-                            datetime.utcnow() + timedelta(days=6),
-                            datetime.utcnow() + timedelta(days=8)
-                        ),
-                        Reminder.sent == False
-                    ).first()
-                    
-                    if not existing_reminder:
-                        reminder_message = f"Share progress update for '{project.title}' project! 🚀"
-                        
-                        new_reminder = Reminder(
-                            message=reminder_message,
-                            due_date=next_week,
-                            sent=False
-                        )
-                        
-                        self.db.add(new_reminder)
-                        self.db.commit()
-                        logger.info(f"Auto-generated reminder for project: {project.title}")
-                        
-        except Exception as e:
-            logger.error(f"Error auto-generating reminders: {e}")
-    
-    def _has_recent_activity(self, project: Project) -> bool:
-        """Check if project has recent activity (last 7 days)"""
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        # Check for recent devlogs
-        recent_devlogs = self.db.query(Devlog).filter(
-            Devlog.project_id == project.id,
-            Devlog.created_at >= week_ago
-        ).count()
-        
-        # Check for recently completed tasks
-        recent_completed_tasks = self.db.query(Task).filter(
-            Task.project_id == project.id,
-            Task.completed == True
-        ).count()
-        
-        return recent_devlogs > 0 or recent_completed_tasks > 0
-    
+        due, rescheduled = [], []
+        with SessionLocal() as db:
+            rows = db.query(Reminder.id, Reminder.message, Reminder.due_date).filter(
+                Reminder.id.in_(reminder_ids), Reminder.sent == False
+            )
+            for reminder_id, message, due_date in rows:
+                if due_date is not None and due_date > now:
+                    rescheduled.append((reminder_id, due_date))
+                else:
+                    due.append({"reminder_id": reminder_id, "message": message or "", "due_date": due_date})
+        return due, rescheduled
+
+    def _finish_reminders(self, reminder_ids: List[int], dead_letters: List[Dict[str, Any]]) -> None:
+        """Mark a delivered batch sent with one UPDATE and keep what failed for good"""
+        with session_scope() as db:
+            db.execute(update(Reminder).where(Reminder.id.in_(reminder_ids)).values(sent=True))
+            if dead_letters:
+                db.execute(insert(NotificationDeadLetter), dead_letters)
+
+    async def send_reminders(self, reminder_ids: List[int]) -> List[Tuple[int, datetime]]:
+        """Send the given reminders through the notification pipeline if still unsent and due.
+
+        Every reminder handed to the pipeline is marked sent afterwards;
+        deliveries that kept failing are stored as dead letters instead of
+        being retried forever. Returns ``(id, due_date)`` for reminders whose
+        due date has moved into the future so the caller can queue them again.
+        """
+        due, rescheduled = await job_executor.run("reminder_claim", self._claim_reminders, reminder_ids, timeout=60)
+        if due:
+            dead_letters = await notification_pipeline.deliver(due)
+            await job_executor.run(
+                "reminder_finish", self._finish_reminders,
+                [item["reminder_id"] for item in due], dead_letters, timeout=60
+            )
+            logger.info(f"Sent {len(due)} due reminders ({len(dead_letters)} failed deliveries)")
+        return rescheduled
+
+    def period_key(self, moment: datetime) -> str:
+        """ISO week of a moment, e.g. ``2026-W42``: the period of weekly reminders"""
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def insert_generated_reminders(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """Insert reminders in one statement, skipping any whose project, kind and period already exist.
+
+        Deduplication is left to the unique ``(project_id, kind, period_key)``
+        index, so there is no lookup of existing reminders. Returns how many
+        rows were inserted.
+        """
+        if not rows:
+            return 0
+        statement = sqlite_insert(Reminder).on_conflict_do_nothing(
+            index_elements=["project_id", "kind", "period_key"]
+        ).returning(Reminder.id)
+        return len(db.execute(statement, rows).all())
+
+    def auto_generate_progress_reminders(self, project_id: Optional[int] = None) -> int:
+        """Generate next week's progress reminders for every active project.
+
+        Activity for all projects comes from ``project_activity`` and the
+        reminders are written with a single insert that skips projects which
+        already have a progress reminder for that week. Returns how many
+        were created; errors are raised for the caller to report.
+        """
+        with session_scope() as db:
+            activity = self.project_activity(db, [project_id] if project_id else None, devlog_limit=0)
+            next_week = datetime.utcnow() + timedelta(days=7)
+            period = self.period_key(next_week)
+            rows = [
+                {
+                    "message": f"Share progress update for '{stats['title']}' project! 🚀",
+                    "due_date": next_week,
+                    "sent": False,
+                    "project_id": active_id,
+                    "kind": "progress",
+                    "period_key": period,
+                }
+                for active_id, stats in activity.items()
+                if stats["recent_devlogs"] or stats["recently_completed_tasks"]
+            ]
+            created = self.insert_generated_reminders(db, rows)
+
+        logger.info(f"Auto-generated {created} reminders for {len(rows)} active projects")
+        return created
+
+    def _format_social_content(self, stats: Dict[str, Any]) -> str:
+        title = stats["title"]
+        content_parts = [
+            f"🚀 Progress update on '{title}'!",
+            f"✅ {stats['completed_tasks']}/{stats['total_tasks']} tasks completed"
+        ]
+
+        if stats["latest_devlogs"]:
+            content_parts.append("\n📝 Recent work:")
+            for entry in stats["latest_devlogs"]:
+                # Truncate long entries
+                entry = entry[:100] + "..." if len(entry) > 100 else entry
+                content_parts.append(f"• {entry}")
+
+        content_parts.extend([
+            "\n#coding #productivity #buildinpublic",
+            f"#{title.lower().replace(' ', '')}"
+        ])
+
+        return "\n".join(content_parts)
+
     def generate_social_media_content(self, project: Project) -> str:
         """Generate social media content based on project progress"""
+        return self.generate_all_social_content([project.id]).get(
+            project.id, f"Working on '{project.title}' project! 🚀 #coding #buildinpublic"
+        )
+
+    def generate_all_social_content(self, project_ids: Optional[List[int]] = None) -> Dict[int, str]:
+        """Social media content for many projects (all by default) from one batch of queries"""
         try:
-            # Get recent devlogs
-            recent_devlogs = self.db.query(Devlog).filter(
-                Devlog.project_id == project.id
-            ).order_by(Devlog.created_at.desc()).limit(3).all()
-            
-            # Get completed tasks count
-            completed_tasks = self.db.query(Task).filter(
-                Task.project_id == project.id,
-                Task.completed == True
-            ).count()
-            
-            total_tasks = self.db.query(Task).filter(
-                Task.project_id == project.id
-            ).count()
-            
-            # Generate content
-            content_parts = [
-                f"🚀 Progress update on '{project.title}'!",
-                f"✅ {completed_tasks}/{total_tasks} tasks completed"
-            ]
-            
-            if recent_devlogs:
-                content_parts.append("\n📝 Recent work:")
-                for devlog in recent_devlogs[:2]:  # Show last 2 entries
-                    # Truncate long entries
-                    entry = devlog.entry_text[:100] + "..." if len(devlog.entry_text) > 100 else devlog.entry_text
-                    content_parts.append(f"• {entry}")
-            
-            content_parts.extend([
-                "\n#coding #productivity #buildinpublic",
-                f"#{project.title.lower().replace(' ', '')}"
-            ])
-            
-            return "\n".join(content_parts)
-            
+            with SessionLocal() as db:
+                activity = self.project_activity(db, project_ids)
+            return {project_id: self._format_social_content(stats) for project_id, stats in activity.items()}
+
         except Exception as e:
             logger.error(f"Error generating social media content: {e}")
-            return f"Working on '{project.title}' project! 🚀 #coding #buildinpublic"
-    
-    async def process_due_reminders(self):
-        """Process all due reminders"""
-        try:
-            due_reminders = self.get_due_reminders()
-            
-            for reminder in due_reminders:
-                success = self.send_notification(reminder)
-                if success:
-                    self.mark_reminder_sent(reminder.id)
-                    
-            if due_reminders:
-                logger.info(f"Processed {len(due_reminders)} due reminders")
-                
-        except Exception as e:
-            logger.error(f"Error processing due reminders: {e}")
-    
-    async def auto_generate_weekly_reminders(self):
-        """Generate weekly reminders for active projects"""
-        try:
-            self.auto_generate_progress_reminders()
-            logger.info("Auto-generated weekly reminders")
-        except Exception as e:
-            logger.error(f"Error auto-generating weekly reminders: {e}")
+            return {}
+
+    async def auto_generate_weekly_reminders(self) -> int:
+        """Generate weekly reminders for active projects in the scheduler job pool"""
+        return await job_executor.run("weekly_reminders", self.auto_generate_progress_reminders, timeout=300)
 
 # Global service instance
 reminder_service = ReminderService()
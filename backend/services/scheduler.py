@@ -1,83 +1,321 @@
 # backend/services/scheduler.py
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from backend.database import SessionLocal, session_scope
+from backend.models.models import ScheduledJobState
+from backend.services.cron import CronExpression
 from backend.services.reminder_service import reminder_service
+from backend.services.insights_service import insights_service
+from backend.services.reminder_dispatcher import reminder_dispatcher
+from backend.services.deadline_watcher import deadline_watcher
+from backend.services.job_executor import job_executor, job_run_log, loop_lag_monitor
+from backend.services.leader_election import leader_elector
+from backend.services.notifications import notification_pipeline
+
+try:
+    from config import config
+    WEEKLY_REMINDERS_CRON = config.WEEKLY_REMINDERS_CRON
+    INSIGHTS_PRECOMPUTE_CRON = config.INSIGHTS_PRECOMPUTE_CRON
+    SCHEDULER_LEADER_ELECTION = config.SCHEDULER_LEADER_ELECTION
+except ImportError:
+    # Fallback if config is not available
+    WEEKLY_REMINDERS_CRON = "0 9 * * *"
+    INSIGHTS_PRECOMPUTE_CRON = "0 2 * * *"
+    SCHEDULER_LEADER_ELECTION = True
 
 logger = logging.getLogger(__name__)
 
+MISFIRE_POLICIES = ("skip", "run_once", "catch_up")
+
+# Longest single sleep, so wall-clock changes (DST, NTP) are noticed
+MAX_SLEEP_SECONDS = 3600
+
+
+class ScheduledJob:
+    """A coroutine function run on a cron schedule.
+
+    ``misfire`` decides what happens to runs missed while the app was down
+    or busy by more than ``grace`` seconds: ``skip`` drops them,
+    ``run_once`` runs once for all of them and ``catch_up`` runs each one
+    (at most the ``max_catch_up`` most recent). Each run starts up to
+    ``jitter`` seconds late, so jobs sharing a cron time do not all hit the
+    database together.
+    """
+    def __init__(self, name: str, cron: str, func: Callable, misfire: str = "run_once",
+                 grace: float = 300, jitter: float = 0, timeout: float = None, max_catch_up: int = 10):
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"misfire must be one of {', '.join(MISFIRE_POLICIES)}")
+        self.name = name
+        self.cron = CronExpression(cron)
+        self.func = func
+        self.misfire = misfire
+        self.grace = grace
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_catch_up = max_catch_up
+        self.last_scheduled_for: Optional[datetime] = None
+        self.last_status: Optional[str] = None
+        self.next_run: Optional[datetime] = None
+        self.active = False
+
+    def runs_for(self, due: List[datetime], now: datetime) -> List[datetime]:
+        """Which of the due cron times to run, per the misfire policy"""
+        on_time = [moment for moment in due if (now - moment).total_seconds() <= self.grace]
+        if self.misfire == "catch_up":
+            return due[-self.max_catch_up:]
+        if self.misfire == "run_once":
+            return due[-1:]
+        return on_time[-1:]
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "cron": self.cron.expression,
+            "misfire": self.misfire,
+            "jitter_seconds": self.jitter,
+            "active": self.active,
+            "last_scheduled_for": self.last_scheduled_for.isoformat() if self.last_scheduled_for else None,
+            "last_status": self.last_status,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+        }
+
+
 class BackgroundScheduler:
+    """Run registered jobs on cron schedules with their last run kept in the database.
+
+    Jobs register declaratively with ``add_job`` or the ``job`` decorator.
+    With several workers, only the one holding the scheduler lease runs
+    the jobs, the reminder dispatcher and the deadline watcher; the others
+    take over if it dies.
+    Before a run starts its cron time is written to ``scheduled_jobs``, so a
+    restart never repeats it, and runs missed while the app was down are
+    found on startup and handled by the job's misfire policy.
+    """
     def __init__(self):
         self.running = False
         self.tasks = []
-    
+        self.job_tasks = []
+        self.jobs: Dict[str, ScheduledJob] = {}
+
+    def add_job(self, name: str, cron: str, func: Callable, **options) -> ScheduledJob:
+        """Register a coroutine function to run on a cron schedule"""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already registered")
+        job = ScheduledJob(name, cron, func, **options)
+        self.jobs[name] = job
+        return job
+
+    def job(self, name: str, cron: str, **options) -> Callable:
+        """Decorator form of ``add_job``"""
+        def register(func: Callable) -> Callable:
+            self.add_job(name, cron, func, **options)
+            return func
+        return register
+
     async def start(self):
         """Start the background scheduler"""
         if self.running:
             return
-            
+
         self.running = True
         logger.info("🚀 Starting background scheduler...")
-        
-        # Start background tasks
-        self.tasks = [
-            asyncio.create_task(self._reminder_checker()),
-            asyncio.create_task(self._weekly_reminder_generator()),
-        ]
-        
-        logger.info("✅ Background scheduler started")
-    
+
+        # Every worker measures its own loop; only the leader runs jobs
+        self.tasks = [asyncio.create_task(loop_lag_monitor.run())]
+        if SCHEDULER_LEADER_ELECTION:
+            self.tasks.append(asyncio.create_task(
+                leader_elector.run(self._start_jobs, self._stop_jobs, self._on_lease_renewed)
+            ))
+            logger.info(f"✅ Background scheduler started, campaigning for leadership as {leader_elector.holder_id}")
+        else:
+            await self._start_jobs()
+            logger.info(f"✅ Background scheduler started with {len(self.jobs)} cron jobs")
+
     async def stop(self):
         """Stop the background scheduler"""
         if not self.running:
             return
-            
+
         self.running = False
         logger.info("🛑 Stopping background scheduler...")
-        
-        # Cancel all tasks
+        leader_elector.stop()
+        loop_lag_monitor.stop()
+
+        # Cancel all tasks; the elector stops the jobs and releases its lease
         for task in self.tasks:
             task.cancel()
-            
+
         # Wait for tasks to complete
         await asyncio.gather(*self.tasks, return_exceptions=True)
         self.tasks.clear()
-        
+        await self._stop_jobs()
+        notification_pipeline.close()
+        job_executor.shutdown()
+
         logger.info("✅ Background scheduler stopped")
-    
-    async def _reminder_checker(self):
-        """Check for due reminders every minute"""
+
+    @property
+    def is_leader(self) -> bool:
+        return leader_elector.is_leader if SCHEDULER_LEADER_ELECTION else self.running
+
+    async def _start_jobs(self):
+        """Start the reminder dispatcher, deadline watcher and cron jobs in this process"""
+        self.job_tasks = [
+            asyncio.create_task(reminder_dispatcher.run()),
+            asyncio.create_task(deadline_watcher.run()),
+        ] + [asyncio.create_task(self._run_job(job)) for job in self.jobs.values()]
+        logger.info(f"⏰ Running reminder dispatcher, deadline watcher and {len(self.jobs)} cron jobs")
+
+    async def _stop_jobs(self):
+        reminder_dispatcher.stop()
+        deadline_watcher.stop()
+        for task in self.job_tasks:
+            task.cancel()
+        await asyncio.gather(*self.job_tasks, return_exceptions=True)
+        self.job_tasks = []
+
+    async def _on_lease_renewed(self):
+        # Reminders created through other workers reach the leader here
+        try:
+            await job_executor.run("reminder_load_new", reminder_dispatcher.load_new, timeout=30)
+        except Exception as e:
+            logger.error(f"Could not load new reminders: {e}")
+
+    def job_status(self) -> List[Dict[str, Any]]:
+        return [job.status() for job in self.jobs.values()]
+
+    def _load_state(self, name: str) -> Optional[datetime]:
+        with SessionLocal() as db:
+            state = db.get(ScheduledJobState, name)
+            return state.last_scheduled_for if state else None
+
+    def _save_state(self, job: ScheduledJob, **values) -> None:
+        with session_scope() as db:
+            state = db.get(ScheduledJobState, job.name)
+            if state is None:
+                state = ScheduledJobState(name=job.name, run_count=0)
+                db.add(state)
+            state.cron = job.cron.expression
+            state.next_run_at = job.next_run
+            for key, value in values.items():
+                setattr(state, key, value)
+            if values.get("last_status") == "running":
+                state.run_count = (state.run_count or 0) + 1
+
+    async def _run_job(self, job: ScheduledJob):
+        """Run one job on its schedule until the scheduler stops"""
         while self.running:
             try:
-                await reminder_service.process_due_reminders()
-                await asyncio.sleep(60)  # Check every minute
-            except asyncio.CancelledError:
+                last = await job_executor.run("scheduler_state", self._load_state, job.name, timeout=30)
+                if last is None:
+                    # First time this job is seen: start from now rather than replaying history
+                    last = datetime.now()
+                    job.next_run = job.cron.next_after(last)
+                    await job_executor.run(
+                        "scheduler_state", self._save_state, job, last_scheduled_for=last, timeout=30
+                    )
+                job.last_scheduled_for = last
                 break
+            except asyncio.CancelledError:
+                return
             except Exception as e:
-                logger.error(f"Error in reminder checker: {e}")
+                logger.error(f"Could not load state for job {job.name}: {e}")
                 await asyncio.sleep(60)
-    
-    async def _weekly_reminder_generator(self):
-        """Generate weekly reminders every day at 9 AM"""
+
         while self.running:
             try:
                 now = datetime.now()
-                
-                # Check if it's 9 AM (or close to it)
-                if now.hour == 9 and now.minute < 5:
-                    await reminder_service.auto_generate_weekly_reminders()
-                    # Sleep for 6 hours to avoid running multiple times
-                    await asyncio.sleep(6 * 60 * 60)
-                else:
-                    # Check every 5 minutes
-                    await asyncio.sleep(5 * 60)
-                    
+                due = list(job.cron.between(job.last_scheduled_for, now))
+                if due:
+                    runs = job.runs_for(due, now)
+                    if len(runs) < len(due):
+                        logger.warning(
+                            f"Job {job.name} missed {len(due)} runs since {job.last_scheduled_for}, "
+                            f"running {len(runs)} ({job.misfire})"
+                        )
+                    if not runs:
+                        job.last_scheduled_for = due[-1]
+                        job.last_status = "skipped"
+                        job.next_run = job.cron.next_after(now)
+                        await job_executor.run(
+                            "scheduler_state", self._save_state, job,
+                            last_scheduled_for=due[-1], last_status="skipped", timeout=30
+                        )
+                    for scheduled_for in runs:
+                        await self._execute(job, scheduled_for)
+                    job.last_scheduled_for = due[-1]
+                    continue
+
+                job.next_run = job.cron.next_after(now)
+                if job.next_run is None:
+                    logger.warning(f"Job {job.name} has no future run for '{job.cron.expression}'")
+                    return
+                await asyncio.sleep(min((job.next_run - now).total_seconds(), MAX_SLEEP_SECONDS))
+
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Error in weekly reminder generator: {e}")
-                await asyncio.sleep(5 * 60)
+                logger.error(f"Error in scheduler job {job.name}: {e}")
+                await asyncio.sleep(60)
+
+    async def _execute(self, job: ScheduledJob, scheduled_for: datetime):
+        if job.jitter:
+            await asyncio.sleep(random.uniform(0, job.jitter))
+
+        job.active = True
+        job.next_run = job.cron.next_after(max(scheduled_for, datetime.now()))
+        started = datetime.now()
+        # Recorded before running so a restart mid-run does not run it again
+        await job_executor.run(
+            "scheduler_state", self._save_state, job,
+            last_scheduled_for=scheduled_for, last_started_at=started, last_status="running",
+            last_error=None, timeout=30
+        )
+        status, error = "ok", None
+        async with job_run_log.track(job.name, scheduled_for.timestamp()) as run:
+            try:
+                result = await asyncio.wait_for(job.func(), job.timeout)
+                # Jobs may return how many rows they processed, or a dict with
+                # ``rows`` and ``failures`` when some of their items failed
+                if isinstance(result, dict):
+                    run.update(rows=result.get("rows"), failures=result.get("failures"))
+                    if result.get("failures"):
+                        status, error = "partial", f"{result['failures']} items failed"
+                elif isinstance(result, int) and not isinstance(result, bool):
+                    run["rows"] = result
+            except asyncio.TimeoutError as e:
+                # Either the job's own timeout or one raised inside it by the job pool
+                status, error = "timeout", str(e) or f"timed out after {job.timeout:g}s"
+            except Exception as e:
+                status, error = "error", str(e)
+            finally:
+                job.active = False
+            run.update(status=status, error=error)
+        job.last_scheduled_for = scheduled_for
+        job.last_status = status
+        if error:
+            logger.error(f"Job {job.name} ({scheduled_for:%Y-%m-%d %H:%M}) failed: {error}")
+        else:
+            logger.info(f"Job {job.name} ({scheduled_for:%Y-%m-%d %H:%M}) finished in {datetime.now() - started}")
+        await job_executor.run(
+            "scheduler_state", self._save_state, job,
+            last_finished_at=datetime.now(), last_status=status, last_error=error, timeout=30
+        )
 
 # Global scheduler instance
 scheduler = BackgroundScheduler()
+
+
+@scheduler.job("weekly_reminders", WEEKLY_REMINDERS_CRON, misfire="run_once", jitter=60, timeout=600)
+async def generate_weekly_reminders():
+    """Progress reminders for projects with recent activity"""
+    return await reminder_service.auto_generate_weekly_reminders()
+
+
+@scheduler.job("insights_precompute", INSIGHTS_PRECOMPUTE_CRON, misfire="run_once", jitter=300, timeout=3 * 3600)
+async def precompute_insights():
+    """Nightly insights snapshots for recently active projects, during idle hours"""
+    return await insights_service.precompute_active_projects()
@@ -0,0 +1,658 @@
+# backend/services/template_planner.py
+import re
+import math
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from config import config
+    TEMPLATE_PLANNER_HOURS_PER_WEEK = config.TEMPLATE_PLANNER_HOURS_PER_WEEK
+except ImportError:
+    # Fallback if config is not available
+    TEMPLATE_PLANNER_HOURS_PER_WEEK = 10
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "for", "of", "in", "on", "with", "that", "this", "my", "our",
+    "i", "we", "it", "is", "be", "will", "want", "would", "like", "build", "create", "make",
+    "using", "use", "from", "into", "by", "as", "at", "or", "can", "so", "new", "project",
+}
+
+# Words that scale every estimate up or down
+SCALE_WORDS = {
+    "simple": 0.75, "basic": 0.75, "small": 0.75, "prototype": 0.7, "mvp": 0.8, "quick": 0.7,
+    "complex": 1.4, "large": 1.4, "advanced": 1.3, "enterprise": 1.6, "scalable": 1.3, "production": 1.2,
+}
+
+
+def _task(title: str, description: str, hours: float, priority: str = "medium",
+          dependencies: List[str] = None, skills: List[str] = None, deliverables: List[str] = None) -> Dict[str, Any]:
+    return {
+        "title": title,
+        "description": description,
+        "estimated_hours": hours,
+        "priority": priority,
+        "dependencies": dependencies or [],
+        "skills_required": skills or [],
+        "deliverables": deliverables or [],
+    }
+
+
+# Plan templates. Each lists the keywords that select it, its tasks with
+# dependencies, and milestones by the tasks they close. Feature modules
+# below are spliced in between ``integrate_after`` and ``integrate_before``.
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "web_app": {
+        "keywords": ["web", "website", "webapp", "frontend", "react", "vue", "angular", "django", "flask",
+                     "dashboard", "saas", "browser", "html", "css", "javascript", "portal"],
+        "difficulty": "intermediate",
+        "tasks": [
+            _task("Define Requirements", "Write down user stories, pages and core features", 6, "high",
+                  [], ["planning"], ["requirements list"]),
+            _task("Design UI Wireframes", "Sketch the main pages and navigation", 6, "medium",
+                  ["Define Requirements"], ["design"], ["wireframes"]),
+            _task("Setup Development Environment", "Create the repository, tooling and project skeleton", 4, "high",
+                  ["Define Requirements"], ["development"], ["project skeleton"]),
+            _task("Build Backend Foundation", "Set up the server, routing and data models", 12, "high",
+                  ["Setup Development Environment"], ["backend"], ["working API"]),
+            _task("Build Frontend Pages", "Implement the pages from the wireframes", 16, "high",
+                  ["Design UI Wireframes", "Build Backend Foundation"], ["frontend"], ["UI pages"]),
+            _task("Testing and Bug Fixes", "Test the main user flows and fix issues", 8, "medium",
+                  ["Build Frontend Pages"], ["testing"], ["test results"]),
+            _task("Deploy and Launch", "Deploy the application and verify it in production", 4, "medium",
+                  ["Testing and Bug Fixes"], ["devops"], ["live site"]),
+        ],
+        "integrate_after": "Build Backend Foundation",
+        "integrate_before": "Testing and Bug Fixes",
+        "milestones": [
+            ("Requirements and Design Done", "Scope and wireframes agreed", ["Define Requirements", "Design UI Wireframes"]),
+            ("Feature Complete", "All pages and features implemented", ["Build Frontend Pages"]),
+            ("Launch", "Application live", ["Deploy and Launch"]),
+        ],
+        "risks": [
+            ("Scope creep from adding features mid-build", "medium", "Keep a written feature list and defer extras"),
+            ("Frontend and backend drifting apart", "medium", "Agree on the API before building pages"),
+        ],
+        "recommendations": ["Ship a thin vertical slice first", "Keep the API documented as it grows"],
+    },
+    "mobile_app": {
+        "keywords": ["mobile", "ios", "android", "iphone", "flutter", "swift", "kotlin", "react-native", "app"],
+        "difficulty": "intermediate",
+        "tasks": [
+            _task("Define App Requirements", "List screens, user flows and target platforms", 6, "high",
+                  [], ["planning"], ["requirements list"]),
+            _task("Design Screens", "Design the main screens and navigation", 8, "medium",
+                  ["Define App Requirements"], ["design"], ["screen designs"]),
+            _task("Setup Mobile Project", "Create the project, configure build tooling and emulators", 4, "high",
+                  ["Define App Requirements"], ["development"], ["running skeleton app"]),
+            _task("Implement Core Screens", "Build the main screens and navigation", 20, "high",
+                  ["Design Screens", "Setup Mobile Project"], ["mobile development"], ["core screens"]),
+            _task("Implement Local Storage", "Persist app data on the device", 6, "medium",
+                  ["Setup Mobile Project"], ["mobile development"], ["offline data"]),
+            _task("Device Testing", "Test on real devices and fix issues", 8, "medium",
+                  ["Implement Core Screens", "Implement Local Storage"], ["testing"], ["test results"]),
+            _task("Store Release", "Prepare store listing and publish", 6, "medium",
+                  ["Device Testing"], ["release"], ["published app"]),
+        ],
+        "integrate_after": "Setup Mobile Project",
+        "integrate_before": "Device Testing",
+        "milestones": [
+            ("Designs Ready", "Screens designed", ["Design Screens"]),
+            ("Core App Working", "Main flows usable on a device", ["Implement Core Screens"]),
+            ("Released", "App published", ["Store Release"]),
+        ],
+        "risks": [
+            ("Store review delays the release", "medium", "Read store guidelines early and submit ahead of the deadline"),
+            ("Platform differences between devices", "medium", "Test on several screen sizes and OS versions"),
+        ],
+        "recommendations": ["Start with one platform", "Test on a real device early"],
+    },
+    "api_service": {
+        "keywords": ["api", "backend", "service", "rest", "graphql", "microservice", "server", "endpoint",
+                     "endpoints", "fastapi", "express", "integration"],
+        "difficulty": "intermediate",
+        "tasks": [
+            _task("Define API Contract", "List resources, endpoints and payloads", 6, "high",
+                  [], ["api design"], ["API specification"]),
+            _task("Setup Service Skeleton", "Create the service, configuration and tooling", 4, "high",
+                  ["Define API Contract"], ["backend"], ["running service"]),
+            _task("Design Data Model", "Define entities and storage schema", 6, "high",
+                  ["Define API Contract"], ["data modeling"], ["schema"]),
+            _task("Implement Endpoints", "Implement the endpoints from the contract", 16, "high",
+                  ["Setup Service Skeleton", "Design Data Model"], ["backend"], ["working endpoints"]),
+            _task("Write Automated Tests", "Cover endpoints with automated tests", 8, "medium",
+                  ["Implement Endpoints"], ["testing"], ["test suite"]),
+            _task("Write API Documentation", "Document endpoints with examples", 4, "low",
+                  ["Implement Endpoints"], ["documentation"], ["API docs"]),
+            _task("Deploy Service", "Deploy and monitor the service", 4, "medium",
+                  ["Write Automated Tests"], ["devops"], ["deployed service"]),
+        ],
+        "integrate_after": "Setup Service Skeleton",
+        "integrate_before": "Write Automated Tests",
+        "milestones": [
+            ("Contract Agreed", "Endpoints and data model defined", ["Define API Contract", "Design Data Model"]),
+            ("Endpoints Working", "All endpoints implemented and tested", ["Implement Endpoints", "Write Automated Tests"]),
+            ("Service Live", "Service deployed", ["Deploy Service"]),
+        ],
+        "risks": [
+            ("Breaking changes for API consumers", "medium", "Version the API and keep the contract reviewed"),
+            ("Performance problems under load", "low", "Measure response times before launch"),
+        ],
+        "recommendations": ["Write the contract before the code", "Automate tests from the first endpoint"],
+    },
+    "data_ml": {
+        "keywords": ["data", "machine", "learning", "ml", "model", "analysis", "analytics", "dataset",
+                     "pipeline", "etl", "prediction", "predict", "classifier", "ai", "visualization", "pandas"],
+        "difficulty": "advanced",
+        "tasks": [
+            _task("Define Problem and Metrics", "State the question and how success is measured", 4, "high",
+                  [], ["analysis"], ["problem statement"]),
+            _task("Collect Data", "Gather and store the raw data", 8, "high",
+                  ["Define Problem and Metrics"], ["data engineering"], ["raw dataset"]),
+            _task("Clean and Explore Data", "Clean the data and explore distributions", 10, "high",
+                  ["Collect Data"], ["data analysis"], ["clean dataset", "exploration notes"]),
+            _task("Build Baseline", "Create a simple baseline to compare against", 6, "medium",
+                  ["Clean and Explore Data"], ["modeling"], ["baseline results"]),
+            _task("Develop Model or Analysis", "Iterate on the model or analysis", 16, "high",
+                  ["Build Baseline"], ["modeling"], ["model", "analysis"]),
+            _task("Evaluate Results", "Evaluate against the metrics and check for errors", 6, "medium",
+                  ["Develop Model or Analysis"], ["evaluation"], ["evaluation report"]),
+            _task("Present Findings", "Write up results and visualizations", 6, "medium",
+                  ["Evaluate Results"], ["communication"], ["report"]),
+        ],
+        "integrate_after": "Clean and Explore Data",
+        "integrate_before": "Evaluate Results",
+        "milestones": [
+            ("Data Ready", "Clean dataset available", ["Collect Data", "Clean and Explore Data"]),
+            ("Model Working", "Model or analysis beats the baseline", ["Develop Model or Analysis"]),
+            ("Results Shared", "Findings presented", ["Present Findings"]),
+        ],
+        "risks": [
+            ("Data quality worse than expected", "high", "Explore the data before committing to an approach"),
+            ("Results do not beat the baseline", "medium", "Set a time box for experiments"),
+        ],
+        "recommendations": ["Start with a baseline", "Keep experiments reproducible"],
+    },
+    "game": {
+        "keywords": ["game", "unity", "godot", "unreal", "player", "level", "levels", "pygame", "sprite", "multiplayer"],
+        "difficulty": "intermediate",
+        "tasks": [
+            _task("Write Game Design Document", "Describe the core loop, mechanics and scope", 6, "high",
+                  [], ["game design"], ["design document"]),
+            _task("Setup Engine Project", "Create the project and import base assets", 4, "high",
+                  ["Write Game Design Document"], ["development"], ["engine project"]),
+            _task("Prototype Core Mechanics", "Build the core gameplay loop", 16, "high",
+                  ["Setup Engine Project"], ["gameplay programming"], ["playable prototype"]),
+            _task("Create Art and Audio", "Produce or source sprites, models and sounds", 12, "medium",
+                  ["Write Game Design Document"], ["art"], ["assets"]),
+            _task("Build Levels", "Design and build levels or content", 12, "medium",
+                  ["Prototype Core Mechanics", "Create Art and Audio"], ["level design"], ["levels"]),
+            _task("Playtesting and Polish", "Playtest, balance and fix bugs", 10, "medium",
+                  ["Build Levels"], ["testing"], ["polished build"]),
+            _task("Release Build", "Package and publish the game", 4, "medium",
+                  ["Playtesting and Polish"], ["release"], ["release build"]),
+        ],
+        "integrate_after": "Prototype Core Mechanics",
+        "integrate_before": "Playtesting and Polish",
+        "milestones": [
+            ("Playable Prototype", "Core loop playable", ["Prototype Core Mechanics"]),
+            ("Content Complete", "Levels and assets in place", ["Build Levels"]),
+            ("Released", "Game published", ["Release Build"]),
+        ],
+        "risks": [
+            ("Core loop is not fun", "high", "Playtest the prototype before building content"),
+            ("Asset production takes longer than planned", "medium", "Use placeholder art until mechanics are final"),
+        ],
+        "recommendations": ["Find the fun in a prototype first", "Cut scope before cutting polish"],
+    },
+    "cli_tool": {
+        "keywords": ["cli", "command", "command-line", "terminal", "script", "tool", "library", "package",
+                     "automation", "automate", "bot", "plugin", "extension"],
+        "difficulty": "beginner",
+        "tasks": [
+            _task("Define Features and Interface", "List commands, options and expected output", 4, "high",
+                  [], ["planning"], ["interface spec"]),
+            _task("Setup Package Structure", "Create the package layout and tooling", 3, "high",
+                  ["Define Features and Interface"], ["development"], ["package skeleton"]),
+            _task("Implement Core Functionality", "Implement the main features", 12, "high",
+                  ["Setup Package Structure"], ["development"], ["working tool"]),
+            _task("Handle Errors and Edge Cases", "Validate input and report errors clearly", 4, "medium",
+                  ["Implement Core Functionality"], ["development"], ["robust tool"]),
+            _task("Write Tests", "Add automated tests for the main features", 6, "medium",
+                  ["Implement Core Functionality"], ["testing"], ["test suite"]),
+            _task("Write Documentation", "Write usage docs and examples", 3, "low",
+                  ["Handle Errors and Edge Cases"], ["documentation"], ["README"]),
+            _task("Publish Release", "Package and publish the first release", 2, "medium",
+                  ["Write Tests", "Write Documentation"], ["release"], ["published package"]),
+        ],
+        "integrate_after": "Setup Package Structure",
+        "integrate_before": "Write Tests",
+        "milestones": [
+            ("Core Working", "Main features usable", ["Implement Core Functionality"]),
+            ("First Release", "Tested, documented and published", ["Publish Release"]),
+        ],
+        "risks": [
+            ("Unclear scope for options and features", "low", "Define the interface before coding"),
+        ],
+        "recommendations": ["Keep the interface small", "Write usage examples early"],
+    },
+    "content": {
+        "keywords": ["blog", "book", "course", "video", "videos", "content", "podcast", "article", "articles",
+                     "writing", "write", "youtube", "newsletter", "tutorial", "portfolio"],
+        "difficulty": "beginner",
+        "tasks": [
+            _task("Define Audience and Topics", "Decide who it is for and list topics", 4, "high",
+                  [], ["planning"], ["topic list"]),
+            _task("Research", "Gather material and references for the topics", 8, "medium",
+                  ["Define Audience and Topics"], ["research"], ["research notes"]),
+            _task("Create Outline", "Outline the structure of the content", 4, "high",
+                  ["Research"], ["writing"], ["outline"]),
+            _task("Produce First Drafts", "Write or record the first drafts", 16, "high",
+                  ["Create Outline"], ["content creation"], ["drafts"]),
+            _task("Edit and Review", "Edit drafts and collect feedback", 8, "medium",
+                  ["Produce First Drafts"], ["editing"], ["final versions"]),
+            _task("Publish and Promote", "Publish the content and share it", 4, "medium",
+                  ["Edit and Review"], ["marketing"], ["published content"]),
+        ],
+        "integrate_after": "Create Outline",
+        "integrate_before": "Edit and Review",
+        "milestones": [
+            ("Outline Ready", "Topics researched and outlined", ["Research", "Create Outline"]),
+            ("Drafts Complete", "All drafts produced", ["Produce First Drafts"]),
+            ("Published", "Content published", ["Publish and Promote"]),
+        ],
+        "risks": [
+            ("Perfectionism delays publishing", "medium", "Set a publish date and edit against it"),
+        ],
+        "recommendations": ["Publish on a fixed schedule", "Reuse research across pieces"],
+    },
+    "hardware": {
+        "keywords": ["arduino", "raspberry", "pi", "sensor", "sensors", "iot", "hardware", "robot", "robotics",
+                     "embedded", "circuit", "microcontroller", "esp32", "3d"],
+        "difficulty": "advanced",
+        "tasks": [
+            _task("Define Requirements and Parts", "List features and choose components", 6, "high",
+                  [], ["planning"], ["parts list"]),
+            _task("Order Components", "Order parts and tools", 2, "high",
+                  ["Define Requirements and Parts"], ["procurement"], ["components"]),
+            _task("Breadboard Prototype", "Wire a prototype and verify each component", 10, "high",
+                  ["Order Components"], ["electronics"], ["working prototype"]),
+            _task("Write Firmware", "Write and flash the firmware", 14, "high",
+                  ["Breadboard Prototype"], ["embedded programming"], ["firmware"]),
+            _task("Build Enclosure", "Design and build the enclosure", 8, "medium",
+                  ["Breadboard Prototype"], ["fabrication"], ["enclosure"]),
+            _task("Integration Testing", "Test the assembled device end to end", 6, "medium",
+                  ["Write Firmware", "Build Enclosure"], ["testing"], ["test results"]),
+            _task("Document Build", "Document wiring, code and assembly", 4, "low",
+                  ["Integration Testing"], ["documentation"], ["build guide"]),
+        ],
+        "integrate_after": "Breadboard Prototype",
+        "integrate_before": "Integration Testing",
+        "milestones": [
+            ("Prototype Working", "Components verified on the breadboard", ["Breadboard Prototype"]),
+            ("Device Assembled", "Firmware and enclosure done", ["Write Firmware", "Build Enclosure"]),
+            ("Project Documented", "Device tested and documented", ["Document Build"]),
+        ],
+        "risks": [
+            ("Parts arrive late or are faulty", "medium", "Order spares and order early"),
+            ("Power or wiring issues damage components", "medium", "Verify wiring before powering on"),
+        ],
+        "recommendations": ["Test each component on its own first", "Keep a build log"],
+    },
+    "generic": {
+        "keywords": [],
+        "difficulty": "intermediate",
+        "tasks": [
+            _task("Project Planning", "Define project scope and requirements", 8, "high",
+                  [], ["planning"], ["project plan"]),
+            _task("Setup Development Environment", "Configure tools and workspace", 4, "high",
+                  ["Project Planning"], ["development"], ["development environment"]),
+            _task("Implementation Phase 1", "Build the core of the project", 16, "high",
+                  ["Setup Development Environment"], ["development"], ["initial implementation"]),
+            _task("Implementation Phase 2", "Complete the remaining features", 12, "medium",
+                  ["Implementation Phase 1"], ["development"], ["complete implementation"]),
+            _task("Testing and Review", "Test functionality and review progress", 8, "medium",
+                  ["Implementation Phase 2"], ["testing"], ["test results"]),
+        ],
+        "integrate_after": "Setup Development Environment",
+        "integrate_before": "Testing and Review",
+        "milestones": [
+            ("Project Setup Complete", "Planning and environment ready", ["Project Planning", "Setup Development Environment"]),
+            ("First Implementation", "Core functionality implemented", ["Implementation Phase 1"]),
+            ("Project Complete", "Tested and reviewed", ["Testing and Review"]),
+        ],
+        "risks": [
+            ("Scope creep during development", "medium", "Regular scope reviews and clear requirements"),
+            ("Technical challenges", "medium", "Research and prototyping before full implementation"),
+        ],
+        "recommendations": ["Start with a minimal viable version", "Plan regular progress reviews",
+                            "Document decisions and learnings", "Test early and often"],
+    },
+}
+
+# Feature modules added to any template when the description mentions them
+MODULES: Dict[str, Dict[str, Any]] = {
+    "authentication": {
+        "keywords": ["login", "auth", "authentication", "signup", "account", "accounts", "users", "user", "oauth"],
+        "task": _task("Implement User Authentication", "Add sign up, login and session handling", 8, "high",
+                      skills=["security"], deliverables=["authentication"]),
+        "risk": ("Security flaws in account handling", "high", "Use a well-tested auth library"),
+    },
+    "payments": {
+        "keywords": ["payment", "payments", "stripe", "paypal", "checkout", "subscription", "billing", "shop", "store", "ecommerce"],
+        "task": _task("Integrate Payments", "Integrate the payment provider and handle failures", 10, "high",
+                      skills=["payments"], deliverables=["checkout flow"]),
+        "risk": ("Payment edge cases lose orders", "high", "Test with the provider's sandbox including failures"),
+    },
+    "database": {
+        "keywords": ["database", "db", "sql", "sqlite", "postgres", "postgresql", "mysql", "mongodb", "storage"],
+        "task": _task("Design Database Schema", "Design tables, indexes and migrations", 6, "high",
+                      skills=["databases"], deliverables=["schema and migrations"]),
+    },
+    "notifications": {
+        "keywords": ["notification", "notifications", "email", "emails", "reminder", "reminders", "sms", "push"],
+        "task": _task("Add Notifications", "Send email or push notifications for key events", 6, "medium",
+                      skills=["backend"], deliverables=["notifications"]),
+    },
+    "search": {
+        "keywords": ["search", "filter", "filtering"],
+        "task": _task("Implement Search", "Add search and filtering", 6, "medium",
+                      skills=["backend"], deliverables=["search"]),
+    },
+    "realtime": {
+        "keywords": ["chat", "realtime", "real-time", "websocket", "websockets", "live", "multiplayer"],
+        "task": _task("Implement Realtime Updates", "Push live updates over websockets", 10, "medium",
+                      skills=["networking"], deliverables=["realtime updates"]),
+        "risk": ("Realtime features are hard to scale and test", "medium", "Prototype the connection handling early"),
+    },
+    "deployment": {
+        "keywords": ["docker", "kubernetes", "aws", "azure", "gcp", "cloud", "hosting", "ci", "cd"],
+        "task": _task("Setup CI and Deployment Pipeline", "Automate builds, tests and deployments", 6, "medium",
+                      skills=["devops"], deliverables=["pipeline"]),
+    },
+    "api_integration": {
+        "keywords": ["integrate", "third-party", "webhook", "webhooks", "scrape", "scraping", "openai", "ollama"],
+        "task": _task("Integrate External APIs", "Connect to the external services and handle their errors", 8, "medium",
+                      skills=["integration"], deliverables=["working integrations"]),
+        "risk": ("External services change or rate limit", "medium", "Wrap external calls and cache responses"),
+    },
+}
+
+# Step patterns for breaking a single task down
+BREAKDOWNS: Dict[str, Dict[str, Any]] = {
+    "bugfix": {
+        "keywords": ["bug", "fix", "crash", "error", "issue", "broken", "debug"],
+        "steps": [("Reproduce the Problem", "Find reliable steps to reproduce it", 0.2, ["debugging"], ["Problem reproduced"]),
+                  ("Find the Root Cause", "Trace the failure to its cause", 0.3, ["debugging"], ["Cause identified"]),
+                  ("Implement the Fix", "Fix the cause, not the symptom", 0.3, ["development"], ["Fix working"]),
+                  ("Add Regression Test", "Test that fails without the fix", 0.2, ["testing"], ["Test passes"])],
+    },
+    "writing": {
+        "keywords": ["write", "document", "documentation", "docs", "article", "blog", "post", "report", "readme"],
+        "steps": [("Outline", "Decide structure and key points", 0.2, ["writing"], ["Outline done"]),
+                  ("Write Draft", "Write the full first draft", 0.5, ["writing"], ["Draft complete"]),
+                  ("Review and Edit", "Edit for clarity and correctness", 0.2, ["editing"], ["Edits applied"]),
+                  ("Publish", "Publish or share the result", 0.1, ["communication"], ["Published"])],
+    },
+    "design": {
+        "keywords": ["design", "ui", "ux", "mockup", "wireframe", "layout", "logo"],
+        "steps": [("Gather References", "Collect requirements and examples", 0.2, ["research"], ["References collected"]),
+                  ("Sketch Options", "Sketch a few alternatives", 0.3, ["design"], ["Options sketched"]),
+                  ("Refine Chosen Design", "Refine the chosen option in detail", 0.35, ["design"], ["Design finalized"]),
+                  ("Get Feedback", "Review with users or stakeholders", 0.15, ["communication"], ["Feedback addressed"])],
+    },
+    "deploy": {
+        "keywords": ["deploy", "deployment", "release", "launch", "publish", "migrate", "migration"],
+        "steps": [("Prepare Checklist", "List steps, rollback plan and checks", 0.2, ["planning"], ["Checklist ready"]),
+                  ("Prepare Environment", "Configure the target environment", 0.3, ["devops"], ["Environment ready"]),
+                  ("Run the Rollout", "Execute the rollout", 0.3, ["devops"], ["Rollout done"]),
+                  ("Verify and Monitor", "Verify the result and watch for errors", 0.2, ["monitoring"], ["Verified"])],
+    },
+    "research": {
+        "keywords": ["research", "investigate", "evaluate", "compare", "explore", "spike", "learn"],
+        "steps": [("Define Questions", "State what needs to be answered", 0.15, ["analysis"], ["Questions listed"]),
+                  ("Gather Information", "Read, try and collect findings", 0.5, ["research"], ["Findings collected"]),
+                  ("Summarize Findings", "Write up the options and a recommendation", 0.35, ["communication"], ["Summary written"])],
+    },
+    "default": {
+        "keywords": [],
+        "steps": [("Research and Planning", "Understand requirements and plan approach", 0.2, ["analysis"], ["Requirements clear", "Plan documented"]),
+                  ("Implementation", "Execute the main work", 0.55, ["implementation"], ["Work completed", "Quality checked"]),
+                  ("Testing", "Check the result works as intended", 0.15, ["testing"], ["Checks pass"]),
+                  ("Review and Finalize", "Review work and finalize", 0.1, ["review"], ["Review complete", "Task finalized"])],
+    },
+}
+
+
+def extract_keywords(text: str) -> List[str]:
+    """Lowercase words of the text without stopwords, in order of first appearance"""
+    seen = {}
+    for word in _WORD.findall((text or "").lower()):
+        word = word.strip(".-")
+        if word and word not in STOPWORDS:
+            seen.setdefault(word, None)
+    return list(seen)
+
+
+def schedule_critical_path(tasks: List[Dict[str, Any]], hours_per_week: float) -> Dict[str, Any]:
+    """CPM over tasks linked by dependency titles.
+
+    Adds earliest/latest start, slack, critical flag and start/end week to
+    each task in place and returns the project length and critical path.
+    Dependencies on unknown titles and edges that would close a cycle are
+    ignored.
+    """
+    by_title = {task["title"]: i for i, task in enumerate(tasks)}
+    preds: List[List[int]] = [
+        [by_title[d] for d in task.get("dependencies", []) if d in by_title and by_title[d] != i]
+        for i, task in enumerate(tasks)
+    ]
+    succs: List[List[int]] = [[] for _ in tasks]
+    indegree = [0] * len(tasks)
+    for i, task_preds in enumerate(preds):
+        for p in task_preds:
+            succs[p].append(i)
+            indegree[i] += 1
+
+    # Kahn's algorithm; anything left over sits on a cycle and is appended
+    order = [i for i in range(len(tasks)) if indegree[i] == 0]
+    for i in order:
+        for s in succs[i]:
+            indegree[s] -= 1
+            if indegree[s] == 0:
+                order.append(s)
+    position = {i: n for n, i in enumerate(order)}
+    for i in range(len(tasks)):
+        if i not in position:
+            position[i] = len(order)
+            order.append(i)
+
+    hours = [float(task.get("estimated_hours") or 0) for task in tasks]
+    earliest_start = [0.0] * len(tasks)
+    earliest_finish = [0.0] * len(tasks)
+    for i in order:
+        earliest_start[i] = max((earliest_finish[p] for p in preds[i] if position[p] < position[i]), default=0.0)
+        earliest_finish[i] = earliest_start[i] + hours[i]
+    length = max(earliest_finish, default=0.0)
+
+    latest_finish = [length] * len(tasks)
+    for i in reversed(order):
+        later = [latest_finish[s] - hours[s] for s in succs[i] if position[s] > position[i]]
+        latest_finish[i] = min(later, default=length)
+
+    critical_path = []
+    for i in order:
+        task = tasks[i]
+        slack = round(latest_finish[i] - earliest_finish[i], 2)
+        task["earliest_start_hours"] = round(earliest_start[i], 2)
+        task["latest_start_hours"] = round(latest_finish[i] - hours[i], 2)
+        task["slack_hours"] = slack
+        task["critical"] = slack <= 1e-6
+        task["start_week"] = int(earliest_start[i] // hours_per_week) + 1
+        task["end_week"] = max(task["start_week"], math.ceil(earliest_finish[i] / hours_per_week))
+        if task["critical"]:
+            critical_path.append(task["title"])
+
+    return {
+        "total_hours": round(sum(hours), 1),
+        "critical_path_hours": round(length, 1),
+        "hours_per_week": hours_per_week,
+        "critical_path": critical_path,
+    }
+
+
+class TemplatePlanner:
+    """Build plans from a local template library, without the model.
+
+    The description's keywords pick the best matching template through an
+    inverted keyword index, feature modules mentioned in the description are
+    spliced into it, estimates are scaled by words like "simple" or
+    "complex", and the result is scheduled with the critical path method.
+    A plan takes well under a millisecond, so it serves as the fallback
+    when the model is unavailable and as the instant first answer of the
+    "fast" plan mode.
+    """
+    def __init__(self, templates: Dict[str, Dict[str, Any]] = None, modules: Dict[str, Dict[str, Any]] = None,
+                 hours_per_week: float = None):
+        self.templates = templates or TEMPLATES
+        self.modules = modules or MODULES
+        self.hours_per_week = hours_per_week or TEMPLATE_PLANNER_HOURS_PER_WEEK
+        self._template_index = self._build_index(self.templates)
+        self._module_index = self._build_index(self.modules)
+        self._breakdown_index = self._build_index(BREAKDOWNS)
+
+    @staticmethod
+    def _build_index(entries: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        index: Dict[str, List[str]] = {}
+        for name, entry in entries.items():
+            for keyword in entry["keywords"]:
+                index.setdefault(keyword, []).append(name)
+        return index
+
+    @staticmethod
+    def _scale(keywords: List[str]) -> float:
+        scale = 1.0
+        for word in keywords:
+            scale *= SCALE_WORDS.get(word, 1.0)
+        return min(max(scale, 0.5), 2.0)
+
+    def _best_match(self, entries: Dict[str, Dict[str, Any]], index: Dict[str, List[str]],
+                    keywords: List[str], default: str) -> Tuple[str, List[str]]:
+        scores: Dict[str, int] = {}
+        matched: Dict[str, List[str]] = {}
+        for word in keywords:
+            for name in index.get(word, []):
+                scores[name] = scores.get(name, 0) + 1
+                matched.setdefault(name, []).append(word)
+        if not scores:
+            return default, []
+        # Ties go to the entry listed first
+        best = max((name for name in entries if name in scores), key=lambda name: scores[name])
+        return best, matched[best]
+
+    def choose_template(self, text: str) -> Tuple[str, List[str]]:
+        return self._best_match(self.templates, self._template_index, extract_keywords(text), "generic")
+
+    def plan(self, project_description: str, project_title: str = None) -> Dict[str, Any]:
+        """A complete plan in the structure create_project_plan returns"""
+        text = f"{project_title or ''} {project_description or ''}"
+        keywords = extract_keywords(text)
+        template_name, matched = self._best_match(self.templates, self._template_index, keywords, "generic")
+        template = self.templates[template_name]
+        scale = self._scale(keywords)
+
+        tasks = [dict(task, dependencies=list(task["dependencies"])) for task in template["tasks"]]
+        titles = {task["title"] for task in tasks}
+        risks = [{"risk": r, "impact": impact, "mitigation": m} for r, impact, m in template["risks"]]
+
+        modules = sorted({name for word in keywords for name in self._module_index.get(word, [])})
+        closing = next((task for task in tasks if task["title"] == template["integrate_before"]), None)
+        for name in modules:
+            module = self.modules[name]
+            task = dict(module["task"], dependencies=[template["integrate_after"]])
+            if task["title"] in titles:
+                continue
+            tasks.insert(tasks.index(closing) if closing else len(tasks), task)
+            titles.add(task["title"])
+            if closing:
+                closing["dependencies"].append(task["title"])
+            if "risk" in module:
+                r, impact, m = module["risk"]
+                risks.append({"risk": r, "impact": impact, "mitigation": m})
+
+        for task in tasks:
+            task["estimated_hours"] = max(1, round(task["estimated_hours"] * scale))
+
+        schedule = schedule_critical_path(tasks, self.hours_per_week)
+        for task in tasks:
+            if task["critical"] and task["priority"] == "medium":
+                task["priority"] = "high"
+
+        week_by_title = {task["title"]: task["end_week"] for task in tasks}
+        milestones = [
+            {
+                "name": name,
+                "description": description,
+                "week": max((week_by_title.get(t, 1) for t in included), default=1),
+                "tasks_included": included,
+            }
+            for name, description, included in template["milestones"]
+        ]
+
+        difficulty = template["difficulty"]
+        if scale >= 1.3:
+            difficulty = "advanced"
+        elif scale <= 0.8 and difficulty == "intermediate":
+            difficulty = "beginner"
+
+        return {
+            "project_title": project_title or "New Project",
+            "project_description": project_description,
+            "estimated_duration_weeks": max(1, math.ceil(schedule["critical_path_hours"] / self.hours_per_week)),
+            "difficulty_level": difficulty,
+            "tasks": tasks,
+            "milestones": milestones,
+            "risks": risks,
+            "recommendations": list(template["recommendations"]),
+            "schedule": schedule,
+            "planner": {
+                "source": "template",
+                "template": template_name,
+                "matched_keywords": matched,
+                "modules": modules,
+            },
+        }
+
+    def break_down(self, task_description: str, total_hours: float = None) -> Dict[str, Any]:
+        """A task breakdown in the structure suggest_task_breakdown returns"""
+        keywords = extract_keywords(task_description)
+        pattern, _ = self._best_match(BREAKDOWNS, self._breakdown_index, keywords, "default")
+        total = total_hours or round(8 * self._scale(keywords))
+
+        subtasks = []
+        previous = None
+        for order, (title, description, share, skills, criteria) in enumerate(BREAKDOWNS[pattern]["steps"], start=1):
+            subtasks.append({
+                "title": title,
+                "description": description,
+                "estimated_hours": max(0.5, round(total * share * 2) / 2),
+                "order": order,
+                "dependencies": [previous] if previous else [],
+                "skills_needed": skills,
+                "acceptance_criteria": criteria,
+            })
+            previous = title
+
+        return {
+            "original_task": task_description,
+            "estimated_total_hours": sum(s["estimated_hours"] for s in subtasks),
+            "subtasks": subtasks,
+            "notes": f"Template breakdown ({pattern}) - consider customizing based on specific requirements",
+        }
+
+
+# Global planner instance
+template_planner = TemplatePlanner()
@@ -0,0 +1,81 @@
+# backend/services/title_index.py
+import re
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+_NUMBERING = re.compile(r"^(?:(?:task|step|phase)\s*)?\d+[.):\-]?\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Lowercase, drop punctuation and leading numbering, collapse whitespace"""
+    text = " ".join((title or "").lower().split())
+    text = _NUMBERING.sub("", text)
+    text = _NON_WORD.sub(" ", text)
+    return " ".join(text.split())
+
+
+class TaskTitleIndex:
+    """Look up items by title, tolerating the approximate titles models return.
+
+    Built once per request: exact matches on the normalized title are a dict
+    lookup, and fuzzy matches only compare against items that share at least
+    one word, found through an inverted token index, instead of scanning
+    every item.
+
+    A fuzzy match needs both a character similarity of at least ``cutoff``
+    and a word overlap (Jaccard) of at least ``token_cutoff``, so short
+    titles that merely share a word ("Build API", "Build UI") do not match.
+    When the two best candidates score within ``margin`` of each other the
+    title is ambiguous and nothing is returned.
+    """
+    def __init__(self, items: Iterable[Any], key: Callable[[Any], str] = lambda item: item.title,
+                 cutoff: float = 0.75, token_cutoff: float = 0.5, margin: float = 0.05):
+        self.cutoff = cutoff
+        self.token_cutoff = token_cutoff
+        self.margin = margin
+        self._items: List[Any] = []
+        self._normalized: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+        for item in items:
+            position = len(self._items)
+            normalized = normalize_title(key(item))
+            self._items.append(item)
+            self._normalized.append(normalized)
+            self._exact.setdefault(normalized, position)
+            for token in normalized.split():
+                self._tokens.setdefault(token, set()).add(position)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def match(self, title: Optional[str]) -> Optional[Any]:
+        normalized = normalize_title(title)
+        if not normalized:
+            return None
+        if normalized in self._exact:
+            return self._items[self._exact[normalized]]
+
+        tokens = set(normalized.split())
+        candidates: Set[int] = set()
+        for token in tokens:
+            candidates |= self._tokens.get(token, set())
+
+        scores = []
+        for position in candidates:
+            other = self._normalized[position]
+            other_tokens = set(other.split())
+            overlap = len(tokens & other_tokens) / len(tokens | other_tokens)
+            if overlap < self.token_cutoff:
+                continue
+            ratio = SequenceMatcher(None, normalized, other).ratio()
+            if ratio < self.cutoff:
+                continue
+            scores.append(((ratio + overlap) / 2, position))
+        if not scores:
+            return None
+        scores.sort(reverse=True)
+        if len(scores) > 1 and scores[0][0] - scores[1][0] < self.margin:
+            return None
+        return self._items[scores[0][1]]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Load test for the /ai/* routes
+Runs the app with uvicorn against the Ollama stub (or a real Ollama), drives
+the AI routes with concurrent clients and reports throughput, tail latency
+and how long the event loop was blocked.
+
+Example:
+    python benchmarks/ai_load_test.py --concurrency 16 --requests 64 --tokens-per-sec 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ollama_stub import add_stub_arguments, settings_from_args, start_in_thread
+
+SCENARIOS = ("status", "plan", "breakdown", "analyze", "insights")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+
+class LoopLagProbe:
+    """Measure event-loop blocking from inside the server's loop.
+
+    A coroutine sleeps ``interval`` seconds at a time; any extra delay
+    before it wakes up is time the loop spent running something else
+    without yielding.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags_ms = []
+        self.running = True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (loop.time() - expected) * 1000))
+
+    def report(self, blocked_threshold_ms: float = 5.0):
+        lags = self.lags_ms
+        blocked = [lag for lag in lags if lag >= blocked_threshold_ms]
+        return {
+            "samples": len(lags),
+            "p50_ms": percentile(lags, 50),
+            "p99_ms": percentile(lags, 99),
+            "max_ms": max(lags, default=0.0),
+            "blocked_ms": sum(blocked),
+            "blocked_events": len(blocked),
+        }
+
+
+class AppServer:
+    """uvicorn in a background thread with its own event loop"""
+    def __init__(self, port: int):
+        import uvicorn
+        from backend.main import app
+
+        self.config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(self.config)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="uvicorn", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 15.0):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def make_request(session, base_url, scenario, i, project_id):
+    if scenario == "status":
+        return session.get(f"{base_url}/ai/status", timeout=300)
+    if scenario == "plan":
+        return session.post(f"{base_url}/ai/create-project-plan", timeout=300, data={
+            "project_title": f"Load Test {i}",
+            "project_description": f"Web app number {i} with user login, search and email notifications",
+        })
+    if scenario == "breakdown":
+        return session.post(f"{base_url}/ai/break-down-task", timeout=300, data={
+            "task_description": f"Implement CSV export variant {i}", "project_id": project_id,
+        })
+    if scenario == "analyze":
+        return session.post(f"{base_url}/ai/analyze-project/{project_id}?refresh=true", timeout=300)
+    if scenario == "insights":
+        return session.get(f"{base_url}/ai/project-insights/{project_id}", timeout=300)
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+def run_scenario(base_url, scenario, total, concurrency, project_id):
+    sessions = threading.local()
+
+    def one(i):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = make_request(sessions.session, base_url, scenario, i, project_id)
+            ok = response.status_code == 200 and "error" not in (response.json() or {})
+        except Exception:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [ms for ms, _ in results]
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /ai/* routes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma list from {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the app under test")
+    parser.add_argument("--ollama-url", default=None, help="Use this Ollama instead of starting the stub")
+    parser.add_argument("--database-url", default=None, help="Database for the run (default: a temporary SQLite file)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario}")
+
+    stub = None
+    if args.ollama_url:
+        ollama_url = args.ollama_url
+    else:
+        stub = start_in_thread(settings_from_args(args))
+        ollama_url = f"http://127.0.0.1:{stub.server_port}"
+        print(f"🤖 Ollama stub on {ollama_url}")
+
+    # Configuration is read at import time, so set it before importing the app
+    tmp_dir = tempfile.mkdtemp(prefix="ai-load-test-")
+    os.environ["OLLAMA_BASE_URL"] = ollama_url
+    os.environ["OLLAMA_ENDPOINTS"] = ollama_url
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp_dir}/load_test.db"
+    os.environ["PLAN_INDEX_PATH"] = f"{tmp_dir}/plan_index.npz"
+    os.chdir(ROOT)
+    # The app serves this directory and fails to start without it
+    os.makedirs("uploads", exist_ok=True)
+
+    app_server = AppServer(args.port)
+    app_server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"🚀 App on {base_url} (database {os.environ['DATABASE_URL']})")
+
+    probe = LoopLagProbe()
+    probe_future = asyncio.run_coroutine_threadsafe(probe.run(), app_server.loop)
+
+    try:
+        setup = requests.post(f"{base_url}/ai/create-project-plan", timeout=300, data={
+            "project_title": "Load Test Project", "project_description": "Project used by the load test",
+        }).json()
+        project_id = setup.get("project_id")
+        if project_id is None:
+            print(f"❌ Could not create the load test project: {setup}")
+            return 1
+
+        print(f"📊 {args.requests} requests per scenario, concurrency {args.concurrency}")
+        print(f"  {'scenario':<10} {'req/s':>7} {'errors':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}   loop blocked")
+        for scenario in scenarios:
+            probe.lags_ms = []
+            result = run_scenario(base_url, scenario, args.requests, args.concurrency, project_id)
+            lag = probe.report()
+            print(
+                f"  {scenario:<10} {result['throughput_rps']:>7.1f} {result['errors']:>6} "
+                f"{result['p50_ms']:>7.0f}ms {result['p95_ms']:>7.0f}ms {result['p99_ms']:>7.0f}ms {result['max_ms']:>7.0f}ms"
+                f"   {lag['blocked_ms']:.0f}ms total, max stall {lag['max_ms']:.1f}ms, p99 lag {lag['p99_ms'] or 0:.1f}ms"
+            )
+
+        metrics = requests.get(f"{base_url}/ai/metrics", timeout=30).json()
+        print("🔬 Ollama calls (from /ai/metrics):")
+        for operation, summary in metrics.get("operations", {}).items():
+            http = summary.get("http_ms", {})
+            queue = summary.get("queue_ms", {})
+            print(
+                f"  {operation:<26} calls={summary['calls']:<5} errors={summary['errors']:<4} "
+                f"http p50={http.get('p50', '-')}ms p99={http.get('p99', '-')}ms queue p99={queue.get('p99', '-')}ms"
+            )
+        return 0
+    finally:
+        probe.running = False
+        try:
+            probe_future.result(timeout=2)
+        except Exception:
+            pass
+        app_server.stop()
+        if stub:
+            stub.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
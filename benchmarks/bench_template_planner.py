@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the template planner
+Times plan generation and task breakdown across a set of project descriptions
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.services.template_planner import TemplatePlanner, schedule_critical_path
+
+DESCRIPTIONS = [
+    ("Recipe Site", "A simple web app where users can login, save recipes and search them"),
+    ("Habit Tracker", "Mobile app for iOS and Android with reminders and local storage"),
+    ("Inventory API", "REST API backend with a postgres database, deployed with docker on AWS"),
+    ("Churn Model", "Train a machine learning model to predict customer churn from our dataset"),
+    ("Platformer", "A 2D platformer game in Godot with ten levels"),
+    ("Backup CLI", "Command line tool to automate backups of my photos"),
+    ("Dev Blog", "Start a blog and write weekly articles about Python"),
+    ("Weather Station", "Arduino weather station with sensors that posts readings to a dashboard"),
+    ("Shop", "Complex enterprise ecommerce website with stripe payments, search and email notifications"),
+    ("Side Project", "Something fun to do on weekends"),
+]
+
+TASKS = [
+    "Fix the crash when saving a task",
+    "Write documentation for the API",
+    "Design the settings page",
+    "Deploy the new release to production",
+    "Research charting libraries",
+    "Implement CSV export",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, samples_ms):
+    print(
+        f"  {name:<22} n={len(samples_ms):<6} "
+        f"mean={statistics.mean(samples_ms):.3f}ms "
+        f"p50={percentile(samples_ms, 50):.3f}ms "
+        f"p99={percentile(samples_ms, 99):.3f}ms "
+        f"max={max(samples_ms):.3f}ms"
+    )
+
+
+def time_calls(fn, args_list, iterations):
+    samples = []
+    for _ in range(iterations):
+        for args in args_list:
+            started = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def synthetic_chain(size):
+    """A layered task graph: each task depends on up to three tasks of the previous layer"""
+    tasks = []
+    width = 10
+    for i in range(size):
+        layer = i // width
+        deps = [f"T{j}" for j in range((layer - 1) * width, layer * width) if j >= 0 and j % 3 == i % 3][:3]
+        tasks.append({"title": f"T{i}", "estimated_hours": 1 + i % 7, "dependencies": deps})
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the template planner")
+    parser.add_argument("--iterations", type=int, default=200, help="Passes over the sample descriptions")
+    parser.add_argument("--cpm-size", type=int, default=2000, help="Tasks in the synthetic CPM graph")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    planner = TemplatePlanner()
+    print(f"🔧 Planner initialized in {(time.perf_counter() - started) * 1000:.2f}ms")
+
+    print("📋 Sample plans:")
+    for title, description in DESCRIPTIONS:
+        plan = planner.plan(description, title)
+        print(
+            f"  {title:<16} template={plan['planner']['template']:<12} "
+            f"modules={','.join(plan['planner']['modules']) or '-':<40} "
+            f"tasks={len(plan['tasks']):<3} weeks={plan['estimated_duration_weeks']}"
+        )
+
+    print(f"⏱️  Timings ({args.iterations} iterations):")
+    report("plan", time_calls(planner.plan, [(d, t) for t, d in DESCRIPTIONS], args.iterations))
+    report("break_down", time_calls(planner.break_down, [(t,) for t in TASKS], args.iterations))
+
+    tasks = synthetic_chain(args.cpm_size)
+    samples = []
+    for _ in range(10):
+        copies = [dict(task) for task in tasks]
+        started = time.perf_counter()
+        schedule = schedule_critical_path(copies, 10)
+        samples.append((time.perf_counter() - started) * 1000)
+    report(f"cpm ({args.cpm_size} tasks)", samples)
+    print(f"  critical path: {len(schedule['critical_path'])} tasks, {schedule['critical_path_hours']}h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink and webhook stub for the reminder notification pipeline
+The SMTP sink accepts every message and keeps it in memory (no TLS, so run
+the app with SMTP_STARTTLS=false); the webhook stub records JSON POSTs and
+can fail a share of them to exercise retries and dead letters.
+
+Example:
+    python benchmarks/notification_sink.py --smtp-port 2525 --webhook-port 8025 --fail-rate 0.3
+    NOTIFICATION_CHANNELS=log,smtp,webhook SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=false \\
+        SMTP_FROM=app@localhost SMTP_TO=me@localhost NOTIFICATION_WEBHOOK_URL=http://127.0.0.1:8025/hook ...
+"""
+
+import argparse
+import json
+import random
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SinkState:
+    """Everything the sinks received, shared between handler threads"""
+    def __init__(self, fail_rate: float = 0.0, seed=None):
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.emails = []
+        self.smtp_sessions = 0
+        self.webhooks = []
+        self.webhook_failures = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.fail_rate
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server side: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+    disable_nagle_algorithm = True
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        state = self.server.state
+        with state.lock:
+            state.smtp_sessions += 1
+        self.reply("220 sink ESMTP ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                with state.lock:
+                    state.emails.append({
+                        "from": sender, "to": recipients, "data": b"".join(data).decode("utf-8", "replace")
+                    })
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SmtpSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, state: SinkState):
+        super().__init__(address, SmtpSinkHandler)
+        self.state = state
+
+
+class WebhookStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        state = self.server.state
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if state.should_fail():
+            with state.lock:
+                state.webhook_failures += 1
+            status, reply = 503, b'{"error": "injected failure"}'
+        else:
+            with state.lock:
+                state.webhooks.append(json.loads(body or b"null"))
+            status, reply = 200, b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+class WebhookStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state: SinkState):
+        super().__init__(address, WebhookStubHandler)
+        self.state = state
+
+
+def start_in_thread(state: SinkState, host: str = "127.0.0.1", smtp_port: int = 0, webhook_port: int = 0):
+    """Start both sinks in background threads; returns (smtp_server, webhook_server)"""
+    smtp = SmtpSinkServer((host, smtp_port), state)
+    webhook = WebhookStubServer((host, webhook_port), state)
+    for server in (smtp, webhook):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return smtp, webhook
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink and webhook stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--webhook-port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of webhook POSTs answered with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    state = SinkState(args.fail_rate, args.seed)
+    smtp, webhook = start_in_thread(state, args.host, args.smtp_port, args.webhook_port)
+    print(f"📮 SMTP sink on {args.host}:{smtp.server_address[1]}")
+    print(f"🪝 Webhook stub on http://{args.host}:{webhook.server_address[1]}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(
+            f"\n👋 Stopped: {len(state.emails)} emails in {state.smtp_sessions} SMTP sessions, "
+            f"{len(state.webhooks)} webhooks ({state.webhook_failures} failed)"
+        )
+
+
+if __name__ == "__main__":
+    main()
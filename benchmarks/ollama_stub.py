@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Ollama stub server for development and load testing
+Speaks enough of the Ollama API for the project manager: /api/tags, /api/ps,
+/api/generate (streaming and non-streaming, with JSON schema formats),
+/api/embed and /api/embeddings, with configurable latency, token rates and
+a rate of malformed JSON generations.
+
+Point the app at it with OLLAMA_BASE_URL=http://localhost:11435
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSettings:
+    """Behaviour of the stub; every field can be set from the command line"""
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, load_ms=500.0, prompt_tokens_per_sec=800.0,
+                 tokens_per_sec=60.0, malformed_rate=0.0, error_rate=0.0, max_parallel=4,
+                 embedding_dim=256, models=("llama3.2", "nomic-embed-text"), keep_alive_seconds=300, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.load_ms = load_ms
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.tokens_per_sec = tokens_per_sec
+        self.malformed_rate = malformed_rate
+        self.error_rate = error_rate
+        self.max_parallel = max_parallel
+        self.embedding_dim = embedding_dim
+        self.models = list(models)
+        self.keep_alive_seconds = keep_alive_seconds
+        self.random = random.Random(seed)
+
+
+class StubState:
+    """Loaded models and the parallel-request slots shared by all handlers"""
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.slots = threading.BoundedSemaphore(settings.max_parallel)
+        self.lock = threading.Lock()
+        self.loaded = {}  # model -> expiry time
+        self.requests = 0
+
+    def load(self, model: str) -> float:
+        """Seconds spent loading the model (zero when already resident)"""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            expires = self.loaded.get(model)
+            self.loaded[model] = now + timedelta(seconds=self.settings.keep_alive_seconds)
+            if expires and expires > now:
+                return 0.0
+        return self.settings.load_ms / 1000
+
+    def latency(self) -> float:
+        s = self.settings
+        with self.lock:
+            jitter = s.random.uniform(-s.jitter_ms, s.jitter_ms)
+        return max(0.0, s.latency_ms + jitter) / 1000
+
+    def chance(self, rate: float) -> bool:
+        with self.lock:
+            return self.settings.random.random() < rate
+
+
+def sample_value(schema, name="value", depth=0):
+    """A plausible value for a JSON schema"""
+    if not isinstance(schema, dict):
+        return None
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: sample_value(sub, key, depth + 1) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = 3 if depth < 2 else 1
+        item_name = name[:-1] if name.endswith("s") else name
+        items = [sample_value(schema.get("items", {}), item_name, depth + 1) for _ in range(count)]
+        if items and isinstance(items[0], dict) and "title" in items[0]:
+            for i, item in enumerate(items):
+                item["title"] = f"{item['title']} {i + 1}"
+                if "dependencies" in item:
+                    item["dependencies"] = [items[i - 1]["title"]] if i else []
+        return items
+    if kind == "string":
+        return f"Stub {name.replace('_', ' ')}"
+    if kind == "integer":
+        return 4
+    if kind == "number":
+        return 6.0
+    if kind == "boolean":
+        return True
+    return None
+
+
+def tokenize(text: str, size: int = 4):
+    """Split output into roughly token-sized pieces"""
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def embed_text(text: str, dim: int):
+    """Deterministic bag-of-words embedding: similar texts get similar vectors"""
+    vector = [0.0] * dim
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    state: StubState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        settings = self.state.settings
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": f"{m}:latest", "model": f"{m}:latest"} for m in settings.models]})
+        elif self.path == "/api/ps":
+            now = datetime.now(timezone.utc)
+            with self.state.lock:
+                loaded = {m: e for m, e in self.state.loaded.items() if e > now}
+            self._send_json({"models": [
+                {"name": f"{m}:latest", "model": f"{m}:latest", "expires_at": e.isoformat()} for m, e in loaded.items()
+            ]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON body"}, 400)
+            return
+        with self.state.lock:
+            self.state.requests += 1
+
+        if self.path == "/api/generate":
+            self._generate(body)
+        elif self.path == "/api/embed":
+            inputs = body.get("input", [])
+            self._embed(body, inputs if isinstance(inputs, list) else [inputs], batched=True)
+        elif self.path == "/api/embeddings":
+            self._embed(body, [body.get("prompt", "")], batched=False)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _embed(self, body, texts, batched):
+        settings = self.state.settings
+        model = body.get("model", settings.models[-1])
+        started = time.perf_counter()
+        with self.state.slots:
+            load = self.state.load(model)
+            prompt_tokens = sum(len(t) // 4 + 1 for t in texts)
+            time.sleep(load + self.state.latency() / 4 + prompt_tokens / settings.prompt_tokens_per_sec)
+        vectors = [embed_text(t, settings.embedding_dim) for t in texts]
+        stats = {
+            "model": model,
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+        }
+        if batched:
+            self._send_json({"embeddings": vectors, **stats})
+        else:
+            self._send_json({"embedding": vectors[0]})
+
+    def _output(self, body):
+        """Generated text, possibly malformed when JSON was requested"""
+        fmt = body.get("format")
+        if isinstance(fmt, dict):
+            text = json.dumps(sample_value(fmt, "plan"))
+        elif fmt == "json":
+            text = json.dumps({"test": "success", "response": "Stub JSON response"})
+        else:
+            text = "Stub response from the Ollama stub server."
+        if fmt and self.state.chance(self.state.settings.malformed_rate):
+            # Break the document halfway, the way a derailed generation does
+            text = text[:len(text) // 2] + ' ]] Sorry, here is the plan: {'
+        return text
+
+    def _generate(self, body):
+        settings = self.state.settings
+        model = body.get("model", settings.models[0])
+        prompt = (body.get("system") or "") + (body.get("prompt") or "")
+        stream = body.get("stream", True)
+        num_predict = (body.get("options") or {}).get("num_predict") or 2048
+
+        if self.state.chance(settings.error_rate):
+            self._send_json({"error": "stub: simulated server error"}, 500)
+            return
+
+        started = time.perf_counter()
+        # Requests beyond max_parallel wait here, like Ollama's queue
+        with self.state.slots:
+            queued = time.perf_counter() - started
+            load = self.state.load(model)
+            prompt_tokens = len(prompt) // 4 + 1
+            prompt_eval = prompt_tokens / settings.prompt_tokens_per_sec
+            time.sleep(load + self.state.latency() + prompt_eval)
+
+            if not body.get("prompt"):
+                # Empty prompt: load only, as used for warm-up
+                self._send_json({"model": model, "response": "", "done": True, "done_reason": "load",
+                                 "load_duration": int(load * 1e9), "total_duration": int(load * 1e9)})
+                return
+
+            tokens = tokenize(self._output(body))[:num_predict]
+            per_token = 1 / settings.tokens_per_sec
+
+            def final_stats(eval_seconds):
+                total = time.perf_counter() - started - queued
+                return {
+                    "model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": True,
+                    "done_reason": "stop" if len(tokens) < num_predict else "length",
+                    "total_duration": int(total * 1e9), "load_duration": int(load * 1e9),
+                    "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_eval * 1e9),
+                    "eval_count": len(tokens), "eval_duration": int(eval_seconds * 1e9),
+                }
+
+            if not stream:
+                time.sleep(per_token * len(tokens))
+                self._send_json({"response": "".join(tokens), **final_stats(per_token * len(tokens))})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            eval_started = time.perf_counter()
+            try:
+                for token in tokens:
+                    time.sleep(per_token)
+                    self._write_chunk({"model": model, "response": token, "done": False})
+                self._write_chunk({"response": "", **final_stats(time.perf_counter() - eval_started)})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading, as the app does once the JSON is complete
+                self.close_connection = True
+
+    def _write_chunk(self, body):
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class OllamaStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is normal, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def make_server(settings: StubSettings = None, host: str = "127.0.0.1", port: int = 11435) -> OllamaStubServer:
+    """A stub server bound to host:port (port 0 picks a free one); call serve_forever to run it"""
+    handler = type("BoundOllamaStubHandler", (OllamaStubHandler,), {"state": StubState(settings or StubSettings())})
+    return OllamaStubServer((host, port), handler)
+
+
+def start_in_thread(settings: StubSettings = None, host: str = "127.0.0.1", port: int = 0) -> OllamaStubServer:
+    server = make_server(settings, host, port)
+    threading.Thread(target=server.serve_forever, name="ollama-stub", daemon=True).start()
+    return server
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latency before the first token")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Random +/- jitter on the latency")
+    parser.add_argument("--load-ms", type=float, default=500.0, help="Model load time when not resident")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=800.0, help="Prompt evaluation rate")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="Generation rate")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of JSON generations that break")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of generations answered with HTTP 500")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Requests served at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--embedding-dim", type=int, default=256, help="Embedding vector size")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for jitter and failures")
+
+
+def settings_from_args(args: argparse.Namespace) -> StubSettings:
+    return StubSettings(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, load_ms=args.load_ms,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec, tokens_per_sec=args.tokens_per_sec,
+        malformed_rate=args.malformed_rate, error_rate=args.error_rate, max_parallel=args.max_parallel,
+        embedding_dim=args.embedding_dim, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an Ollama stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(settings_from_args(args), args.host, args.port)
+    print(f"🤖 Ollama stub listening on http://{args.host}:{server.server_port}")
+    print(f"   Set OLLAMA_BASE_URL=http://{args.host}:{server.server_port} to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stub stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,90 @@ class Config:
     
     # AI Configuration
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # Comma-separated Ollama servers to spread generations over; defaults to OLLAMA_BASE_URL
+    OLLAMA_ENDPOINTS = [
+        url.strip() for url in os.getenv("OLLAMA_ENDPOINTS", "").split(",") if url.strip()
+    ] or [OLLAMA_BASE_URL]
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+    # Model routing: a small fast model for light operations, a large one for full plans
+    OLLAMA_SMALL_MODEL = os.getenv("OLLAMA_SMALL_MODEL", OLLAMA_MODEL)
+    OLLAMA_LARGE_MODEL = os.getenv("OLLAMA_LARGE_MODEL", OLLAMA_MODEL)
+    # Prompts longer than this (characters) are sent to the large model whatever the operation
+    AI_LARGE_INPUT_CHARS = int(os.getenv("AI_LARGE_INPUT_CHARS", "6000"))
+    # Per-operation overrides as JSON, e.g. {"suggest_task_breakdown": {"model": "llama3.2:1b", "num_predict": 512}}
+    AI_MODEL_ROUTES = os.getenv("AI_MODEL_ROUTES", "")
+    # "schema" sends JSON schemas to Ollama's structured output; "json" only forces JSON mode
+    OLLAMA_JSON_FORMAT = os.getenv("OLLAMA_JSON_FORMAT", "schema").lower()
+    # How long Ollama keeps the model loaded after a request ("30m", "1h", seconds, or -1 for forever)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_WARMUP_ON_STARTUP = os.getenv("OLLAMA_WARMUP_ON_STARTUP", "true").lower() == "true"
+    OLLAMA_RESIDENCY_CHECK_SECONDS = int(os.getenv("OLLAMA_RESIDENCY_CHECK_SECONDS", "60"))
+    # "sectioned" generates plan tasks first, then milestones/risks/recommendations concurrently;
+    # "fast" answers from the template planner and refines the plan with the model in the background
+    AI_PLAN_MODE = os.getenv("AI_PLAN_MODE", "single").lower()
+    AI_PLAN_SECTION_WORKERS = int(os.getenv("AI_PLAN_SECTION_WORKERS", "3"))
+    # Per-call AI metrics kept in memory for /ai/metrics
+    AI_METRICS_BUFFER_SIZE = int(os.getenv("AI_METRICS_BUFFER_SIZE", "1000"))
+    # Similar-plan retrieval: embedding model, index file, few-shot count and similarity thresholds
+    OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+    PLAN_INDEX_ENABLED = os.getenv("PLAN_INDEX_ENABLED", "true").lower() == "true"
+    PLAN_INDEX_PATH = os.getenv("PLAN_INDEX_PATH", "plan_index.npz")
+    PLAN_INDEX_TOP_K = int(os.getenv("PLAN_INDEX_TOP_K", "2"))
+    PLAN_INDEX_MIN_SIMILARITY = float(os.getenv("PLAN_INDEX_MIN_SIMILARITY", "0.75"))
+    # Seconds before a failed index sync is retried, and between rewrites of the index file
+    PLAN_INDEX_SYNC_RETRY_SECONDS = float(os.getenv("PLAN_INDEX_SYNC_RETRY_SECONDS", "300"))
+    PLAN_INDEX_SAVE_SECONDS = float(os.getenv("PLAN_INDEX_SAVE_SECONDS", "60"))
+    PLAN_REUSE_SIMILARITY = float(os.getenv("PLAN_REUSE_SIMILARITY", "0.97"))
+    # Weekly hours the template planner schedules against
+    TEMPLATE_PLANNER_HOURS_PER_WEEK = float(os.getenv("TEMPLATE_PLANNER_HOURS_PER_WEEK", "10"))
+    # Upper bound on the project context pasted into analysis prompts
+    AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "1500"))
+    AI_CONTEXT_DEVLOG_CHARS = int(os.getenv("AI_CONTEXT_DEVLOG_CHARS", "280"))
+    
+    # Nightly insights precompute: hour of day (local time), activity window and concurrency
+    INSIGHTS_PRECOMPUTE_HOUR = int(os.getenv("INSIGHTS_PRECOMPUTE_HOUR", "2"))
+    INSIGHTS_ACTIVITY_DAYS = int(os.getenv("INSIGHTS_ACTIVITY_DAYS", "7"))
+    INSIGHTS_PRECOMPUTE_CONCURRENCY = int(os.getenv("INSIGHTS_PRECOMPUTE_CONCURRENCY", "2"))
+    INSIGHTS_SNAPSHOTS_KEPT = int(os.getenv("INSIGHTS_SNAPSHOTS_KEPT", "3"))
+    
+    # Cron schedules (minute hour day-of-month month day-of-week, local time)
+    WEEKLY_REMINDERS_CRON = os.getenv("WEEKLY_REMINDERS_CRON", "0 9 * * *")
+    INSIGHTS_PRECOMPUTE_CRON = os.getenv("INSIGHTS_PRECOMPUTE_CRON", f"0 {INSIGHTS_PRECOMPUTE_HOUR} * * *")
+    
+    # Reminder dispatcher: full reload interval that picks up reminders written elsewhere
+    REMINDER_RESYNC_SECONDS = float(os.getenv("REMINDER_RESYNC_SECONDS", "3600"))
+    # Delay before reminders from a failed sweep or deadline emit are tried again
+    REMINDER_RETRY_SECONDS = float(os.getenv("REMINDER_RETRY_SECONDS", "60"))
+    # Deadline watcher: hours before a task deadline / event start to remind, look-ahead and refresh interval
+    DEADLINE_LEAD_HOURS = [float(h) for h in os.getenv("DEADLINE_LEAD_HOURS", "24,1").split(",") if h.strip()]
+    DEADLINE_HORIZON_HOURS = float(os.getenv("DEADLINE_HORIZON_HOURS", "48"))
+    DEADLINE_REFRESH_SECONDS = float(os.getenv("DEADLINE_REFRESH_SECONDS", "300"))
+    
+    # Scheduler jobs: dedicated worker threads, default per-job timeout (seconds)
+    SCHEDULER_JOB_WORKERS = int(os.getenv("SCHEDULER_JOB_WORKERS", "4"))
+    SCHEDULER_JOB_TIMEOUT = float(os.getenv("SCHEDULER_JOB_TIMEOUT", "600"))
+    # Leader election: with several uvicorn workers only the lease holder runs the scheduler
+    SCHEDULER_LEADER_ELECTION = os.getenv("SCHEDULER_LEADER_ELECTION", "true").lower() == "true"
+    SCHEDULER_LEASE_TTL = float(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+    # Event-loop lag probe: sampling interval and the stall that gets logged
+    LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+    LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "100"))
+    
+    # Reminder notifications: channels (log, smtp, webhook, sse), delivery workers, batching and retries
+    NOTIFICATION_CHANNELS = [c.strip() for c in os.getenv("NOTIFICATION_CHANNELS", "log").split(",") if c.strip()]
+    NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "4"))
+    NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "50"))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "3"))
+    NOTIFICATION_RETRY_BACKOFF = float(os.getenv("NOTIFICATION_RETRY_BACKOFF", "2"))
+    NOTIFICATION_TIMEOUT = float(os.getenv("NOTIFICATION_TIMEOUT", "10"))
+    NOTIFICATION_WEBHOOK_URL = os.getenv("NOTIFICATION_WEBHOOK_URL", "")
+    SMTP_HOST = os.getenv("SMTP_HOST", "")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_FROM = os.getenv("SMTP_FROM", "")
+    SMTP_TO = os.getenv("SMTP_TO", "")
     
     # Auto-setup Configuration
     AUTO_SETUP_DATABASE = os.getenv("AUTO_SETUP_DATABASE", "true").lower() == "true"
@@ -51,8 +134,8 @@ class Config:
         print("🔧 Project Manager Configuration:")
         print(f"   Server: {cls.get_server_url()}")
         print(f"   Database: {cls.DATABASE_URL}")
-        print(f"   Ollama: {cls.OLLAMA_BASE_URL}")
-        print(f"   Model: {cls.OLLAMA_MODEL}")
+        print(f"   Ollama: {', '.join(cls.OLLAMA_ENDPOINTS)}")
+        print(f"   Model: {cls.OLLAMA_MODEL} (small: {cls.OLLAMA_SMALL_MODEL}, large: {cls.OLLAMA_LARGE_MODEL})")
         print(f"   Auto-setup: DB={cls.AUTO_SETUP_DATABASE}, AI={cls.AUTO_SETUP_AI}")
         print(f"   Debug: {cls.DEBUG}")
 
@@ -43,6 +43,7 @@ def migrate_tasks_table(cursor):
         ("order_index", "INTEGER DEFAULT 0"),
         ("skills_required", "TEXT"),  # JSON field
         ("dependencies", "TEXT"),     # JSON field
+        ("dependency_ids", "TEXT"),   # JSON field
     ]
     
     for column_name, column_type in migrations:
@@ -124,6 +125,108 @@ def create_new_tables(cursor):
     """)
     logger.info("✅ Created/verified schedule_adjustments table")
 
+    # ProjectAnalysis table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS project_analyses (
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER NOT NULL,
+            version INTEGER DEFAULT 1,
+            state_key TEXT,
+            analysis TEXT,  -- JSON field
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_project_analyses_project_state
+        ON project_analyses (project_id, state_key)
+    """)
+    # Concurrent analyses could store the same version; renumber those
+    # projects in id order before versions become unique
+    cursor.execute("""
+        UPDATE project_analyses
+        SET version = (
+            SELECT COUNT(*) FROM project_analyses AS earlier
+            WHERE earlier.project_id = project_analyses.project_id AND earlier.id <= project_analyses.id
+        )
+        WHERE project_id IN (
+            SELECT project_id FROM project_analyses
+            GROUP BY project_id, version HAVING COUNT(*) > 1
+        )
+    """)
+    if cursor.rowcount:
+        logger.info(f"✅ Renumbered {cursor.rowcount} analysis snapshots with duplicate versions")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_project_analyses_project_version
+        ON project_analyses (project_id, version)
+    """)
+    logger.info("✅ Created/verified project_analyses table")
+
+    # ProjectInsightSnapshot table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS project_insight_snapshots (
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER NOT NULL,
+            analysis_id INTEGER,
+            insights TEXT,  -- JSON field
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id),
+            FOREIGN KEY (analysis_id) REFERENCES project_analyses (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_project_insight_snapshots_project_id
+        ON project_insight_snapshots (project_id)
+    """)
+    logger.info("✅ Created/verified project_insight_snapshots table")
+
+    # ScheduledJobState table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            name TEXT PRIMARY KEY,
+            cron TEXT,
+            last_scheduled_for DATETIME,
+            last_started_at DATETIME,
+            last_finished_at DATETIME,
+            last_status TEXT,
+            last_error TEXT,
+            next_run_at DATETIME,
+            run_count INTEGER DEFAULT 0
+        )
+    """)
+    logger.info("✅ Created/verified scheduled_jobs table")
+
+    # NotificationDeadLetter table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notification_dead_letters (
+            id INTEGER PRIMARY KEY,
+            reminder_id INTEGER,
+            channel TEXT,
+            message TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (reminder_id) REFERENCES reminders (id) ON DELETE SET NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_notification_dead_letters_reminder_id
+        ON notification_dead_letters (reminder_id)
+    """)
+    logger.info("✅ Created/verified notification_dead_letters table")
+
+    # SchedulerLease table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT,
+            acquired_at DATETIME,
+            renewed_at DATETIME,
+            expires_at DATETIME
+        )
+    """)
+    logger.info("✅ Created/verified scheduler_leases table")
+
     # Event table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS events (
@@ -150,6 +253,53 @@ def create_new_tables(cursor):
     """)
     logger.info("✅ Created/verified events table")
 
+    # Per-project devlog lookups by date (activity counts, latest entries)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_devlogs_project_created
+        ON devlogs (project_id, created_at)
+    """)
+    logger.info("✅ Created/verified devlogs index")
+
+    # Pending reminders in due order, loaded by the reminder dispatcher
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_reminders_sent_due
+        ON reminders (sent, due_date)
+    """)
+    logger.info("✅ Created/verified reminders index")
+
+    # Reminder ownership: project, kind and period for generated reminders
+    for column_name, column_type in [
+        ("project_id", "INTEGER REFERENCES projects (id) ON DELETE CASCADE"),
+        ("kind", "TEXT"),
+        ("period_key", "TEXT"),
+    ]:
+        try:
+            cursor.execute(f"ALTER TABLE reminders ADD COLUMN {column_name} {column_type}")
+            logger.info(f"✅ Added {column_name} column to reminders table")
+        except sqlite3.OperationalError as e:
+            if "duplicate column name" in str(e):
+                logger.info(f"✅ {column_name} column already exists in reminders table")
+            else:
+                raise
+
+    # One generated reminder per project, kind and period
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_reminders_project_kind_period
+        ON reminders (project_id, kind, period_key)
+    """)
+    logger.info("✅ Created/verified reminders ownership index")
+
+    # Open tasks and events by due time, scanned by the deadline watcher
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_tasks_completed_deadline
+        ON tasks (completed, deadline)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_events_completed_start
+        ON events (completed, start_time)
+    """)
+    logger.info("✅ Created/verified deadline indexes")
+
     # Add missing columns to tasks table
     try:
         cursor.execute("ALTER TABLE tasks ADD COLUMN created_at DATETIME")
@@ -0,0 +1,80 @@
+# tests/test_cron.py
+from datetime import datetime
+
+import pytest
+
+from backend.services.cron import CronError, CronExpression
+
+# 2026-10-19 is a Monday
+MONDAY = datetime(2026, 10, 19, 10, 7)
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("*/15 * * * *", MONDAY, datetime(2026, 10, 19, 10, 15)),
+    # Strictly after, and seconds are ignored
+    ("*/15 * * * *", datetime(2026, 10, 19, 10, 15), datetime(2026, 10, 19, 10, 30)),
+    ("*/15 * * * *", datetime(2026, 10, 19, 10, 14, 59), datetime(2026, 10, 19, 10, 15)),
+    ("5/20 * * * *", MONDAY, datetime(2026, 10, 19, 10, 25)),
+    ("0 9 * * 1-5", datetime(2026, 10, 23, 10, 0), datetime(2026, 10, 26, 9, 0)),
+    ("30 8 * * mon,wed", MONDAY, datetime(2026, 10, 21, 8, 30)),
+    ("0 0 1 jan *", datetime(2026, 12, 31, 23, 59), datetime(2027, 1, 1, 0, 0)),
+    ("0 0 31 * *", datetime(2026, 11, 1), datetime(2026, 12, 31, 0, 0)),
+    ("0 0 29 2 *", MONDAY, datetime(2028, 2, 29, 0, 0)),
+    ("@daily", MONDAY, datetime(2026, 10, 20, 0, 0)),
+    ("@hourly", MONDAY, datetime(2026, 10, 19, 11, 0)),
+])
+def test_next_after(expression, after, expected):
+    assert CronExpression(expression).next_after(after) == expected
+
+
+def test_restricted_day_fields_match_either_day():
+    # The 13th of the month or any Friday
+    cron = CronExpression("0 0 13 * 5")
+    assert cron.next_after(MONDAY) == datetime(2026, 10, 23)       # Friday the 23rd
+    assert cron.next_after(datetime(2026, 12, 11)) == datetime(2026, 12, 13)  # Sunday the 13th
+    assert list(cron.between(datetime(2026, 12, 1), datetime(2026, 12, 31))) == [
+        datetime(2026, 12, 4), datetime(2026, 12, 11), datetime(2026, 12, 13),
+        datetime(2026, 12, 18), datetime(2026, 12, 25),
+    ]
+
+
+def test_one_restricted_day_field_must_match():
+    assert CronExpression("0 0 13 * *").next_after(MONDAY) == datetime(2026, 11, 13)
+    assert CronExpression("0 0 * * 5").next_after(MONDAY) == datetime(2026, 10, 23)
+    # A wildcard with a step is still a restriction
+    assert CronExpression("0 0 */10 * 5").next_after(MONDAY) == datetime(2026, 10, 21)
+
+
+@pytest.mark.parametrize("sunday", ["0", "7", "sun", "SUN"])
+def test_sunday_as_0_or_7(sunday):
+    assert CronExpression(f"0 12 * * {sunday}").next_after(MONDAY) == datetime(2026, 10, 25, 12, 0)
+
+
+def test_weekday_range_ending_on_7():
+    cron = CronExpression("0 0 * * 5-7")
+    assert list(cron.between(MONDAY, datetime(2026, 10, 26))) == [
+        datetime(2026, 10, 23), datetime(2026, 10, 24), datetime(2026, 10, 25),
+    ]
+
+
+def test_expression_that_never_matches():
+    cron = CronExpression("0 0 30 2 *")
+    assert cron.next_after(MONDAY) is None
+    assert list(cron.between(MONDAY, datetime(2030, 1, 1))) == []
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *",
+    "60 * * * *",
+    "* 24 * * *",
+    "* * 0 * *",
+    "* * * 13 *",
+    "* * * * 8",
+    "5-1 * * * *",
+    "*/0 * * * *",
+    "abc * * * *",
+    "* * * foo *",
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(CronError):
+        CronExpression(expression)
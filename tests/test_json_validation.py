@@ -0,0 +1,128 @@
+# tests/test_json_validation.py
+import json
+
+import pytest
+
+from ai import IncrementalJSONValidator, JSONStreamError, validate_schema
+
+
+def _feed_chunks(text, size):
+    validator = IncrementalJSONValidator()
+    for start in range(0, len(text), size):
+        validator.feed(text[start:start + size])
+    return validator
+
+
+DOCUMENT = json.dumps({
+    "title": "Plan \"A\" \\ é",
+    "weeks": 4,
+    "ratio": -0.5e+3,
+    "done": False,
+    "owner": None,
+    "tasks": [{"title": "x", "hours": 0}, [], {}],
+})
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(DOCUMENT)])
+def test_valid_document_in_any_chunking(size):
+    validator = _feed_chunks(DOCUMENT, size)
+    assert validator.complete
+    assert validator.text == DOCUMENT
+    assert json.loads(validator.text)["weeks"] == 4
+
+
+def test_prefix_is_not_complete():
+    validator = IncrementalJSONValidator()
+    validator.feed('{"tasks": [1, 2')
+    assert not validator.complete
+    validator.feed("]}")
+    assert validator.complete
+
+
+def test_trailing_whitespace_is_accepted():
+    validator = IncrementalJSONValidator()
+    validator.feed('{"a": 1}')
+    validator.feed(" \n\t")
+    assert validator.complete
+
+
+@pytest.mark.parametrize("text", [
+    "[1, 2]",                  # only objects at the top level
+    "Sure! {",                 # prose before the document
+    '{"a" 1}',                 # missing colon
+    '{"a": 1,, "b": 2}',       # double comma
+    "{a: 1}",                  # unquoted key
+    '{"a": tru}',              # broken literal
+    '{"a": 01}',               # leading zero
+    '{"a": 1.}',               # no fraction digits
+    '{"a": "\\x"}',            # unknown escape
+    '{"a": "\\u12g4"}',        # bad unicode escape
+    '{"a": [1}',               # mismatched bracket
+    '{"a": 1} trailing',       # text after the document
+])
+def test_invalid_text_raises_as_soon_as_seen(text):
+    with pytest.raises(JSONStreamError):
+        _feed_chunks(text, 1)
+
+
+def test_error_is_raised_mid_stream():
+    validator = IncrementalJSONValidator()
+    validator.feed('{"tasks": [')
+    with pytest.raises(JSONStreamError, match="position 11"):
+        validator.feed("}")
+
+
+def test_control_character_in_string_is_rejected():
+    with pytest.raises(JSONStreamError):
+        _feed_chunks('{"a": "line\nbreak"}', 4)
+
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "required": ["title", "tasks"],
+    "properties": {
+        "title": {"type": "string"},
+        "weeks": {"type": "integer"},
+        "level": {"type": "string", "enum": ["beginner", "advanced"]},
+        "tasks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["title", "hours"],
+                "properties": {"title": {"type": "string"}, "hours": {"type": "number"}},
+            },
+        },
+    },
+}
+
+
+def test_schema_accepts_matching_value():
+    value = {"title": "p", "weeks": 3, "level": "advanced", "tasks": [{"title": "t", "hours": 1.5}]}
+    assert validate_schema(value, PLAN_SCHEMA) == []
+
+
+def test_schema_reports_paths_of_each_problem():
+    value = {"weeks": "3", "level": "expert", "tasks": [{"title": "t", "hours": 2}, {"hours": "x"}]}
+    errors = validate_schema(value, PLAN_SCHEMA)
+    assert "$: missing required key 'title'" in errors
+    assert "$.weeks: expected integer, got str" in errors
+    assert "$.level: 'expert' not in ['beginner', 'advanced']" in errors
+    assert "$.tasks[1]: missing required key 'title'" in errors
+    assert "$.tasks[1].hours: expected number, got str" in errors
+    assert len(errors) == 5
+
+
+def test_schema_keeps_booleans_apart_from_numbers():
+    assert validate_schema(True, {"type": "integer"}) == ["$: expected integer, got boolean"]
+    assert validate_schema(True, {"type": "number"}) == ["$: expected number, got boolean"]
+    assert validate_schema(2, {"type": "number"}) == []
+    assert validate_schema(2.5, {"type": "integer"}) == ["$: expected integer, got float"]
+
+
+def test_schema_can_skip_required_keys():
+    # Model output: callers fill missing keys with defaults, so only wrong types matter
+    assert validate_schema({"tasks": []}, PLAN_SCHEMA, check_required=False) == []
+
+
+def test_schema_wrong_container_stops_descent():
+    assert validate_schema({"title": "p", "tasks": {}}, PLAN_SCHEMA) == ["$.tasks: expected array, got dict"]
@@ -0,0 +1,132 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.concurrency import run_in_threadpool
+
+from ai import SingleFlight
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.005)
+
+
+def _run_concurrently(flight, key, fn, callers):
+    """Start callers on threads; results and errors fill in as they finish"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return {"plan": "ok"}
+
+    threads, results, errors = _run_concurrently(flight, "key", fn, 5)
+    _wait_for(lambda: flight.stats()["collapsed"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == []
+    assert len(executions) == 1
+    assert len(results) == 5
+    # Every caller gets the very same object
+    assert all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert stats["calls"] == 5
+    assert stats["executions"] == 1
+    assert stats["max_waiters"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["collapse_ratio"] == 0.8
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("model unavailable")
+
+    threads, results, errors = _run_concurrently(flight, "key", fn, 3)
+    _wait_for(lambda: flight.stats()["collapsed"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == []
+    assert len(errors) == 3
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_completed_call_is_not_cached():
+    flight = SingleFlight()
+    counter = iter(range(10))
+
+    assert flight.do("key", lambda: next(counter)) == 0
+    assert flight.do("key", lambda: next(counter)) == 1
+    assert flight.stats()["executions"] == 2
+    assert flight.stats()["collapsed"] == 0
+
+
+def test_key_is_released_after_failure():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.stats()["in_flight"] == 0
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: "a") == "a"
+    assert flight.do("b", lambda: "b") == "b"
+    assert flight.stats()["executions"] == 2
+
+
+def test_async_callers_collapse_through_the_threadpool():
+    # The AI routes call the service via run_in_threadpool; that is what lets
+    # identical requests overlap and share one generation
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return "plan"
+
+    async def main():
+        calls = [asyncio.ensure_future(run_in_threadpool(flight.do, "key", fn)) for _ in range(4)]
+        await asyncio.to_thread(_wait_for, lambda: flight.stats()["collapsed"] == 3)
+        release.set()
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(main()) == ["plan"] * 4
+    assert len(executions) == 1
@@ -0,0 +1,117 @@
+# tests/test_template_planner.py
+import copy
+
+from backend.services.template_planner import TEMPLATES, TemplatePlanner, schedule_critical_path
+
+
+def _task(title, hours, dependencies=()):
+    return {"title": title, "estimated_hours": hours, "dependencies": list(dependencies)}
+
+
+def _by_title(tasks):
+    return {task["title"]: task for task in tasks}
+
+
+def test_critical_path_of_a_diamond():
+    tasks = [
+        _task("A", 4),
+        _task("B", 6, ["A"]),
+        _task("C", 2, ["A"]),
+        _task("D", 3, ["B", "C"]),
+    ]
+    schedule = schedule_critical_path(tasks, hours_per_week=5)
+
+    assert schedule["critical_path"] == ["A", "B", "D"]
+    assert schedule["critical_path_hours"] == 13
+    assert schedule["total_hours"] == 15
+    tasks = _by_title(tasks)
+    assert tasks["C"]["slack_hours"] == 4
+    assert not tasks["C"]["critical"]
+    assert tasks["C"]["earliest_start_hours"] == 4
+    assert tasks["C"]["latest_start_hours"] == 8
+    assert tasks["D"]["earliest_start_hours"] == 10
+    assert (tasks["A"]["start_week"], tasks["A"]["end_week"]) == (1, 1)
+    assert (tasks["B"]["start_week"], tasks["B"]["end_week"]) == (1, 2)
+    assert (tasks["D"]["start_week"], tasks["D"]["end_week"]) == (3, 3)
+
+
+def test_tasks_listed_before_their_dependencies():
+    tasks = [_task("Deploy", 2, ["Build"]), _task("Build", 5)]
+    schedule = schedule_critical_path(tasks, hours_per_week=10)
+    assert schedule["critical_path"] == ["Build", "Deploy"]
+    assert _by_title(tasks)["Deploy"]["earliest_start_hours"] == 5
+
+
+def test_unknown_and_self_dependencies_are_ignored():
+    tasks = [_task("A", 3, ["Missing", "A"]), _task("B", 2)]
+    schedule = schedule_critical_path(tasks, hours_per_week=10)
+    assert schedule["critical_path_hours"] == 3
+    assert _by_title(tasks)["A"]["earliest_start_hours"] == 0
+    assert _by_title(tasks)["B"]["slack_hours"] == 1
+
+
+def test_cycle_does_not_hang_or_crash():
+    tasks = [_task("A", 2, ["B"]), _task("B", 3, ["A"]), _task("C", 1, ["B"])]
+    schedule = schedule_critical_path(tasks, hours_per_week=10)
+    assert all("slack_hours" in task for task in tasks)
+    assert schedule["critical_path_hours"] >= 3
+
+
+def test_empty_task_list():
+    schedule = schedule_critical_path([], hours_per_week=10)
+    assert schedule["critical_path"] == []
+    assert schedule["critical_path_hours"] == 0
+
+
+def test_plan_picks_template_and_splices_modules():
+    planner = TemplatePlanner(hours_per_week=10)
+    plan = planner.plan("A React dashboard with login and Stripe checkout", "Shop Admin")
+
+    assert plan["planner"]["source"] == "template"
+    assert plan["planner"]["template"] == "web_app"
+    assert plan["planner"]["modules"] == ["authentication", "payments"]
+    tasks = _by_title(plan["tasks"])
+    testing = tasks["Testing and Bug Fixes"]
+    assert {"Implement User Authentication", "Integrate Payments"} <= set(testing["dependencies"])
+    titles = [task["title"] for task in plan["tasks"]]
+    assert titles.index("Integrate Payments") < titles.index("Testing and Bug Fixes")
+    # Every dependency names a task in the plan
+    assert all(d in tasks for task in plan["tasks"] for d in task["dependencies"])
+
+
+def test_plan_is_scheduled_and_consistent():
+    planner = TemplatePlanner(hours_per_week=10)
+    plan = planner.plan("A website for booking classes")
+
+    schedule = plan["schedule"]
+    assert plan["estimated_duration_weeks"] == -(-schedule["critical_path_hours"] // 10)
+    for task in plan["tasks"]:
+        assert task["estimated_hours"] >= 1
+        if task["critical"]:
+            assert task["priority"] in ("high", "critical")
+    assert plan["milestones"]
+    assert all(1 <= milestone["week"] <= plan["estimated_duration_weeks"] for milestone in plan["milestones"])
+
+
+def test_scale_words_change_estimates():
+    planner = TemplatePlanner(hours_per_week=10)
+    simple = planner.plan("A simple website")
+    complex_ = planner.plan("A complex enterprise website")
+    assert simple["schedule"]["total_hours"] < complex_["schedule"]["total_hours"]
+    assert complex_["difficulty_level"] == "advanced"
+
+
+def test_unmatched_description_uses_generic_template():
+    plan = TemplatePlanner().plan("zzz qqq")
+    assert plan["planner"]["template"] == "generic"
+    assert plan["planner"]["matched_keywords"] == []
+    assert plan["project_title"] == "New Project"
+
+
+def test_plan_does_not_modify_templates():
+    before = copy.deepcopy(TEMPLATES)
+    planner = TemplatePlanner()
+    first = planner.plan("React web app with login and notifications")
+    second = planner.plan("React web app with login and notifications")
+    assert TEMPLATES == before
+    assert first["tasks"] == second["tasks"]
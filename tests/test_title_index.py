@@ -0,0 +1,61 @@
+# tests/test_title_index.py
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.title_index import TaskTitleIndex, normalize_title
+
+
+def _index(*titles):
+    return TaskTitleIndex([SimpleNamespace(id=i, title=title) for i, title in enumerate(titles, start=1)])
+
+
+def _match_id(index, title):
+    match = index.match(title)
+    return match.id if match is not None else None
+
+
+def test_normalize_title():
+    assert normalize_title("  Step 3: Build the API!  ") == "build the api"
+    assert normalize_title("2) Deploy") == "deploy"
+    assert normalize_title(None) == ""
+
+
+def test_exact_match_after_normalization():
+    index = _index("Build API", "Write Tests")
+    assert _match_id(index, "1. build api") == 1
+    assert _match_id(index, "WRITE TESTS.") == 2
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("Setup Dev Environment", 1),
+    ("Implement User Auth", 2),
+    ("Testing & Bug Fixes", 3),
+])
+def test_approximate_titles_match(title, expected):
+    index = _index("Setup Development Environment", "Implement User Authentication", "Testing and Bug Fixes")
+    assert _match_id(index, title) == expected
+
+
+@pytest.mark.parametrize("title", ["Build UI", "Build Docs", "Write API", "Deploy"])
+def test_titles_sharing_a_word_do_not_match(title):
+    assert _match_id(_index("Build API", "Write Tests"), title) is None
+
+
+def test_near_miss_is_not_matched_to_its_neighbour():
+    index = _index("Build API", "Build UI", "Design UI")
+    assert _match_id(index, "Build UI") == 2
+    assert _match_id(index, "Build the UI") == 2
+    assert _match_id(index, "Build GUI") is None
+
+
+def test_ambiguous_title_returns_no_match():
+    index = _index("Build API Server", "Build API Client")
+    assert _match_id(index, "Build API") is None
+    assert _match_id(index, "Build API Servers") == 1
+
+
+def test_dict_items_with_key():
+    index = TaskTitleIndex([{"title": "Deploy and Launch"}], key=lambda t: t.get("title", ""))
+    assert index.match("Deploy & Launch") == {"title": "Deploy and Launch"}
+    assert index.match("") is None